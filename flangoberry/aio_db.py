@@ -0,0 +1,82 @@
+import asyncio
+from weakref import WeakKeyDictionary
+from flangoberry import db
+from flangoberry.db import DBException
+
+try:
+    from arangoasync import ArangoClient
+    from arangoasync.auth import Auth
+except ImportError:  # pragma: no cover
+    ArangoClient = None
+
+
+#
+# Async connections are bound to the event loop they were created in (their HTTP
+# sessions can't be shared between loops), so they are kept per loop.
+#
+connections = WeakKeyDictionary()
+
+
+def _loop_connections() -> dict:
+    return connections.setdefault(asyncio.get_running_loop(), {})
+
+
+def get_connection(alias="default", dbsettings=None):
+    """Async counterpart of `flangoberry.db.get_connection`, backed by
+    python-arango-async. If `dbsettings` aren't provided, the settings of the sync
+    connection with the same alias are reused. Must be called from within a
+    running event loop."""
+    if ArangoClient is None:
+        raise DBException(
+            "python-arango-async must be installed to use async connections."
+        )
+
+    loop_connections = _loop_connections()
+    try:
+        return loop_connections[alias]
+    except KeyError:
+        if dbsettings:
+            conf = dbsettings[alias]
+        elif alias in db.connections:
+            conf = db.connections[alias]
+        else:
+            raise DBException(
+                "Database settings must be provided "
+                "to establish an initial connection."
+            )
+        # The sync `client_conf` may hold python-arango specific options, so only
+        # the hosts are passed on, unless an `async_client_conf` is configured.
+        client_conf = conf.get("async_client_conf") or {
+            "hosts": conf["client_conf"]["hosts"]
+        }
+        loop_connections[alias] = {
+            "alias": alias,
+            "client_conf": client_conf,
+            "db_connect_conf": conf["db_connect_conf"],
+            "client": ArangoClient(**client_conf),
+            "dbs": {},
+        }
+        return loop_connections[alias]
+
+
+async def get_db(db_alias, connection_alias="default"):
+    conn = get_connection(connection_alias)
+    try:
+        return conn["dbs"][db_alias]
+    except KeyError:
+        db_conf = dict(conn["db_connect_conf"][db_alias])
+        auth = Auth(
+            username=db_conf.pop("username", ""),
+            password=db_conf.pop("password", ""),
+        )
+        conn["dbs"][db_alias] = await conn["client"].db(auth=auth, **db_conf)
+        return conn["dbs"][db_alias]
+
+
+async def close_connections():
+    """Closes the HTTP sessions of the connections of the running event loop, e.g.
+    on ASGI lifespan shutdown"""
+    loop_connections = _loop_connections()
+    while loop_connections:
+        alias, conn = loop_connections.popitem()
+        await conn["client"].close()
@@ -0,0 +1,466 @@
+"""
+Async counterparts of the `flangoberry.graph_ops` API, backed by
+python-arango-async (see `flangoberry.aio_db`), for use from async resolvers and
+ASGI apps.
+
+Unlike `graph_ops`, nothing here provisions graphs, collections or indexes: the
+schema is expected to be present, e.g. by running `graph_ops.bootstrap_schema()`
+at startup (see `flangoberry.appfactory.create_asgi_app`). Queries are shared
+with `graph_ops`, so both APIs read and write the same data the same way. Writes
+invalidate the graph_ops document cache, but reads don't go through it.
+"""
+
+from typing import Iterable
+from flangoberry import aio_db
+from flangoberry import graph_ops
+from flangoberry.graph_ops import (
+    DataOpsException,
+    VertexStorage,
+    EdgeStorage,
+    edge_cursor,
+    _handle_get_edge_search_args,
+)
+from .graph_defs import BaseVertex, BaseEdge, timestamp
+from strawberry import UNSET as STRAWBERRY_UNSET
+
+try:
+    from arangoasync.exceptions import AQLQueryExecuteError, ArangoError
+except ImportError:  # pragma: no cover
+    AQLQueryExecuteError = ArangoError = Exception
+
+
+async def resolve_vertex_storage(
+    vertex: BaseVertex | type[BaseVertex], storage_def=None
+) -> VertexStorage:
+    if storage_def is None:
+        storage_def = vertex.default_storage
+    dbase = await aio_db.get_db(
+        storage_def["db_alias"], storage_def["connection_alias"]
+    )
+    graph = dbase.graph(storage_def["graph"])
+    coll = graph.vertex_collection(storage_def["collection"])
+    return VertexStorage(dbase, graph, coll)
+
+
+async def resolve_edge_storage(
+    edge: BaseEdge | type[BaseEdge], storage_def=None
+) -> EdgeStorage:
+    if storage_def is None:
+        storage_def = edge.default_storage
+    dbase = await aio_db.get_db(
+        storage_def["db_alias"], storage_def["connection_alias"]
+    )
+    graph = dbase.graph(storage_def["graph"])
+    coll = graph.edge_collection(storage_def["edge_definition"]["edge_collection"])
+    return EdgeStorage(dbase, graph, coll)
+
+
+async def _execute(dbase, query: str, bind_vars: dict, **kwargs) -> list:
+    try:
+        # Exhausting the cursor releases it on the server, no need to close it
+        cursor = await dbase.aql.execute(query, bind_vars=bind_vars, **kwargs)
+        return [doc async for doc in cursor]
+    except AQLQueryExecuteError as e:
+        raise DataOpsException(f"arangoasync.exceptions.AQLQueryExecuteError: {e}")
+
+
+async def _execute_write_query(
+    dbase, query: str, bind_vars: dict, write_collections: list, stream_transaction
+) -> list:
+    """Async version of `graph_ops._execute_write_query`"""
+    if not stream_transaction:
+        return await _execute(dbase, query, bind_vars)
+    txn_db = await dbase.begin_transaction(write=write_collections)
+    try:
+        results = await _execute(txn_db, query, bind_vars)
+    except Exception:
+        await txn_db.abort_transaction()
+        raise
+    await txn_db.commit_transaction()
+    return results
+
+
+async def _find_one(
+    dbase, collection: str, search: dict, fields: list[str] = None
+) -> dict | None:
+    query, bind_vars = graph_ops._find_one_query(collection, search, fields)
+    res = await _execute(dbase, query, bind_vars)
+    if len(res) > 1:
+        raise DataOpsException("Expected one result but got more")
+    return res[0] if res else None
+
+
+def _with_key(doc: dict) -> dict:
+    if "_key" not in doc and "_id" in doc:
+        doc["_key"] = graph_ops.get_key_from_id(doc["_id"])
+    return doc
+
+
+async def create_vertex(vertex: BaseVertex, storage_def=None) -> dict:
+    if not isinstance(vertex, BaseVertex):
+        raise DataOpsException("`vertex` must be an instance of BaseVertex")
+
+    storage = await resolve_vertex_storage(vertex, storage_def)
+    new = (
+        await _execute(
+            storage.db,
+            "INSERT @doc INTO @@collection RETURN NEW",
+            {"doc": vertex, "@collection": storage.collection.name},
+        )
+    )[0]
+    graph_ops.notify_written([new["_id"]])
+    return new
+
+
+async def update_vertex(vertex: BaseVertex, storage_def=None) -> dict:
+    if not isinstance(vertex, BaseVertex):
+        raise DataOpsException("`vertex` must be an instance of BaseVertex")
+
+    if "created" in vertex:
+        del vertex["created"]
+    vertex["modified"] = timestamp()
+    unset_fields = [f for f, v in vertex.items() if v == STRAWBERRY_UNSET]
+    for field in unset_fields:
+        vertex.pop(field)
+
+    storage = await resolve_vertex_storage(vertex, storage_def)
+    new = (
+        await _execute(
+            storage.db,
+            "UPDATE @doc IN @@collection RETURN NEW",
+            {"doc": _with_key(vertex), "@collection": storage.collection.name},
+        )
+    )[0]
+    graph_ops.invalidate_cached([new["_id"]])
+    return new
+
+
+async def delete_vertex(
+    vertex_def: type[BaseVertex], id: str, storage_def=None
+) -> bool:
+    """Deletes the vertex with `id` and its edges (through the graph API)"""
+    storage = await resolve_vertex_storage(vertex_def, storage_def)
+    try:
+        return await storage.collection.delete({"_id": id})
+    except ArangoError as e:
+        raise DataOpsException(f"arangoasync.exceptions.{type(e).__name__}: {e}")
+    finally:
+        graph_ops.invalidate_cached([id])
+        if graph_ops.write_listeners:
+            graph_ops.notify_written(
+                collections=graph_ops._edge_collections_of(storage.collection.name)
+            )
+
+
+async def get_vertex(
+    vertex_def: type[BaseVertex],
+    search: dict,
+    storage_def=None,
+    fields: list[str] = None,
+) -> dict | None:
+    storage = await resolve_vertex_storage(vertex_def, storage_def)
+    return await _find_one(storage.db, storage.collection.name, search, fields)
+
+
+async def get_or_create_vertex(
+    vertex_def: type[BaseVertex],
+    search: dict,
+    new_doc: dict | None = None,
+    storage_def: dict = None,
+    exclusive: bool = False,
+) -> tuple[bool, dict]:
+    """Async version of `graph_ops.get_or_create_vertex`"""
+    storage = await resolve_vertex_storage(vertex_def, storage_def)
+    vertex = vertex_def(**(new_doc or search))
+    existed, new = await _upsert(storage, search, vertex, exclusive)
+    if not existed:
+        graph_ops.notify_written([new["_id"]])
+    return existed, new
+
+
+async def _upsert(
+    storage, search: dict, doc: dict, exclusive=False, then="", bind_vars=None
+):
+    """Async version of `graph_ops._upsert`, for a single document"""
+    lookup_query, lookup_bind_vars = graph_ops._lookup_query(
+        storage.collection.name, [search]
+    )
+    query, bind_vars = graph_ops._upsert_query(
+        storage.collection.name, [(search, doc)], exclusive, then, bind_vars
+    )
+    for attempt in range(graph_ops.UPSERT_RETRIES + 1):
+        try:
+            [found] = await _execute(storage.db, lookup_query, lookup_bind_vars)
+            if found is not None:
+                return True, found
+            cursor = await storage.db.aql.execute(query, bind_vars=bind_vars)
+            [row] = [row async for row in cursor]
+            return row["existed"], row["doc"]
+        except AQLQueryExecuteError as e:
+            if (
+                e.error_code not in graph_ops.UPSERT_CONFLICT_ERRORS
+                or attempt == graph_ops.UPSERT_RETRIES
+            ):
+                raise DataOpsException(
+                    f"arangoasync.exceptions.AQLQueryExecuteError: {e}"
+                )
+
+
+async def get_vertices_by_id(
+    vertex_def: type[BaseVertex], ids: Iterable[str], storage_def=None
+) -> dict[str, dict]:
+    """Async version of `graph_ops.get_vertices_by_id`"""
+    storage = await resolve_vertex_storage(vertex_def, storage_def)
+    ids = list(dict.fromkeys(ids))
+    if not ids:
+        return {}
+    docs = await _execute(
+        storage.db,
+        "FOR d IN DOCUMENT(@ids) RETURN d",
+        {"ids": ids},
+        batch_size=len(ids),
+    )
+    return {doc["_id"]: doc for doc in docs}
+
+
+async def get_vertices_by_key(
+    vertex_def: type[BaseVertex], keys: Iterable[str], storage_def=None
+) -> dict[str, dict]:
+    """Async version of `graph_ops.get_vertices_by_key`"""
+    storage = await resolve_vertex_storage(vertex_def, storage_def)
+    keys = list(dict.fromkeys(keys))
+    if not keys:
+        return {}
+    docs = await _execute(
+        storage.db,
+        "FOR d IN DOCUMENT(@collection, @keys) RETURN d",
+        {"collection": storage.collection.name, "keys": keys},
+        batch_size=len(keys),
+    )
+    return {doc["_key"]: doc for doc in docs}
+
+
+async def get_vertices_by_field(
+    vertex_def: type[BaseVertex], field: str, values: Iterable, storage_def=None
+) -> dict:
+    """Async version of `graph_ops.get_vertices_by_field`"""
+    storage = await resolve_vertex_storage(vertex_def, storage_def)
+    values = list(dict.fromkeys(values))
+    if not values:
+        return {}
+    docs = await _execute(
+        storage.db,
+        "FOR d IN @@collection FILTER d.@field IN @values RETURN d",
+        {"@collection": storage.collection.name, "field": field, "values": values},
+        batch_size=len(values),
+    )
+    return {doc[field]: doc for doc in docs}
+
+
+async def create_edge(
+    edge: BaseEdge, storage_def=None, stream_transaction=False
+) -> dict:
+    """
+    Async version of `graph_ops.create_edge`. The edge and the flags of its vertices
+    are always written by one AQL statement.
+    """
+    if not isinstance(edge, BaseEdge):
+        raise DataOpsException("`edge` must be an instance of BaseEdge")
+
+    storage = await resolve_edge_storage(edge, storage_def)
+    query, bind_vars, write_collections = graph_ops._create_edge_query(
+        storage.collection.name, edge
+    )
+    new = (
+        await _execute_write_query(
+            storage.db, query, bind_vars, write_collections, stream_transaction
+        )
+    )[0]
+    graph_ops.invalidate_cached([new["_id"], new["_from"], new["_to"]])
+    return new
+
+
+async def update_edge(edge: BaseEdge, storage_def=None) -> dict:
+    if not isinstance(edge, BaseEdge):
+        raise DataOpsException("`edge` must be an instance of BaseEdge")
+
+    if "created" in edge:
+        del edge["created"]
+    edge["modified"] = timestamp()
+
+    storage = await resolve_edge_storage(edge, storage_def)
+    new = (
+        await _execute(
+            storage.db,
+            "UPDATE @doc IN @@collection RETURN NEW",
+            {"doc": _with_key(edge), "@collection": storage.collection.name},
+        )
+    )[0]
+    graph_ops.invalidate_cached([new["_id"]])
+    return new
+
+
+async def delete_edge(
+    edge_def: type[BaseEdge], id: str, storage_def=None, stream_transaction=False
+) -> bool:
+    """Async version of `graph_ops.delete_edge`, always done by one AQL statement"""
+    if storage_def is None:
+        storage_def = edge_def.default_storage
+    storage = await resolve_edge_storage(edge_def, storage_def)
+    query, bind_vars, write_collections = graph_ops._delete_edge_query(
+        storage.graph.name, storage.collection.name, storage_def, id
+    )
+    rows = await _execute_write_query(
+        storage.db, query, bind_vars, write_collections, stream_transaction
+    )
+    graph_ops.invalidate_cached([id, *(vertex_id for row in rows for vertex_id in row)])
+    return bool(rows)
+
+
+async def get_edge(
+    edge_def: type[BaseEdge],
+    search: dict = None,
+    frm: BaseVertex = None,
+    to: BaseVertex = None,
+    storage_def=None,
+    fields: list[str] = None,
+) -> dict | None:
+    search = _handle_get_edge_search_args(search, frm, to)
+    storage = await resolve_edge_storage(edge_def, storage_def)
+    return await _find_one(storage.db, storage.collection.name, search, fields)
+
+
+async def get_or_create_edge(
+    edge_def: type[BaseEdge],
+    search: dict = None,
+    frm: BaseVertex = None,
+    to: BaseVertex = None,
+    new_doc: dict = None,
+    storage_def=None,
+    exclusive: bool = False,
+) -> tuple[bool, dict]:
+    """Async version of `graph_ops.get_or_create_edge`"""
+    search = _handle_get_edge_search_args(search, frm, to)
+    if new_doc:
+        new_doc = _handle_get_edge_search_args(new_doc, frm, to)
+    else:
+        new_doc = dict(search)
+    edge = edge_def(**new_doc)
+    if "_from" not in edge or "_to" not in edge:
+        raise DataOpsException("`edge` must have `_from` and `_to` set")
+
+    storage = await resolve_edge_storage(edge_def, storage_def)
+    then, bind_vars = graph_ops._edge_flags_then(edge, storage.collection.name)
+    existed, new = await _upsert(storage, search, edge, exclusive, then, bind_vars)
+    if not existed:
+        graph_ops.invalidate_cached([new["_id"], new["_from"], new["_to"]])
+    return existed, new
+
+
+async def list_vertex_edges(
+    vertex_def: type[BaseVertex],
+    vertex_id: str,
+    outbound_only: bool = False,
+    inbound_only: bool = False,
+    limit: int = None,
+    after: tuple[str, str] = None,
+    vertex_fields: list[str] = None,
+    edge_fields: list[str] = None,
+) -> list[dict]:
+    """Async version of `graph_ops.list_vertex_edges`. Returns a list of rows
+    rather than a cursor; use `iter_vertex_edges` to go through large
+    neighbourhoods."""
+    storage = await resolve_vertex_storage(vertex_def)
+    query, bind_vars = graph_ops._list_vertex_edges_query(
+        storage.graph.name,
+        vertex_id,
+        outbound_only,
+        inbound_only,
+        limit,
+        after,
+        vertex_fields,
+        edge_fields,
+    )
+    return await _execute(storage.db, query, bind_vars, batch_size=limit)
+
+
+async def iter_vertex_edges(
+    vertex_def: type[BaseVertex],
+    vertex_id: str,
+    outbound_only: bool = False,
+    inbound_only: bool = False,
+    page_size: int = 100,
+    after: tuple[str, str] = None,
+    vertex_fields: list[str] = None,
+    edge_fields: list[str] = None,
+):
+    """Async generator version of `graph_ops.iter_vertex_edges`"""
+    while True:
+        rows = await list_vertex_edges(
+            vertex_def,
+            vertex_id,
+            outbound_only=outbound_only,
+            inbound_only=inbound_only,
+            limit=page_size,
+            after=after,
+            vertex_fields=vertex_fields,
+            edge_fields=edge_fields,
+        )
+        for row in rows:
+            yield row
+        if len(rows) < page_size:
+            return
+        after = edge_cursor(rows[-1])
+
+
+async def list_edges_for_vertices(
+    vertex_def: type[BaseVertex],
+    vertex_ids: list[str],
+    outbound_only: bool = False,
+    inbound_only: bool = False,
+    per_vertex_limit: int = None,
+    vertex_fields: list[str] = None,
+    edge_fields: list[str] = None,
+) -> dict[str, list[dict]]:
+    """Async version of `graph_ops.list_edges_for_vertices`"""
+    vertex_ids = list(dict.fromkeys(vertex_ids))
+    if not vertex_ids:
+        return {}
+    storage = await resolve_vertex_storage(vertex_def)
+    query, bind_vars = graph_ops._list_edges_for_vertices_query(
+        storage.graph.name,
+        vertex_ids,
+        outbound_only,
+        inbound_only,
+        per_vertex_limit,
+        vertex_fields,
+        edge_fields,
+    )
+    grouped = {vertex_id: [] for vertex_id in vertex_ids}
+    for res in await _execute(storage.db, query, bind_vars, batch_size=len(vertex_ids)):
+        grouped[res["vertex_id"]] = res["edges"]
+    return grouped
+
+
+async def traverse(
+    vertex_def: type[BaseVertex],
+    start: str | dict | list[str | dict],
+    batch_size: int = None,
+    **kwargs,
+) -> list[dict]:
+    """Async version of `graph_ops.traverse`. Returns a list of rows rather than a
+    cursor, so pass a `limit` for potentially large traversals."""
+    storage = await resolve_vertex_storage(vertex_def)
+    if not isinstance(start, list):
+        start = [start]
+    start_ids = [s["_id"] if isinstance(s, dict) else s for s in start]
+    query, bind_vars = graph_ops._traverse_query(
+        storage.graph.name, start_ids, **kwargs
+    )
+    return await _execute(
+        storage.db,
+        query,
+        bind_vars,
+        batch_size=batch_size,
+        options={"stream": True},
+    )
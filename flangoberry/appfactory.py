@@ -1,14 +1,34 @@
-from flask import Flask
-from strawberry.flask.views import GraphQLView
+import os
+from flask import Flask, Config
+from flangoberry.graphql.views import GraphQLView, AsyncGraphQLView
+from flangoberry.graphql import executor
+from flangoberry.graphql.cost import QueryCostLimiter
+from flangoberry.graphql.helpers import with_schema_extensions
+from flangoberry.graphql.persisted_queries import (
+    PersistedQueries,
+    document_caches,
+    load_allow_list,
+)
+from flangoberry.graphql.response_cache import ResponseCache
 from flangoberry.tests.schema import schema
 from flangoberry.db import get_connection
+from flangoberry import graph_ops
 from flask_cors import CORS
 # from flangoberry import settings
 
 
-def create_app(settings_file="default_settings.py", schema=schema, test_config=None):
+def create_app(
+    settings_file="default_settings.py",
+    schema=schema,
+    test_config=None,
+    graph_defs=None,
+):
     """Utility to create and preconfigure Flask app. If schema is not provided,
-    `flangoberry.tests.schema` will be used."""
+    `flangoberry.tests.schema` will be used.
+
+    If the BOOTSTRAP_SCHEMA setting is enabled, the schema for `graph_defs` (or
+    all discovered BaseVertex/BaseEdge subclasses if not provided) is provisioned
+    before the app is returned."""
 
     #
     # App and config
@@ -28,6 +48,11 @@ def create_app(settings_file="default_settings.py", schema=schema, test_config=N
         dbsettings = app.config["TEST_DBCONF"]
     app.config["DBCONN"] = get_connection(dbsettings=dbsettings)
 
+    if app.config["BOOTSTRAP_SCHEMA"]:
+        app.config["SCHEMA_BOOTSTRAP_SUMMARY"] = graph_ops.bootstrap_schema(
+            graph_defs, assume_present=app.config["BOOTSTRAP_ASSUME_SCHEMA_PRESENT"]
+        )
+
     #
     # Routes
     #
@@ -37,12 +62,39 @@ def create_app(settings_file="default_settings.py", schema=schema, test_config=N
         """Basic info display"""
         return "Drink flangoberry for flowery fluctuations"
 
+    view_class = GraphQLView
+    if app.config["GRAPHQL_ASYNC"]:
+        view_class = AsyncGraphQLView
+        executor.configure_executor(app.config["GRAPHQL_EXECUTOR_WORKERS"])
+    response_cache = None
+    if app.config["GRAPHQL_RESPONSE_CACHE"]:
+        response_cache = ResponseCache(
+            max_size=app.config["GRAPHQL_RESPONSE_CACHE_MAX_SIZE"],
+            default_max_age=app.config["GRAPHQL_RESPONSE_CACHE_DEFAULT_MAX_AGE"],
+            vary_headers=app.config["GRAPHQL_RESPONSE_CACHE_VARY_HEADERS"],
+        )
+        app.extensions["graphql_response_cache"] = response_cache
+    persisted_queries = None
+    if app.config["GRAPHQL_PERSISTED_QUERIES"]:
+        allow_list = None
+        if app.config["GRAPHQL_PERSISTED_QUERIES_ALLOW_LIST"]:
+            allow_list = load_allow_list(
+                app.config["GRAPHQL_PERSISTED_QUERIES_ALLOW_LIST"]
+            )
+        persisted_queries = PersistedQueries(
+            max_size=app.config["GRAPHQL_PERSISTED_QUERIES_MAX_SIZE"],
+            allow_list=allow_list,
+        )
+    schema = with_schema_extensions(schema, schema_extensions(app.config))
+    app.extensions["graphql_schema"] = schema
     app.add_url_rule(
         "/graphql",
-        view_func=GraphQLView.as_view(
+        view_func=view_class.as_view(
             "graphql",
             schema=schema,
             graphiql=app.config["SHOW_GRAPHIQL"],
+            persisted_queries=persisted_queries,
+            response_cache=response_cache,
         ),
     )
 
@@ -52,3 +104,66 @@ def create_app(settings_file="default_settings.py", schema=schema, test_config=N
     CORS(app, resources=app.config["CORS_RESOURCES"])
 
     return app
+
+
+def schema_extensions(config) -> list:
+    """Returns the schema extensions enabled by the settings: the document caches
+    (GRAPHQL_DOCUMENT_CACHE_SIZE), and a `QueryCostLimiter` if any of the
+    GRAPHQL_MAX_QUERY_* settings is set"""
+    extensions = []
+    if config["GRAPHQL_DOCUMENT_CACHE_SIZE"]:
+        extensions += document_caches(config["GRAPHQL_DOCUMENT_CACHE_SIZE"])
+    if config["GRAPHQL_MAX_QUERY_COST"] is not None or (
+        config["GRAPHQL_MAX_QUERY_DEPTH"] is not None
+    ):
+        extensions.append(
+            QueryCostLimiter(
+                max_cost=config["GRAPHQL_MAX_QUERY_COST"],
+                max_depth=config["GRAPHQL_MAX_QUERY_DEPTH"],
+                field_costs=config["GRAPHQL_FIELD_COSTS"],
+                default_list_size=config["GRAPHQL_DEFAULT_LIST_SIZE"],
+            )
+        )
+    return extensions
+
+
+def create_asgi_app(
+    settings_file="default_settings.py",
+    schema=schema,
+    test_config=None,
+    graph_defs=None,
+):
+    """ASGI variant of `create_app` that only serves the GraphQL schema, with
+    Strawberry's async view and `flangoberry.aio_graph_ops` based loaders (see
+    `flangoberry.graphql.asgi.GraphQL`). Settings are loaded the same way as for
+    `create_app`; CORS_RESOURCES is not applied, use ASGI middleware instead.
+
+    `aio_graph_ops` doesn't provision the schema, so either enable the
+    BOOTSTRAP_SCHEMA setting or make sure the schema is present beforehand.
+
+    Example: `uvicorn --factory flangoberry.appfactory:create_asgi_app`"""
+    from flangoberry.graphql.asgi import GraphQL
+
+    config = Config(os.path.dirname(os.path.abspath(__file__)))
+    config.from_pyfile(settings_file)
+    if test_config:
+        config.from_mapping(test_config)
+
+    dbsettings = config["DBCONF"]
+    if config["USE_TEST_DBCONF"]:
+        dbsettings = config["TEST_DBCONF"]
+    # The async connections are established lazily within the server's event loop,
+    # from the settings of the sync connection.
+    config["DBCONN"] = get_connection(dbsettings=dbsettings)
+
+    if config["BOOTSTRAP_SCHEMA"]:
+        config["SCHEMA_BOOTSTRAP_SUMMARY"] = graph_ops.bootstrap_schema(
+            graph_defs, assume_present=config["BOOTSTRAP_ASSUME_SCHEMA_PRESENT"]
+        )
+
+    executor.configure_executor(config["GRAPHQL_EXECUTOR_WORKERS"])
+    schema = with_schema_extensions(schema, schema_extensions(config))
+    app = GraphQL(schema, graphiql=config["SHOW_GRAPHIQL"])
+    app.request_concurrency = config["GRAPHQL_REQUEST_CONCURRENCY"]
+    app.config = config
+    return app
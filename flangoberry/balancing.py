@@ -0,0 +1,149 @@
+import itertools
+import threading
+import time
+import requests
+from arango.resolver import HostResolver
+from flangoberry import logger
+
+STRATEGIES = ("roundrobin", "least_latency")
+
+
+class HealthAwareHostResolver(HostResolver):
+    """
+    python-arango host resolver for multi-coordinator deployments, configured with
+    the `load_balancing` option of a connection's `client_conf` (see DBCONF in
+    `flangoberry.default_settings`).
+
+    * `strategy` picks among the healthy hosts: "roundrobin", or "least_latency"
+      (lowest moving average of request latency).
+    * A host is ejected after `unhealthy_threshold` consecutive failed requests
+      (connection errors or 503s), and re-admitted once a background health probe
+      (a GET of `probe_path` every `probe_interval` seconds) succeeds. Probes of
+      healthy hosts also keep their latency up to date.
+    * If no healthy host is left, requests are spread over all of them.
+
+    Requests and their latency are reported by `flangoberry.db.PooledHTTPClient`
+    (see `record`), and per host counters are returned by `stats`.
+    """
+
+    def __init__(
+        self,
+        hosts: list[str],
+        strategy: str = "roundrobin",
+        max_tries: int = None,
+        unhealthy_threshold: int = 2,
+        probe_interval: float = 5.0,
+        probe_timeout: float = 1.0,
+        probe_path: str = "/_admin/server/availability",
+        latency_decay: float = 0.3,
+    ):
+        if strategy not in STRATEGIES:
+            raise ValueError(f"`strategy` must be one of {STRATEGIES}")
+        super().__init__(len(hosts), max_tries)
+        self.hosts = [host.strip("/") for host in hosts]
+        self.strategy = strategy
+        self.unhealthy_threshold = unhealthy_threshold
+        self.probe_interval = probe_interval
+        self.probe_timeout = probe_timeout
+        self.probe_path = probe_path
+        self.latency_decay = latency_decay
+        self.host_stats = {
+            host: {
+                "healthy": True,
+                "requests": 0,
+                "failures": 0,
+                "consecutive_failures": 0,
+                "ejections": 0,
+                "latency": None,
+            }
+            for host in self.hosts
+        }
+        self._lock = threading.Lock()
+        self._counter = itertools.count()
+        self._stop = threading.Event()
+        self._prober = None
+        if probe_interval:
+            self._prober = threading.Thread(
+                target=self._probe_loop, name="flangoberry-db-probes", daemon=True
+            )
+            self._prober.start()
+
+    def get_host_index(self, indexes_to_filter: set[int] = None) -> int:
+        indexes_to_filter = indexes_to_filter or set()
+        with self._lock:
+            candidates = [
+                i
+                for i, host in enumerate(self.hosts)
+                if self.host_stats[host]["healthy"] and i not in indexes_to_filter
+            ]
+            if not candidates:
+                candidates = [
+                    i for i in range(self.host_count) if i not in indexes_to_filter
+                ] or list(range(self.host_count))
+            if self.strategy == "least_latency":
+                # Hosts without measurements are tried first
+                return min(
+                    candidates,
+                    key=lambda i: self.host_stats[self.hosts[i]]["latency"] or 0.0,
+                )
+            return candidates[next(self._counter) % len(candidates)]
+
+    def record(self, host: str, latency: float, ok: bool):
+        """Records the outcome of a request to `host` (ignored for unknown hosts)"""
+        with self._lock:
+            stats = self.host_stats.get(host.strip("/"))
+            if stats is None:
+                return
+            stats["requests"] += 1
+            if ok:
+                stats["consecutive_failures"] = 0
+                self._record_latency(stats, latency)
+                return
+            stats["failures"] += 1
+            stats["consecutive_failures"] += 1
+            if stats["healthy"] and (
+                stats["consecutive_failures"] >= self.unhealthy_threshold
+            ):
+                stats["healthy"] = False
+                stats["ejections"] += 1
+                logger.warning(f"Ejected unhealthy database host {host}")
+
+    def _record_latency(self, stats: dict, latency: float):
+        if stats["latency"] is None:
+            stats["latency"] = latency
+        else:
+            stats["latency"] += self.latency_decay * (latency - stats["latency"])
+
+    def probe(self):
+        """Probes all hosts once, re-admitting the ones that respond"""
+        for host in self.hosts:
+            start = time.perf_counter()
+            try:
+                res = requests.get(host + self.probe_path, timeout=self.probe_timeout)
+                ok = res.status_code < 500
+            except requests.RequestException:
+                ok = False
+            latency = time.perf_counter() - start
+            with self._lock:
+                stats = self.host_stats[host]
+                if ok:
+                    self._record_latency(stats, latency)
+                    if not stats["healthy"]:
+                        stats["healthy"] = True
+                        stats["consecutive_failures"] = 0
+                        logger.info(f"Re-admitted database host {host}")
+
+    def _probe_loop(self):
+        while not self._stop.wait(self.probe_interval):
+            try:
+                self.probe()
+            except Exception as e:  # pragma: no cover
+                logger.warning(f"Database host probes failed: {e}")
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {host: dict(stats) for host, stats in self.host_stats.items()}
+
+    def close(self):
+        """Stops the background probes (see `flangoberry.db.close_connections`)"""
+        self._stop.set()
@@ -0,0 +1,79 @@
+import threading
+import time
+from collections import OrderedDict
+
+
+class LRUCache:
+    """
+    Thread-safe in-process LRU cache with an optional TTL, and the default backend of
+    the graph_ops document cache (see `flangoberry.graph_ops.document_cache`).
+
+    Entries can be tagged, so that all entries with a tag can be dropped at once
+    (graph_ops tags documents with their `_id`, collection, and for edges the ids
+    of their vertices). Other backends (e.g. a shared cache) need to provide the
+    same `get`, `set`, `delete`, `invalidate_tags` and `clear` methods.
+    """
+
+    def __init__(self, max_size: int = 10000, ttl: float = None):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._tags = {}
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, key, default=None):
+        with self._lock:
+            try:
+                value, expires_at, tags = self._entries[key]
+            except KeyError:
+                return default
+            if expires_at is not None and expires_at < time.monotonic():
+                self._delete(key)
+                return default
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key, value, tags=()):
+        with self._lock:
+            if key in self._entries:
+                self._delete(key)
+            expires_at = time.monotonic() + self.ttl if self.ttl else None
+            self._entries[key] = (value, expires_at, tuple(tags))
+            for tag in tags:
+                self._tags.setdefault(tag, set()).add(key)
+            while len(self._entries) > self.max_size:
+                self._delete(next(iter(self._entries)))
+
+    def delete(self, key):
+        with self._lock:
+            if key in self._entries:
+                self._delete(key)
+
+    def invalidate_tags(self, tags) -> int:
+        """Drops the entries that have any of `tags`. Returns the number of entries
+        dropped."""
+        dropped = 0
+        with self._lock:
+            for tag in tags:
+                for key in self._tags.pop(tag, ()):
+                    if key in self._entries:
+                        self._delete(key)
+                        dropped += 1
+        return dropped
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._tags.clear()
+
+    def _delete(self, key):
+        value, expires_at, tags = self._entries.pop(key)
+        for tag in tags:
+            keys = self._tags.get(tag)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._tags[tag]
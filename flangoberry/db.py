@@ -1,38 +1,232 @@
+import os
+import threading
+import time
 from arango import ArangoClient
+from arango.http import DefaultHTTPClient, DeflateRequestCompression
+from requests.exceptions import ConnectionError, RetryError
+from flangoberry.balancing import HealthAwareHostResolver
 
 connections = {}
 
+#
+# Guards `connections` (and the `dbs` of each connection), so that threads racing
+# for a missing connection don't create duplicate clients.
+#
+_lock = threading.RLock()
+
+#
+# `client_conf` options that configure the HTTP client (see `PooledHTTPClient`)
+# rather than `ArangoClient` itself. `request_timeout` is used by both.
+#
+HTTP_CLIENT_OPTIONS = (
+    "request_timeout",
+    "retry_attempts",
+    "backoff_factor",
+    "pool_connections",
+    "pool_maxsize",
+    "pool_timeout",
+    "keep_alive",
+)
+
 
 class DBException(Exception):
     pass
 
 
-def get_connection(alias="default", dbsettings=None):
-    try:
-        return connections[alias]
-    except KeyError:
-        if not dbsettings:
-            raise DBException(
-                "Database settings must be provided "
-                "to establish an initial connection."
-            )
-        conf = dbsettings[alias]
-        connections[alias] = {
-            "alias": alias,
-            "client_conf": conf["client_conf"],
-            "db_connect_conf": conf["db_connect_conf"],
+class PooledHTTPClient(DefaultHTTPClient):
+    """
+    python-arango's default HTTP client (a pooled `requests` session per host),
+    with an option to disable keep-alive, and utilisation statistics (see
+    `pool_stats`). Outcomes of requests are reported to `resolver` if set (see
+    `flangoberry.balancing.HealthAwareHostResolver`).
+    """
+
+    def __init__(self, keep_alive: bool = True, resolver=None, **kwargs):
+        super().__init__(**kwargs)
+        self.keep_alive = keep_alive
+        self.resolver = resolver
+        self.pool_maxsize = kwargs.get("pool_maxsize", 10)
+        self.sessions = {}
+        self._session_hosts = {}
+        self.requests = 0
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self._stats_lock = threading.Lock()
+
+    def create_session(self, host: str):
+        session = super().create_session(host)
+        if not self.keep_alive:
+            session.headers["Connection"] = "close"
+        self.sessions[host] = session
+        self._session_hosts[id(session)] = host
+        return session
+
+    def send_request(self, session, method, url, *args, **kwargs):
+        with self._stats_lock:
+            self.requests += 1
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        ok = False
+        start = time.perf_counter()
+        try:
+            try:
+                response = super().send_request(session, method, url, *args, **kwargs)
+            except RetryError as e:
+                # Retries of 5xx responses that ran out (e.g. of an unavailable
+                # coordinator) are surfaced as connection errors, which python-arango
+                # fails over to another host on, like for 503s
+                raise ConnectionError(e)
+            ok = response.status_code != 503
+            return response
+        finally:
+            latency = time.perf_counter() - start
+            with self._stats_lock:
+                self.in_flight -= 1
+            if self.resolver is not None and id(session) in self._session_hosts:
+                self.resolver.record(self._session_hosts[id(session)], latency, ok)
+
+    def stats(self) -> dict:
+        hosts = {}
+        for host, session in self.sessions.items():
+            opened = idle = 0
+            for adapter in set(session.adapters.values()):
+                pools = adapter.poolmanager.pools
+                for key in pools.keys():
+                    pool = pools[key]
+                    opened += pool.num_connections
+                    # The pool queue holds idle connections, and `None` for the
+                    # slots that haven't been used yet
+                    if pool.pool is not None:
+                        idle += sum(1 for conn in list(pool.pool.queue) if conn)
+            hosts[host] = {"connections_opened": opened, "idle_connections": idle}
+        capacity = self.pool_maxsize * len(self.sessions)
+        return {
+            "pool_maxsize": self.pool_maxsize,
+            "requests": self.requests,
+            "in_flight": self.in_flight,
+            "max_in_flight": self.max_in_flight,
+            "utilisation": self.in_flight / capacity if capacity else 0.0,
+            "hosts": hosts,
         }
-        connections[alias]["client"] = ArangoClient(**conf["client_conf"])
-        connections[alias]["dbs"] = {}
-        return connections[alias]
+
+
+def create_client(client_conf: dict) -> ArangoClient:
+    """Creates an `ArangoClient` from a `client_conf` (see DBCONF in
+    `flangoberry.default_settings` for the supported options)"""
+    client_conf = dict(client_conf)
+    http_conf = {
+        option: client_conf.pop(option)
+        for option in HTTP_CLIENT_OPTIONS
+        if option in client_conf
+    }
+    if "request_timeout" in http_conf:
+        client_conf["request_timeout"] = http_conf["request_timeout"]
+    if load_balancing := client_conf.pop("load_balancing", None):
+        hosts = client_conf["hosts"]
+        if isinstance(hosts, str):
+            hosts = hosts.split(",")
+        http_conf["resolver"] = HealthAwareHostResolver(
+            list(hosts),
+            max_tries=client_conf.pop("resolver_max_tries", None),
+            **load_balancing,
+        )
+        client_conf["host_resolver"] = http_conf["resolver"]
+    if "http_client" not in client_conf:
+        client_conf["http_client"] = PooledHTTPClient(**http_conf)
+
+    request_compression = client_conf.get("request_compression")
+    if request_compression is True:
+        client_conf["request_compression"] = DeflateRequestCompression()
+    elif isinstance(request_compression, dict):
+        client_conf["request_compression"] = DeflateRequestCompression(
+            **request_compression
+        )
+    return ArangoClient(**client_conf)
+
+
+def _check_pid(conn: dict):
+    """Clients (and their pooled sockets) must not be shared with forked processes,
+    so they are rebuilt when used from a new pid"""
+    if conn["pid"] != os.getpid():
+        # The sessions belong to the parent process, only the probes are stopped
+        _stop_probes(conn["client"])
+        conn["client"] = create_client(conn["client_conf"])
+        conn["dbs"] = {}
+        conn["pid"] = os.getpid()
+
+
+def _stop_probes(client: ArangoClient):
+    """Stops the background health probes of a load balanced `client`"""
+    resolver = getattr(getattr(client, "_http", None), "resolver", None)
+    if resolver is not None:
+        resolver.close()
+
+
+def close_connections():
+    """Closes the HTTP sessions (and stops the health probes) of all connections,
+    which are established again by `get_connection` with settings"""
+    with _lock:
+        while connections:
+            alias, conn = connections.popitem()
+            _stop_probes(conn["client"])
+            conn["client"].close()
+
+
+def get_connection(alias="default", dbsettings=None):
+    with _lock:
+        try:
+            conn = connections[alias]
+        except KeyError:
+            if not dbsettings:
+                raise DBException(
+                    "Database settings must be provided "
+                    "to establish an initial connection."
+                )
+            conf = dbsettings[alias]
+            connections[alias] = {
+                "alias": alias,
+                "client_conf": conf["client_conf"],
+                "db_connect_conf": conf["db_connect_conf"],
+            }
+            connections[alias]["client"] = create_client(conf["client_conf"])
+            connections[alias]["dbs"] = {}
+            connections[alias]["pid"] = os.getpid()
+            return connections[alias]
+        _check_pid(conn)
+        return conn
 
 
 def get_db(db_alias, connection_alias="default"):
-    conn = get_connection(connection_alias)
-    try:
-        return conn["dbs"][db_alias]
-    except KeyError:
-        db_conf = conn["db_connect_conf"][db_alias]
-        # print(db_conf)
-        conn["dbs"][db_alias] = conn["client"].db(**db_conf)
+    # Lock-free fast path for established connections
+    conn = connections.get(connection_alias)
+    if conn and conn["pid"] == os.getpid() and db_alias in conn["dbs"]:
         return conn["dbs"][db_alias]
+
+    with _lock:
+        conn = get_connection(connection_alias)
+        try:
+            return conn["dbs"][db_alias]
+        except KeyError:
+            db_conf = conn["db_connect_conf"][db_alias]
+            # print(db_conf)
+            conn["dbs"][db_alias] = conn["client"].db(**db_conf)
+            return conn["dbs"][db_alias]
+
+
+def pool_stats(alias=None) -> dict:
+    """Returns HTTP pool utilisation statistics of each connection (or of the
+    connection with `alias`), for connections using `PooledHTTPClient`. Per host
+    health, request and latency counters are included for load balanced
+    connections."""
+    with _lock:
+        aliases = [alias] if alias else list(connections)
+        stats = {}
+        for conn_alias in aliases:
+            http_client = getattr(connections[conn_alias]["client"], "_http", None)
+            if not isinstance(http_client, PooledHTTPClient):
+                continue
+            stats[conn_alias] = http_client.stats()
+            if http_client.resolver is not None:
+                for host, host_stats in http_client.resolver.stats().items():
+                    stats[conn_alias]["hosts"].setdefault(host, {}).update(host_stats)
+        return stats
@@ -9,6 +9,66 @@ VERSION = "0.1.0"
 #
 SHOW_GRAPHIQL = True
 
+#
+# Whether to serve the schema with Strawberry's async Flask view, which allows
+# async resolvers (e.g. ones using the DataLoaders in `info.context["loaders"]`).
+# Requires Flask's async extra (asgiref), which flangoberry depends on
+# (`Flask = { extras = ["async"] }` in pyproject.toml).
+#
+GRAPHQL_ASYNC = False
+
+#
+# Size of the thread pool that the async views use to run sync graph_ops calls
+# (see `flangoberry.graphql.executor`), and the number of those calls a single
+# request may run at once (None for no per-request limit). Keep the pool within
+# the connection pool size of the Arango client (10 by default).
+#
+GRAPHQL_EXECUTOR_WORKERS = 8
+GRAPHQL_REQUEST_CONCURRENCY = 4
+
+#
+# Cache of the responses of GraphQL query operations (see
+# `flangoberry.graphql.response_cache`), keyed by the query, variables, operation
+# name and the values of GRAPHQL_RESPONSE_CACHE_VARY_HEADERS (e.g. add
+# "Authorization" if responses depend on the user). Responses are kept for
+# DEFAULT_MAX_AGE seconds, or less if resolvers hint so with `cache_hint`, and
+# dropped on graph_ops writes to the collections they were read from.
+#
+GRAPHQL_RESPONSE_CACHE = False
+GRAPHQL_RESPONSE_CACHE_MAX_SIZE = 1000
+GRAPHQL_RESPONSE_CACHE_DEFAULT_MAX_AGE = 60
+GRAPHQL_RESPONSE_CACHE_VARY_HEADERS = ()
+
+#
+# Number of parsed and of validated GraphQL documents to keep in LRU caches, so
+# that repeated queries skip parsing and validation (0 to disable).
+#
+GRAPHQL_DOCUMENT_CACHE_SIZE = 1000
+
+#
+# Automatic persisted queries (see `flangoberry.graphql.persisted_queries`):
+# clients may send the sha256 hash of a query instead of its text, once it has
+# been registered. With an ALLOW_LIST file (a JSON list of queries, or an object
+# of queries keyed by their hash), only the queries in it are accepted; note that
+# this includes GraphiQL's introspection query.
+#
+GRAPHQL_PERSISTED_QUERIES = False
+GRAPHQL_PERSISTED_QUERIES_MAX_SIZE = 10000
+GRAPHQL_PERSISTED_QUERIES_ALLOW_LIST = None
+
+#
+# Limits of the estimated cost and depth of GraphQL operations (None for no
+# limit), enforced before execution (see `flangoberry.graphql.cost`). Fields of
+# object types cost 1 and scalars 0, unless set in GRAPHQL_FIELD_COSTS (e.g.
+# {"Query.exampleNodes": 5}), and selections of list fields are multiplied by
+# their `limit` argument, or GRAPHQL_DEFAULT_LIST_SIZE without one. The cost is
+# returned in the `cost` extension of responses.
+#
+GRAPHQL_MAX_QUERY_COST = None
+GRAPHQL_MAX_QUERY_DEPTH = None
+GRAPHQL_FIELD_COSTS = {}
+GRAPHQL_DEFAULT_LIST_SIZE = 10
+
 #
 # CORS
 #
@@ -33,6 +93,21 @@ CORS_RESOURCES = {
 #
 USE_TEST_DBCONF = False
 
+#
+# Whether appfactory should provision graphs, collections, edge definitions and
+# indexes for all BaseVertex/BaseEdge subclasses at startup (see
+# `flangoberry.graph_ops.bootstrap_schema`). Graph defs must be imported before
+# `create_app` is called for them to be discovered, or passed in explicitly via
+# the `graph_defs` param of `create_app`.
+#
+BOOTSTRAP_SCHEMA = False
+
+#
+# If BOOTSTRAP_SCHEMA is enabled, whether graph_ops should then skip all schema
+# metadata calls and assume the schema is present.
+#
+BOOTSTRAP_ASSUME_SCHEMA_PRESENT = True
+
 #
 # List of db aliases and respective configuration details
 # for the app.
@@ -48,6 +123,31 @@ DBCONF = {
     "default": {
         "client_conf": {
             "hosts": ("http://localhost:8529",),
+            #
+            # Optional HTTP client tuning (see `flangoberry.db.create_client`).
+            # Keep `pool_maxsize` at or above the number of threads that query
+            # the database concurrently (e.g. GRAPHQL_EXECUTOR_WORKERS).
+            #
+            # "request_timeout": 60,
+            # "retry_attempts": 3,
+            # "backoff_factor": 1.0,
+            # "pool_connections": 10,
+            # "pool_maxsize": 10,
+            # "pool_timeout": None,  # If set, wait this long for a free connection
+            # "keep_alive": True,
+            # "request_compression": {"threshold": 1024, "level": 6},
+            # "response_compression": "gzip",
+            #
+            # Optional load balancing over multiple `hosts` (coordinators), with
+            # health probes and failover (see
+            # `flangoberry.balancing.HealthAwareHostResolver`).
+            #
+            # "load_balancing": {
+            #     "strategy": "least_latency",  # or "roundrobin"
+            #     "unhealthy_threshold": 2,
+            #     "probe_interval": 5.0,
+            #     "probe_timeout": 1.0,
+            # },
         },
         "db_connect_conf": {
             "flangoberry": {
@@ -1,6 +1,37 @@
+import json
+from collections.abc import Mapping
+from contextlib import contextmanager
+from contextvars import ContextVar
 from datetime import datetime, timezone
 from typing import Optional
 
+#
+# Timestamp shared by the documents stamped within `batch_timestamp()`
+#
+_batch_now = ContextVar("flangoberry_batch_now", default=None)
+
+
+@contextmanager
+def batch_timestamp(now: datetime = None):
+    """
+    Vertices and edges constructed (and created, updated...) within the block are
+    stamped with the same `created` / `modified` timestamp (`now`, or the time the
+    block was entered), rather than one per document.
+
+    Example: `with batch_timestamp(): vertices = [SomeVertex(name=n) for n in names]`
+    """
+    token = _batch_now.set((now or datetime.now(timezone.utc)).isoformat())
+    try:
+        yield
+    finally:
+        _batch_now.reset(token)
+
+
+def timestamp() -> str:
+    """The current batch timestamp (see `batch_timestamp`), or else the current
+    UTC time, as an ISO string"""
+    return _batch_now.get() or datetime.now(timezone.utc).isoformat()
+
 
 class BaseVertex(dict):
     default_storage = {
@@ -20,7 +51,7 @@ class BaseVertex(dict):
     def __init__(self, set_defaults: bool = True, **kwargs):
         super().__init__(**kwargs)
         if set_defaults:
-            now = datetime.now(timezone.utc).isoformat()
+            now = timestamp()
             if "created" not in self:
                 self["created"] = now
             if "modified" not in self:
@@ -50,7 +81,7 @@ class BaseEdge(dict):
             kwargs["_to"] = kwargs.pop("to")["_id"]
 
         super().__init__(**kwargs)
-        now = datetime.now(timezone.utc).isoformat()
+        now = timestamp()
         if "created" not in self:
             self["created"] = now
         if "modified" not in self:
@@ -63,3 +94,147 @@ class NamedVertex(BaseVertex):
     default_storage = BaseVertex.default_storage | {
         "persistent_indexes": [{"fields": ["name"], "unique": True}],
     }
+
+
+#
+# Fields of compact records (see `record_class`) that every vertex / edge has
+#
+VERTEX_RECORD_FIELDS = (
+    "_id",
+    "_key",
+    "_rev",
+    "created",
+    "modified",
+    "is_root",
+    "is_leaf",
+)
+EDGE_RECORD_FIELDS = ("_id", "_key", "_rev", "_from", "_to", "created", "modified")
+
+_record_classes = {}
+
+
+class CompactRecord(Mapping):
+    """
+    Read-only, slotted representation of a vertex or edge document, which takes a
+    fraction of the memory of a dict. Generated for each graph def by
+    `record_class`, and returned by the graph_ops reads called with `compact=True`.
+
+    Records are mappings (`record["name"]`, `record.get("name")`, `dict(record)`),
+    and the declared fields are also attributes (`record.name`). Fields that
+    aren't declared are kept in a dict.
+    """
+
+    __slots__ = ("_rest", "_loaded")
+    graph_def = None
+    storage_def = None
+    _fields = ()
+    _field_set = frozenset()
+    _lazy_fields = ()
+
+    def __init__(self, doc: dict):
+        rest = None
+        for key, value in doc.items():
+            if key in self._field_set:
+                setattr(self, key, value)
+            else:
+                if rest is None:
+                    rest = {}
+                rest[key] = value
+        self._rest = rest
+        self._loaded = not self._lazy_fields
+
+    def __getattr__(self, name):
+        # Only called for unset slots: lazy fields are loaded on first access
+        if name in self._lazy_fields and not self._loaded:
+            self.load()
+            return getattr(self, name)
+        raise AttributeError(name)
+
+    def __getitem__(self, key):
+        if key in self._field_set:
+            try:
+                return getattr(self, key)
+            except AttributeError:
+                raise KeyError(key)
+        if self._rest is not None and key in self._rest:
+            return self._rest[key]
+        raise KeyError(key)
+
+    def __iter__(self):
+        if not self._loaded:
+            self.load()
+        for field in self._fields:
+            try:
+                getattr(self, field)
+            except AttributeError:
+                continue
+            yield field
+        if self._rest is not None:
+            yield from self._rest
+
+    def __len__(self):
+        return sum(1 for key in self)
+
+    def __repr__(self):
+        return f"{type(self).__name__}({self.to_dict()!r})"
+
+    def to_dict(self) -> dict:
+        return dict(self.items())
+
+    def load(self):
+        """Fetches the lazy fields of the record (see `record_class`)"""
+        from flangoberry import graph_ops
+
+        doc = graph_ops.get_document_fields(
+            self.graph_def, self["_id"], self._lazy_fields, self.storage_def
+        )
+        for field in self._lazy_fields:
+            if doc and field in doc:
+                setattr(self, field, doc[field])
+        self._loaded = True
+
+
+def record_class(
+    graph_def: type[BaseVertex] | type[BaseEdge], storage_def: dict = None
+) -> type[CompactRecord]:
+    """
+    Returns the `CompactRecord` class of `graph_def` (generated once). Besides the
+    core fields, its slots are the fields declared in the `record_fields` attribute
+    of `graph_def`, and the ones in its `record_lazy_fields` attribute. Lazy fields
+    are left out of compact reads, and fetched (all at once) on first access, from
+    `storage_def` or the default storage of `graph_def`.
+
+    Example:
+    ```
+    class Person(BaseVertex):
+        default_storage = BaseVertex.default_storage | {"collection": "people"}
+        record_fields = ("name", "age")
+        record_lazy_fields = ("biography",)
+    ```
+    """
+    key = (graph_def, json.dumps(storage_def, sort_keys=True, default=str))
+    if cls := _record_classes.get(key):
+        return cls
+    core = (
+        EDGE_RECORD_FIELDS if issubclass(graph_def, BaseEdge) else VERTEX_RECORD_FIELDS
+    )
+    lazy = tuple(getattr(graph_def, "record_lazy_fields", ()))
+    fields = tuple(
+        dict.fromkeys((*core, *getattr(graph_def, "record_fields", ()), *lazy))
+    )
+    for field in fields:
+        if not field.isidentifier() or hasattr(CompactRecord, field):
+            raise ValueError(f"`{field}` can't be a field of a compact record")
+    cls = _record_classes[key] = type(
+        f"{graph_def.__name__}Record",
+        (CompactRecord,),
+        {
+            "__slots__": fields,
+            "graph_def": graph_def,
+            "storage_def": storage_def,
+            "_fields": fields,
+            "_field_set": frozenset(fields),
+            "_lazy_fields": lazy,
+        },
+    )
+    return cls
@@ -1,9 +1,23 @@
+import copy
+import json
+import os
+import re
+import time
 from collections import namedtuple
+from contextlib import contextmanager
+from contextvars import ContextVar
+from itertools import islice
+from typing import Iterable
 from flangoberry import logger
 from flangoberry import db
-from .graph_defs import BaseVertex, BaseEdge
-from datetime import datetime, timezone
-from arango.exceptions import DocumentInsertError, DocumentUpdateError
+from .graph_defs import BaseVertex, BaseEdge, record_class, timestamp
+from arango.exceptions import (
+    AQLQueryExecuteError,
+    DocumentInsertError,
+    DocumentUpdateError,
+    TransactionCommitError,
+    TransactionInitError,
+)
 from strawberry import UNSET as STRAWBERRY_UNSET
 from arango.cursor import Cursor
 
@@ -16,13 +30,313 @@ VertexStorage = namedtuple("VertexStorage", "db graph collection")
 
 EdgeStorage = namedtuple("EdgeStorage", "db graph collection")
 
+#
+# Result of the bulk operations. `errors` is a list of `(index, message)` tuples,
+# where `index` is the position of the failed document in the input. `docs` holds
+# the stored documents if `return_new` was requested.
+#
+BulkResult = namedtuple("BulkResult", "created updated ignored errors docs")
+
+BULK_CHUNK_SIZE = 1000
+
+#
+# `on_duplicate` values accepted by the bulk operations, mapped to the
+# `overwrite_mode` used for `insert_many` when new documents are returned.
+#
+BULK_ON_DUPLICATE_MODES = {
+    "error": None,
+    "update": "update",
+    "replace": "replace",
+    "ignore": "ignore",
+}
+
+
+#
+# Process-wide registry of resolved storage tuples, so that the graph/collection
+# existence checks and index creation in `resolve_vertex_storage` /
+# `resolve_edge_storage` are only paid once per storage definition.
+#
+# Keys are `(connection_alias, db_alias, graph, collection)` for vertices and
+# `(connection_alias, db_alias, graph, edge_collection, from_collections,
+# to_collections)` for edges. Values are `(storage, resolved_at)` tuples.
+#
+storage_registry = {}
+storage_registry_stats = {"hits": 0, "misses": 0}
+#
+# Seconds after which a registry entry is resolved again. `None` means entries
+# never expire (use `invalidate_storage()` to drop them explicitly).
+#
+storage_registry_ttl = None
+#
+# When True, storage resolution assumes that graphs, collections, edge definitions
+# and indexes already exist (see `bootstrap_schema()`), and builds storage tuples
+# without making any metadata calls to the database.
+#
+assume_schema_present = False
+#
+# Default for the `single_query` param of `create_edge` / `delete_edge`. When True,
+# the edge write and the is_root/is_leaf/inbound_modified maintenance of its
+# vertices are compiled into a single AQL statement (one round trip, atomic).
+#
+single_query_writes = False
+#
+# When True, edge writes (`create_edge`, `delete_edge`, their bulk and
+# get-or-create versions) also maintain `in_degree` / `out_degree` counters on their
+# vertices, in the same queries as the is_root/is_leaf flags. With
+# `degree_counters_per_collection`, `in_degrees` / `out_degrees` objects count the
+# edges per edge collection as well. Counters of existing vertices are initialised
+# (and drift repaired) with `repair_degree_counters()`.
+#
+degree_counters = False
+degree_counters_per_collection = False
+#
+# Number of times `get_or_create_*` is retried when the UPSERT creating a missing
+# document conflicts with a concurrent write of the same document (a unique
+# constraint violation or a write-write conflict), after which the document that
+# won is found by the lookup.
+#
+UPSERT_RETRIES = 2
+UPSERT_CONFLICT_ERRORS = (1200, 1210)
+#
+# Number of times the vertex flag / degree counter updates of edge writes (and the
+# single-statement edge writes) are retried when they conflict with a concurrent
+# write of the same vertex. The statement is rolled back as a whole, so retrying
+# it doesn't apply counter deltas twice. Conflicts are raised as a DataOpsException
+# once retries are exhausted, and at once within a `transaction`.
+#
+WRITE_CONFLICT_RETRIES = 2
+WRITE_CONFLICT_ERROR = 1200
+#
+# Optional read-through cache of vertices and edges, populated by `get_vertex` /
+# `get_edge` and by the results of creates and updates, and invalidated by
+# graph_ops writes. `None` disables it; set it to a `flangoberry.cache.LRUCache`
+# (or another backend with the same interface) to enable it.
+#
+document_cache = None
+document_cache_stats = {"hits": 0, "misses": 0, "stale": 0, "invalidations": 0}
+#
+# Whether cache hits are validated against the `_rev` of the stored document (one
+# small lookup instead of a full query), for when documents may be written by
+# other processes or without graph_ops.
+#
+document_cache_validate_revisions = False
+#
+# Callables notified of the collections written by graph_ops writes, e.g. to
+# invalidate caches derived from them (see `flangoberry.graphql.response_cache`).
+#
+write_listeners = []
+#
+# Transaction of the current context (see `transaction`)
+#
+_transaction = ContextVar("flangoberry_transaction", default=None)
+
+
+def _vertex_storage_key(storage_def: dict) -> tuple:
+    return (
+        storage_def["connection_alias"],
+        storage_def["db_alias"],
+        storage_def["graph"],
+        storage_def["collection"],
+    )
+
+
+def _edge_storage_key(storage_def: dict) -> tuple:
+    edge_def = storage_def["edge_definition"]
+    return (
+        storage_def["connection_alias"],
+        storage_def["db_alias"],
+        storage_def["graph"],
+        edge_def["edge_collection"],
+        tuple(edge_def["from_vertex_collections"]),
+        tuple(edge_def["to_vertex_collections"]),
+    )
+
+
+def _get_registered_storage(key: tuple) -> VertexStorage | EdgeStorage | None:
+    entry = storage_registry.get(key)
+    if entry is not None:
+        storage, resolved_at = entry
+        if (
+            storage_registry_ttl is None
+            or time.monotonic() - resolved_at < storage_registry_ttl
+        ):
+            storage_registry_stats["hits"] += 1
+            return storage
+        storage_registry.pop(key, None)
+    storage_registry_stats["misses"] += 1
+    return None
+
+
+def _register_storage(key: tuple, storage: VertexStorage | EdgeStorage):
+    storage_registry[key] = (storage, time.monotonic())
+    return storage
+
+
+def invalidate_storage(storage_def: dict = None):
+    """Drops resolved storage from the registry so it is resolved (and its indexes
+    ensured) again on next use. Drops everything if `storage_def` is not provided.
+    Pass a vertex or edge `default_storage` (or custom storage def) to drop a single
+    entry."""
+    if storage_def is None:
+        storage_registry.clear()
+        return
+    if "edge_definition" in storage_def:
+        storage_registry.pop(_edge_storage_key(storage_def), None)
+    else:
+        storage_registry.pop(_vertex_storage_key(storage_def), None)
+
+
+# Registered storages hold the databases (and so the HTTP sessions) of the parent
+# process, which forked processes must not share (see `flangoberry.db._check_pid`)
+os.register_at_fork(after_in_child=invalidate_storage)
+
+
+def storage_registry_info() -> dict:
+    """Returns hit/miss counters and the current size of the storage registry"""
+    return storage_registry_stats | {"size": len(storage_registry)}
+
+
+def reset_storage_registry_stats():
+    storage_registry_stats["hits"] = 0
+    storage_registry_stats["misses"] = 0
+
+
+def _cache_document(doc: dict, collection: str = None):
+    # Documents read or written in a transaction aren't committed yet
+    if document_cache is None or not doc or _transaction.get() is not None:
+        return
+    collection = collection or get_collection_name_from_id(doc["_id"])
+    tags = [doc["_id"], collection]
+    # Edges are also dropped when their vertices are invalidated (e.g. deleted)
+    tags += [doc[field] for field in ("_from", "_to") if field in doc]
+    document_cache.set(doc["_id"], copy.deepcopy(doc), tags=tags)
+
+
+def _cached_find(storage, search: dict) -> dict | None:
+    """`_find_one` through the document cache. Searches are mapped to document ids,
+    and a cached document is only returned if it still matches the search."""
+    collection = storage.collection.name
+    search_key = ("search", collection, json.dumps(search, sort_keys=True, default=str))
+    doc_id = search.get("_id") or document_cache.get(search_key)
+    if doc_id is not None:
+        doc = document_cache.get(doc_id)
+        if doc is not None and all(doc.get(f) == v for f, v in search.items()):
+            if not document_cache_validate_revisions or _cached_rev_is_current(
+                storage.db, doc
+            ):
+                document_cache_stats["hits"] += 1
+                return copy.deepcopy(doc)
+            document_cache_stats["stale"] += 1
+            document_cache.invalidate_tags([doc_id])
+
+    document_cache_stats["misses"] += 1
+    doc = _find_one(storage, search)
+    if doc:
+        _cache_document(doc, collection)
+        document_cache.set(
+            search_key,
+            doc["_id"],
+            tags=[doc["_id"], collection, _searches_tag(collection)],
+        )
+    return doc
+
+
+def _searches_tag(collection: str) -> str:
+    """Tag of the cached searches of `collection`, which any write to it may change
+    the results of (e.g. an insert adding a second match)"""
+    return f"{collection}:searches"
+
+
+def _cached_rev_is_current(dbase, doc: dict) -> bool:
+    cursor = dbase.aql.execute(
+        "RETURN DOCUMENT(@id)._rev", bind_vars={"id": doc["_id"]}
+    )
+    return cursor.next() == doc.get("_rev")
+
+
+def invalidate_cached(ids: Iterable[str] = (), collections: Iterable[str] = ()):
+    """Drops documents (and edges touching vertices) with `ids`, and all documents
+    of `collections`, from the document cache, and notifies `write_listeners`"""
+    ids = list(ids)
+    if document_cache is not None and (ids or collections):
+        document_cache_stats["invalidations"] += document_cache.invalidate_tags(
+            [*ids, *collections]
+        )
+        if (txn := _transaction.get()) is not None:
+            # Dropped again on commit, in case other readers cached them meanwhile
+            txn.written_ids.update(ids)
+            txn.written_collections.update(collections)
+    notify_written(ids, collections)
+
+
+def notify_written(ids: Iterable[str] = (), collections: Iterable[str] = ()):
+    """Notifies `write_listeners` of writes to the collections of `ids` and to
+    `collections` (once committed, within a `transaction`), and drops the cached
+    searches of those collections"""
+    ids = list(ids)
+    names = {get_collection_name_from_id(id) for id in ids} | set(collections)
+    if document_cache is not None and names:
+        document_cache_stats["invalidations"] += document_cache.invalidate_tags(
+            [_searches_tag(name) for name in names]
+        )
+    if not write_listeners:
+        return
+    if (txn := _transaction.get()) is not None:
+        txn.written_ids.update(ids)
+        txn.written_collections.update(collections)
+        return
+    if names:
+        for listener in write_listeners:
+            listener(names)
+
+
+def _edge_collections_of(vertex_collection: str) -> set[str]:
+    """Edge collections (of the discovered graph defs) that can hold edges of
+    vertices in `vertex_collection`"""
+    collections = set()
+    for graph_def in discover_graph_defs():
+        if issubclass(graph_def, BaseEdge):
+            edge_def = graph_def.default_storage["edge_definition"]
+            if vertex_collection in (
+                *edge_def["from_vertex_collections"],
+                *edge_def["to_vertex_collections"],
+            ):
+                collections.add(edge_def["edge_collection"])
+    return collections
+
+
+def document_cache_info() -> dict:
+    """Returns the counters of the document cache, and its hit rate"""
+    lookups = document_cache_stats["hits"] + document_cache_stats["misses"]
+    hit_rate = document_cache_stats["hits"] / lookups if lookups else 0.0
+    size = len(document_cache) if document_cache is not None else 0
+    return document_cache_stats | {"hit_rate": hit_rate, "size": size}
+
+
+def reset_document_cache_stats():
+    for counter in document_cache_stats:
+        document_cache_stats[counter] = 0
+
 
 def resolve_vertex_storage(vertex: BaseVertex | type[BaseVertex], storage_def=None):
+    return _transactional(_resolve_vertex_storage(vertex, storage_def))
+
+
+def _resolve_vertex_storage(vertex, storage_def=None):
     if storage_def is None:
         storage_def = vertex.default_storage
     # logger.debug(storage_def)
 
+    key = _vertex_storage_key(storage_def)
+    if storage := _get_registered_storage(key):
+        return storage
+
     dbase = db.get_db(storage_def["db_alias"], storage_def["connection_alias"])
+    if assume_schema_present:
+        graph = dbase.graph(storage_def["graph"])
+        coll = graph.vertex_collection(storage_def["collection"])
+        return _register_storage(key, VertexStorage(dbase, graph, coll))
+
     graph = None
     if dbase.has_graph(storage_def["graph"]):
         graph = dbase.graph(storage_def["graph"])
@@ -40,15 +354,28 @@ def resolve_vertex_storage(vertex: BaseVertex | type[BaseVertex], storage_def=No
             p_index["in_background"] = True
             coll.add_persistent_index(**p_index)
 
-    return VertexStorage(dbase, graph, coll)
+    return _register_storage(key, VertexStorage(dbase, graph, coll))
 
 
 def resolve_edge_storage(edge: BaseEdge | type[BaseEdge], storage_def=None):
+    return _transactional(_resolve_edge_storage(edge, storage_def))
+
+
+def _resolve_edge_storage(edge, storage_def=None):
     if storage_def is None:
         storage_def = edge.default_storage
     # logger.debug(storage_def)
 
+    key = _edge_storage_key(storage_def)
+    if storage := _get_registered_storage(key):
+        return storage
+
     dbase = db.get_db(storage_def["db_alias"], storage_def["connection_alias"])
+    if assume_schema_present:
+        graph = dbase.graph(storage_def["graph"])
+        coll = graph.edge_collection(storage_def["edge_definition"]["edge_collection"])
+        return _register_storage(key, EdgeStorage(dbase, graph, coll))
+
     graph = None
     if dbase.has_graph(storage_def["graph"]):
         graph = dbase.graph(storage_def["graph"])
@@ -68,7 +395,268 @@ def resolve_edge_storage(edge: BaseEdge | type[BaseEdge], storage_def=None):
             p_index["in_background"] = True
             coll.add_persistent_index(**p_index)
 
-    return EdgeStorage(dbase, graph, coll)
+    return _register_storage(key, EdgeStorage(dbase, graph, coll))
+
+
+class Transaction:
+    """State of a `transaction` block: its stream transaction database, the
+    storage tuples rebound to it, and the writes to notify once committed"""
+
+    def __init__(self, origin_db, txn_db):
+        self.origin_db = origin_db
+        self.db = txn_db
+        self.storages = {}
+        self.written_ids = set()
+        self.written_collections = set()
+
+    def storage(self, storage: VertexStorage | EdgeStorage):
+        """`storage` bound to the transaction (unless it's in another database)"""
+        if storage.db is not self.origin_db:
+            return storage
+        if (txn_storage := self.storages.get(storage)) is None:
+            graph = self.db.graph(storage.graph.name)
+            if isinstance(storage, EdgeStorage):
+                coll = graph.edge_collection(storage.collection.name)
+            else:
+                coll = graph.vertex_collection(storage.collection.name)
+            txn_storage = type(storage)(self.db, graph, coll)
+            self.storages[storage] = txn_storage
+        return txn_storage
+
+
+def _transactional(storage: VertexStorage | EdgeStorage):
+    txn = _transaction.get()
+    return txn.storage(storage) if txn is not None else storage
+
+
+def _collection_names(graph_def) -> list[str]:
+    """Collections written by graph_ops calls on `graph_def` (a collection name, or
+    a vertex / edge class, whose edge writes also update their vertices, and whose
+    vertex deletions also delete their edges)"""
+    if isinstance(graph_def, str):
+        return [graph_def]
+    if issubclass(graph_def, BaseEdge):
+        edge_def = graph_def.default_storage["edge_definition"]
+        return [
+            edge_def["edge_collection"],
+            *edge_def["from_vertex_collections"],
+            *edge_def["to_vertex_collections"],
+        ]
+    collection = graph_def.default_storage["collection"]
+    return [collection, *sorted(_edge_collections_of(collection))]
+
+
+@contextmanager
+def transaction(
+    collections: Iterable,
+    read: Iterable = (),
+    exclusive: bool = False,
+    lock_timeout: int = None,
+    storage_def: dict = None,
+):
+    """
+    Example:
+    ```
+    with graph_ops.transaction([SomeVertexType, SomeEdgeType]):
+        vertex = create_vertex(SomeVertexType(name="a"))
+        create_edge(SomeEdgeType(frm=vertex, to=other_vertex))
+    ```
+
+    Runs the graph_ops calls of the block in an ArangoDB stream transaction, which
+    is committed when the block exits, or aborted if it raises. `collections` are
+    the vertex / edge classes (or collection names) written to in the block (edge
+    classes include their vertex collections, and vertex classes the edge
+    collections of their edges, for `delete_vertex`), and `read` the ones only read
+    (other collections can still be read, but without isolation). With `exclusive`,
+    the write collections are locked exclusively.
+
+    The transaction is opened on the database of the first graph def of
+    `collections` (or of `storage_def`). Nested blocks join the outer transaction.
+    Document cache invalidations and `write_listeners` notifications are repeated
+    once the transaction is committed.
+    """
+    if _transaction.get() is not None:
+        yield _transaction.get()
+        return
+
+    collections = list(collections)
+    if storage_def is None:
+        graph_defs = [c for c in collections if not isinstance(c, str)]
+        if not graph_defs:
+            raise DataOpsException("`storage_def` is required without graph defs")
+        storage_def = graph_defs[0].default_storage
+    origin_db = db.get_db(storage_def["db_alias"], storage_def["connection_alias"])
+    write = sorted({name for c in collections for name in _collection_names(c)})
+    read = sorted({name for c in read for name in _collection_names(c)})
+    try:
+        txn_db = origin_db.begin_transaction(
+            read=read,
+            write=None if exclusive else write,
+            exclusive=write if exclusive else None,
+            lock_timeout=lock_timeout,
+        )
+    except TransactionInitError as e:
+        raise DataOpsException(f"arango.exceptions.TransactionInitError: {e}")
+
+    txn = Transaction(origin_db, txn_db)
+    token = _transaction.set(txn)
+    try:
+        yield txn
+    except BaseException:
+        _transaction.reset(token)
+        try:
+            txn_db.abort_transaction()
+        except Exception as e:
+            # The error of the block is the one worth raising
+            logger.warning(f"Failed to abort the transaction: {e}")
+        raise
+    _transaction.reset(token)
+    try:
+        txn_db.commit_transaction()
+    except TransactionCommitError as e:
+        raise DataOpsException(f"arango.exceptions.TransactionCommitError: {e}")
+    finally:
+        invalidate_cached(txn.written_ids, txn.written_collections)
+
+
+def _all_subclasses(cls: type) -> list[type]:
+    subclasses = []
+    for subclass in cls.__subclasses__():
+        subclasses.append(subclass)
+        subclasses.extend(_all_subclasses(subclass))
+    return subclasses
+
+
+def discover_graph_defs() -> list[type[BaseVertex] | type[BaseEdge]]:
+    """Returns all imported BaseVertex/BaseEdge subclasses whose `default_storage`
+    names a collection (vertices) or an edge collection (edges). Classes sharing the
+    same storage are only returned once."""
+    found = {}
+    for subclass in _all_subclasses(BaseVertex):
+        if subclass.default_storage.get("collection"):
+            key = _vertex_storage_key(subclass.default_storage)
+            found.setdefault(key, subclass)
+    for subclass in _all_subclasses(BaseEdge):
+        if subclass.default_storage["edge_definition"].get("edge_collection"):
+            key = _edge_storage_key(subclass.default_storage)
+            found.setdefault(key, subclass)
+    return list(found.values())
+
+
+def _index_exists(existing_indexes: list[dict], p_index: dict) -> bool:
+    for index in existing_indexes:
+        if (
+            index["type"] == "persistent"
+            and list(index["fields"]) == list(p_index["fields"])
+            and index.get("unique", False) == p_index.get("unique", False)
+            and index.get("sparse", False) == p_index.get("sparse", False)
+        ):
+            return True
+    return False
+
+
+def bootstrap_schema(
+    graph_defs: list[type[BaseVertex] | type[BaseEdge]] = None,
+    assume_present: bool = True,
+) -> dict:
+    """
+    Provisions graphs, vertex collections, edge definitions and persistent indexes
+    for `graph_defs` (all discovered BaseVertex/BaseEdge subclasses if not provided,
+    see `discover_graph_defs()`) in one pass, and registers the resulting storage in
+    the storage registry.
+
+    Existing graphs, collections and indexes are listed once per database / graph
+    instead of once per definition. If `assume_present` is True, graph_ops then
+    switches to "schema assumed present" mode (see `assume_schema_present`), where
+    resolving storage for definitions that weren't bootstrapped makes no metadata
+    calls either.
+
+    Returns a summary of what was created.
+    """
+    global assume_schema_present
+
+    if graph_defs is None:
+        graph_defs = discover_graph_defs()
+
+    summary = {
+        "graphs": [],
+        "vertex_collections": [],
+        "edge_definitions": [],
+        "persistent_indexes": [],
+    }
+    dbases = {}
+    graphs = {}
+
+    def _get_graph(storage_def):
+        db_key = (storage_def["connection_alias"], storage_def["db_alias"])
+        if db_key not in dbases:
+            dbase = db.get_db(storage_def["db_alias"], storage_def["connection_alias"])
+            dbases[db_key] = (dbase, {g["name"] for g in dbase.graphs()})
+        dbase, graph_names = dbases[db_key]
+
+        graph_key = db_key + (storage_def["graph"],)
+        if graph_key not in graphs:
+            if storage_def["graph"] in graph_names:
+                graph = dbase.graph(storage_def["graph"])
+            else:
+                graph = dbase.create_graph(storage_def["graph"])
+                graph_names.add(storage_def["graph"])
+                summary["graphs"].append(storage_def["graph"])
+            graphs[graph_key] = (
+                graph,
+                set(graph.vertex_collections()),
+                {d["edge_collection"] for d in graph.edge_definitions()},
+            )
+        return dbase, graphs[graph_key]
+
+    def _ensure_indexes(coll, storage_def):
+        if persistent_indexes := storage_def.get("persistent_indexes", None):
+            existing_indexes = coll.indexes()
+            for p_index in persistent_indexes:
+                if not _index_exists(existing_indexes, p_index):
+                    p_index["in_background"] = True
+                    coll.add_persistent_index(**p_index)
+                    summary["persistent_indexes"].append(
+                        (coll.name, list(p_index["fields"]))
+                    )
+
+    vertex_defs = [d for d in graph_defs if issubclass(d, BaseVertex)]
+    edge_defs = [d for d in graph_defs if issubclass(d, BaseEdge)]
+
+    for vertex_def in vertex_defs:
+        storage_def = vertex_def.default_storage
+        dbase, (graph, vertex_colls, edge_colls) = _get_graph(storage_def)
+        if storage_def["collection"] in vertex_colls:
+            coll = graph.vertex_collection(storage_def["collection"])
+        else:
+            coll = graph.create_vertex_collection(storage_def["collection"])
+            vertex_colls.add(storage_def["collection"])
+            summary["vertex_collections"].append(storage_def["collection"])
+        _ensure_indexes(coll, storage_def)
+        _register_storage(
+            _vertex_storage_key(storage_def), VertexStorage(dbase, graph, coll)
+        )
+
+    for edge_def in edge_defs:
+        storage_def = edge_def.default_storage
+        dbase, (graph, vertex_colls, edge_colls) = _get_graph(storage_def)
+        definition = storage_def["edge_definition"]
+        if definition["edge_collection"] in edge_colls:
+            coll = graph.edge_collection(definition["edge_collection"])
+        else:
+            coll = graph.create_edge_definition(**definition)
+            edge_colls.add(definition["edge_collection"])
+            vertex_colls.update(definition["from_vertex_collections"])
+            vertex_colls.update(definition["to_vertex_collections"])
+            summary["edge_definitions"].append(definition["edge_collection"])
+        _ensure_indexes(coll, storage_def)
+        _register_storage(
+            _edge_storage_key(storage_def), EdgeStorage(dbase, graph, coll)
+        )
+
+    assume_schema_present = assume_present
+    logger.debug(f"Schema bootstrapped: {summary}")
+    return summary
 
 
 def create_vertex(vertex: BaseVertex, storage_def=None) -> dict:
@@ -77,9 +665,12 @@ def create_vertex(vertex: BaseVertex, storage_def=None) -> dict:
 
     storage = resolve_vertex_storage(vertex, storage_def)
     try:
-        return storage.collection.insert(vertex, return_new=True)["new"]
+        new = storage.collection.insert(vertex, return_new=True)["new"]
     except DocumentInsertError as e:
         raise DataOpsException(f"arango.exceptions.DocumentInsertError: {e}")
+    notify_written([new["_id"]])
+    _cache_document(new, storage.collection.name)
+    return new
 
 
 def update_vertex(vertex: BaseVertex, storage_def=None) -> dict:
@@ -88,7 +679,7 @@ def update_vertex(vertex: BaseVertex, storage_def=None) -> dict:
 
     if "created" in vertex:
         del vertex["created"]
-    vertex["modified"] = datetime.now(timezone.utc).isoformat()
+    vertex["modified"] = timestamp()
     # Making use of the strawberry.UNSET value to remove optional fields that weren't set
     unset_fields = [f for f, v in vertex.items() if v == STRAWBERRY_UNSET]
     for field in unset_fields:
@@ -96,26 +687,189 @@ def update_vertex(vertex: BaseVertex, storage_def=None) -> dict:
 
     storage = resolve_vertex_storage(vertex, storage_def)
     try:
-        return storage.collection.update(vertex, return_new=True)["new"]
+        new = storage.collection.update(vertex, return_new=True)["new"]
     except DocumentUpdateError as e:
         raise DataOpsException(f"arango.exceptions.DocumentUpdateError: {e}")
+    invalidate_cached([new["_id"]])
+    _cache_document(new, storage.collection.name)
+    return new
 
 
 def delete_vertex(vertex_def: type[BaseVertex], id: str, storage_def=None) -> bool:
     storage = resolve_vertex_storage(vertex_def, storage_def)
-    return storage.collection.delete({"_id": id})
+    try:
+        return storage.collection.delete({"_id": id})
+    finally:
+        invalidate_cached([id])
+        # Edges of the vertex are deleted along with it
+        if write_listeners:
+            notify_written(collections=_edge_collections_of(storage.collection.name))
 
 
 def get_vertex(
-    vertex_def: type[BaseVertex], search: dict, storage_def=None
+    vertex_def: type[BaseVertex],
+    search: dict,
+    storage_def=None,
+    fields: list[str] = None,
 ) -> dict | None:
+    """Returns the vertex matching `search` (None if there is none, an error if
+    there are several). `fields` projects the vertex to the given fields (`_id`,
+    `_key` and `_rev` are always included)."""
     storage = resolve_vertex_storage(vertex_def, storage_def)
-    res = storage.collection.find(search)
-    if res.count() == 0:
-        return None
-    if res.count() > 1:
+    if document_cache is not None:
+        return _project(_cached_find(storage, search), fields)
+    return _find_one(storage, search, fields)
+
+
+def get_vertices(
+    vertex_def: type[BaseVertex],
+    searches: Iterable[dict],
+    storage_def=None,
+    fields: list[str] = None,
+) -> list[dict | None]:
+    """Resolves many `get_vertex` lookups with one query. Returns the vertex (or
+    None) matching each of `searches`, in the same order."""
+    storage = resolve_vertex_storage(vertex_def, storage_def)
+    searches = list(searches)
+    if not searches:
+        return []
+    query, bind_vars, positions = _find_many_query(
+        storage.collection.name, searches, fields
+    )
+    cursor = storage.db.aql.execute(query, bind_vars=bind_vars)
+    results = [None] * len(searches)
+    for group_positions, group_results in zip(positions, cursor.next()):
+        for position, matches in zip(group_positions, group_results):
+            if len(matches) > 1:
+                raise DataOpsException("Expected one result but got more")
+            if matches:
+                results[position] = matches[0]
+                if document_cache is not None and fields is None:
+                    _cache_document(matches[0], storage.collection.name)
+    return results
+
+
+#
+# Document properties always kept by the projections of single-document lookups
+#
+PROJECTION_FIELDS = ("_id", "_key", "_rev")
+
+
+def _project(doc: dict | None, fields: list[str] = None) -> dict | None:
+    if doc is None or fields is None:
+        return doc
+    return {f: doc[f] for f in (*PROJECTION_FIELDS, *fields) if f in doc}
+
+
+def _attribute_expr(var: str, field: str, bind_vars: dict, prefix: str) -> str:
+    """AQL expression of `field` of the document `var`, with the same semantics as
+    python-arango's `find`: a top-level attribute, or else a dotted path"""
+    bind_vars[prefix] = field
+    if "." not in field:
+        return f"{var}[@{prefix}]"
+    nested = var
+    for i, part in enumerate(field.split(".")):
+        bind_vars[f"{prefix}_{i}"] = part
+        nested += f"[@{prefix}_{i}]"
+    return f"(HAS({var}, @{prefix}) ? {var}[@{prefix}] : {nested})"
+
+
+def _projection_expr(var: str, fields: list[str], bind_vars: dict) -> str:
+    if fields is None:
+        return var
+    bind_vars["projection"] = list(dict.fromkeys((*PROJECTION_FIELDS, *fields)))
+    return f"KEEP({var}, @projection)"
+
+
+def _find_one_query(collection: str, search: dict, fields: list[str] = None):
+    """Builds the lookup of the documents of `collection` matching `search`, which
+    is limited to 2 results to detect non-unique searches without fetching all
+    the matches. Returns the query and its bind vars."""
+    bind_vars = {"@collection": collection}
+    conditions = []
+    for i, (field, value) in enumerate(search.items()):
+        bind_vars[f"value_{i}"] = value
+        attribute = _attribute_expr("d", field, bind_vars, f"field_{i}")
+        conditions.append(f"{attribute} == @value_{i}")
+    filter_clause = f"FILTER {' AND '.join(conditions)}" if conditions else ""
+    query = f"""
+        FOR d IN @@collection
+            {filter_clause}
+            LIMIT 2
+            RETURN {_projection_expr("d", fields, bind_vars)}
+    """
+    return query, bind_vars
+
+
+def _find_many_query(collection: str, searches: list[dict], fields=None):
+    """Builds the lookups of `searches` as one query, with a subquery per group of
+    searches on the same fields. Returns the query, its bind vars, and the
+    positions of the searches of each group."""
+    groups = {}
+    for position, search in enumerate(searches):
+        groups.setdefault(tuple(search), []).append(position)
+
+    bind_vars = {"@collection": collection}
+    projection = _projection_expr("d", fields, bind_vars)
+    subqueries = []
+    for g, (search_fields, group_positions) in enumerate(groups.items()):
+        bind_vars[f"group_{g}"] = [
+            [searches[position][f] for f in search_fields]
+            for position in group_positions
+        ]
+        conditions = [
+            f"{_attribute_expr('d', field, bind_vars, f'g{g}_field_{i}')} == s[{i}]"
+            for i, field in enumerate(search_fields)
+        ]
+        filter_clause = f"FILTER {' AND '.join(conditions)}" if conditions else ""
+        subqueries.append(f"""(
+                FOR s IN @group_{g}
+                    RETURN (
+                        FOR d IN @@collection
+                            {filter_clause}
+                            LIMIT 2
+                            RETURN {projection}
+                    )
+            )""")
+    query = f"RETURN [{', '.join(subqueries)}]"
+    return query, bind_vars, list(groups.values())
+
+
+def _matches(doc: dict, search: dict) -> bool:
+    for field, value in search.items():
+        if field in doc:
+            if doc[field] != value:
+                return False
+            continue
+        current = doc
+        for part in field.split("."):
+            if not isinstance(current, dict) or part not in current:
+                return value is None
+            current = current[part]
+        if current != value:
+            return False
+    return True
+
+
+def _find_one(storage, search: dict, fields: list[str] = None) -> dict | None:
+    """Returns the document of the storage's collection matching `search` (None if
+    there is none, an error if there are several). Searches by `_key` or `_id` are
+    direct document reads."""
+    collection = storage.collection
+    key = search.get("_key")
+    if key is None and "_id" in search:
+        if get_collection_name_from_id(search["_id"]) != collection.name:
+            return None
+        key = get_key_from_id(search["_id"])
+    if key is not None:
+        doc = collection.get(key)
+        return _project(doc, fields) if doc and _matches(doc, search) else None
+
+    query, bind_vars = _find_one_query(collection.name, search, fields)
+    res = list(storage.db.aql.execute(query, bind_vars=bind_vars))
+    if len(res) > 1:
         raise DataOpsException("Expected one result but got more")
-    return res.next()
+    return res[0] if res else None
 
 
 def get_or_create_vertex(
@@ -123,35 +877,765 @@ def get_or_create_vertex(
     search: dict,
     new_doc: dict | None = None,
     storage_def: dict = None,
+    exclusive: bool = False,
 ) -> tuple[bool, dict]:
     """
     Example: `already_existed, vertex = get_or_create_vertex(SomeVertexType, {'name': 'Some name'})`
 
     Tries to find a vertex of type `vertex_def` that has the properties in `search`,
-    otherwise creates a new vertex with said properties.
+    otherwise creates a new vertex with said properties (or `new_doc`).
+
+    The vertex is looked up first, and only missing vertices are written, by an AQL
+    UPSERT (so finding an existing vertex never writes to it, nor conflicts with
+    concurrent calls). Concurrent creations of the same vertex are safe if `search`
+    is covered by a unique index, or with `exclusive` (which serializes writes to
+    the collection while the UPSERT runs): the UPSERTs that lose are retried,
+    finding the winner.
     """
-    if vertex := get_vertex(vertex_def, search, storage_def):
-        return True, vertex
-    if not new_doc:
-        new_doc = search
-    return False, create_vertex(vertex_def(**new_doc))
+    return get_or_create_vertices(
+        vertex_def, [(search, new_doc)], storage_def, exclusive=exclusive
+    )[0]
 
 
-def create_edge(edge: BaseEdge, storage_def=None) -> dict:
-    if not isinstance(edge, BaseEdge):
-        raise DataOpsException("`edge` must be an instance of BaseEdge")
+def get_or_create_vertices(
+    vertex_def: type[BaseVertex],
+    items: Iterable[tuple[dict, dict | None]],
+    storage_def: dict = None,
+    chunk_size: int = BULK_CHUNK_SIZE,
+    exclusive: bool = False,
+) -> list[tuple[bool, dict]]:
+    """Bulk `get_or_create_vertex` of `(search, new_doc)` pairs, with one lookup
+    (and one UPSERT statement of the missing vertices) per chunk of `chunk_size`
+    pairs. Returns an `(already_existed, vertex)` tuple per pair, in order."""
+    storage = resolve_vertex_storage(vertex_def, storage_def)
+    items = [(search, vertex_def(**(new_doc or search))) for search, new_doc in items]
+    results = []
+    for chunk in _chunks(items, chunk_size):
+        results.extend(_upsert(storage, chunk, exclusive))
+    for existed, doc in results:
+        if not existed:
+            notify_written([doc["_id"]])
+        _cache_document(doc, storage.collection.name)
+    return results
+
+
+def _search_fields(searches: list[dict]) -> list[str]:
+    search_fields = list(searches[0])
+    if not search_fields:
+        raise DataOpsException("`search` must not be empty")
+    return search_fields
+
+
+def _lookup_query(collection: str, searches: list[dict]) -> tuple[str, dict]:
+    """Builds the query returning the first document of `collection` matching each
+    of `searches` (on the same fields), or null"""
+    search_fields = _search_fields(searches)
+    filters = " AND ".join(
+        f"d[{json.dumps(field)}] == item[{i}]" for i, field in enumerate(search_fields)
+    )
+    query = f"""
+        FOR item IN @searches
+            RETURN FIRST(FOR d IN @@collection FILTER {filters} LIMIT 1 RETURN d)
+    """
+    bind_vars = {
+        "@collection": collection,
+        "searches": [[search[f] for f in search_fields] for search in searches],
+    }
+    return query, bind_vars
+
+
+def _upsert_query(
+    collection: str,
+    items: list[tuple[dict, dict]],
+    exclusive: bool = False,
+    then: str = "",
+    bind_vars: dict = None,
+) -> tuple[str, dict]:
+    """Builds the UPSERT of `(search, new_doc)` pairs (searching on the same
+    fields) into `collection`. Rows are returned as `{doc, existed}`, unless `then`
+    (AQL run after the UPSERTs, with the rows in `results`, and with the extra
+    `bind_vars`) returns otherwise."""
+    search_fields = _search_fields([search for search, _ in items])
+    search_expr = ", ".join(
+        f"{json.dumps(field)}: item.search[{i}]"
+        for i, field in enumerate(search_fields)
+    )
+    bind_vars = {
+        **(bind_vars or {}),
+        "@collection": collection,
+        "items": [
+            {"search": [search[f] for f in search_fields], "doc": doc}
+            for search, doc in items
+        ],
+    }
+    options = " OPTIONS { exclusive: true }" if exclusive else ""
+    query = f"""
+        LET results = (
+            FOR item IN @items
+                UPSERT {{ {search_expr} }}
+                INSERT item.doc
+                UPDATE {{}}
+                IN @@collection{options}
+                RETURN {{ doc: NEW, existed: OLD != null }}
+        )
+        {then or "FOR result IN results RETURN result"}
+    """
+    return query, bind_vars
+
+
+def _edge_flags_then(edge: BaseEdge, edge_collection: str) -> tuple[str, dict]:
+    """AQL to run after the UPSERT of `edge` (see `_upsert_query`) to update the
+    flags of its vertices if it was created. Returns it with its bind vars."""
+    patches = _add_edge_vertex_patches({}, [edge], timestamp(), edge_collection)
+    bind_vars = {}
+    then = f"""
+        LET result = FIRST(results)
+        {_vertex_patch_subqueries(patches, bind_vars, skip_if="result.existed")}
+        RETURN result
+    """
+    return then, bind_vars
+
+
+def _upsert(
+    storage,
+    items: list[tuple[dict, dict]],
+    exclusive: bool = False,
+    then: str = "",
+    bind_vars: dict = None,
+):
+    """Runs the get-or-creates of `items`, grouped by searched fields: the existing
+    documents are looked up, and only the missing ones are UPSERTed, retrying (from
+    the lookup) conflicts with concurrent writes. Returns an `(existed, doc)` tuple
+    per item."""
+    groups = {}
+    for position, (search, doc) in enumerate(items):
+        groups.setdefault(tuple(search), []).append(position)
+
+    results = [None] * len(items)
+    for positions in groups.values():
+        group = [items[p] for p in positions]
+        for attempt in range(UPSERT_RETRIES + 1):
+            try:
+                group_results = _lookup_then_upsert(
+                    storage, group, exclusive, then, bind_vars
+                )
+                break
+            except AQLQueryExecuteError as e:
+                if e.error_code in UPSERT_CONFLICT_ERRORS and attempt < UPSERT_RETRIES:
+                    continue
+                raise DataOpsException(f"arango.exceptions.AQLQueryExecuteError: {e}")
+        for position, result in zip(positions, group_results):
+            results[position] = result
+    return results
+
+
+def _lookup_then_upsert(
+    storage, items: list[tuple[dict, dict]], exclusive, then, bind_vars
+) -> list[tuple[bool, dict]]:
+    query, query_bind_vars = _lookup_query(
+        storage.collection.name, [search for search, _ in items]
+    )
+    found = storage.db.aql.execute(query, bind_vars=query_bind_vars)
+    results = [None if doc is None else (True, doc) for doc in found]
+    missing = [i for i, result in enumerate(results) if result is None]
+    if missing:
+        query, query_bind_vars = _upsert_query(
+            storage.collection.name,
+            [items[i] for i in missing],
+            exclusive,
+            then,
+            bind_vars,
+        )
+        rows = storage.db.aql.execute(query, bind_vars=query_bind_vars)
+        for i, row in zip(missing, rows):
+            results[i] = (row["existed"], row["doc"])
+    return results
+
+
+def _compact_reader(graph_def, storage_def, compact: bool, bind_vars: dict):
+    """Returns the AQL expression returning the document `d`, and the function
+    converting the results, of reads returning compact records if `compact`"""
+    if not compact:
+        return "d", lambda doc: doc
+    record = record_class(graph_def, storage_def)
+    if not record._lazy_fields:
+        return "d", record
+    bind_vars["lazy_fields"] = list(record._lazy_fields)
+    return "UNSET(d, @lazy_fields)", record
+
+
+def get_vertices_by_id(
+    vertex_def: type[BaseVertex],
+    ids: Iterable[str],
+    storage_def=None,
+    compact: bool = False,
+) -> dict[str, dict]:
+    """Fetches many vertices by `_id` with one `DOCUMENT()` lookup. Returns a dict
+    of id -> vertex; ids that were not found are missing from it. With `compact`,
+    vertices are returned as compact records (see `graph_defs.record_class`)."""
+    storage = resolve_vertex_storage(vertex_def, storage_def)
+    ids = list(dict.fromkeys(ids))
+    if not ids:
+        return {}
+    bind_vars = {"ids": ids}
+    doc_expr, convert = _compact_reader(vertex_def, storage_def, compact, bind_vars)
+    cursor = storage.db.aql.execute(
+        f"FOR d IN DOCUMENT(@ids) RETURN {doc_expr}",
+        bind_vars=bind_vars,
+        batch_size=len(ids),
+    )
+    return {doc["_id"]: convert(doc) for doc in cursor}
+
+
+def get_vertices_by_key(
+    vertex_def: type[BaseVertex],
+    keys: Iterable[str],
+    storage_def=None,
+    compact: bool = False,
+) -> dict[str, dict]:
+    """Fetches many vertices of `vertex_def`'s collection by `_key` with one
+    `DOCUMENT()` lookup. Returns a dict of key -> vertex (or compact record)."""
+    storage = resolve_vertex_storage(vertex_def, storage_def)
+    keys = list(dict.fromkeys(keys))
+    if not keys:
+        return {}
+    bind_vars = {"collection": storage.collection.name, "keys": keys}
+    doc_expr, convert = _compact_reader(vertex_def, storage_def, compact, bind_vars)
+    cursor = storage.db.aql.execute(
+        f"FOR d IN DOCUMENT(@collection, @keys) RETURN {doc_expr}",
+        bind_vars=bind_vars,
+        batch_size=len(keys),
+    )
+    return {doc["_key"]: convert(doc) for doc in cursor}
+
+
+def get_vertices_by_field(
+    vertex_def: type[BaseVertex],
+    field: str,
+    values: Iterable,
+    storage_def=None,
+    compact: bool = False,
+) -> dict:
+    """Fetches many vertices by the value of a (unique) `field` with one query.
+    Returns a dict of field value -> vertex (or compact record). If several
+    vertices share a value, one of them is returned for it."""
+    storage = resolve_vertex_storage(vertex_def, storage_def)
+    values = list(dict.fromkeys(values))
+    if not values:
+        return {}
+    bind_vars = {
+        "@collection": storage.collection.name,
+        "field": field,
+        "values": values,
+    }
+    doc_expr, convert = _compact_reader(vertex_def, storage_def, compact, bind_vars)
+    cursor = storage.db.aql.execute(
+        f"FOR d IN @@collection FILTER d.@field IN @values RETURN {doc_expr}",
+        bind_vars=bind_vars,
+        batch_size=len(values),
+    )
+    return {doc[field]: convert(doc) for doc in cursor}
+
+
+def get_document_fields(
+    graph_def: type[BaseVertex] | type[BaseEdge],
+    id: str,
+    fields: Iterable[str],
+    storage_def=None,
+) -> dict | None:
+    """Fetches only `fields` of the vertex or edge with `id` (None if not found)"""
+    if issubclass(graph_def, BaseEdge):
+        storage = resolve_edge_storage(graph_def, storage_def)
+    else:
+        storage = resolve_vertex_storage(graph_def, storage_def)
+    cursor = storage.db.aql.execute(
+        "LET d = DOCUMENT(@id) RETURN d ? KEEP(d, @fields) : null",
+        bind_vars={"id": id, "fields": list(fields)},
+    )
+    return next(cursor, None)
+
+
+def compact_rows(rows: Iterable[dict]):
+    """Lazily converts the vertices and edges of rows (of `list_vertex_edges`,
+    `traverse`...) to compact records, using the record classes of the discovered
+    graph defs of their collections. Documents of other collections are left as
+    they are."""
+    records = {}
+    for graph_def in discover_graph_defs():
+        if issubclass(graph_def, BaseEdge):
+            name = graph_def.default_storage["edge_definition"]["edge_collection"]
+        else:
+            name = graph_def.default_storage["collection"]
+        records[name] = record_class(graph_def)
+
+    def _compact(doc):
+        if not isinstance(doc, dict):
+            return doc
+        record = records.get(get_collection_name_from_id(doc["_id"]))
+        return record(doc) if record else doc
+
+    for row in rows:
+        yield {k: _compact(v) if k in ("vertex", "edge") else v for k, v in row.items()}
+
+
+def _chunks(iterable: Iterable, size: int):
+    iterator = iter(iterable)
+    while chunk := list(islice(iterator, size)):
+        yield chunk
+
+
+_import_error_position = re.compile(r"at position (\d+): (.*)", re.DOTALL)
+
+
+def _bulk_insert_chunk(
+    collection,
+    docs: list[dict],
+    on_duplicate: str,
+    return_new: bool,
+    track_created: bool = False,
+) -> tuple[BulkResult, list[int] | None]:
+    """Inserts one chunk of documents, either through `insert_many` (when the stored
+    documents are needed, or which documents were created rather than ignored /
+    updated / replaced with `track_created`) or through the cheaper bulk import API.
+    Returns the result and the positions of the created documents (None if unknown),
+    relative to `docs` like the error positions."""
+    created, updated, ignored, errors, new_docs = 0, 0, 0, [], []
+    if return_new or track_created:
+        try:
+            results = collection.insert_many(
+                docs,
+                return_new=True,
+                overwrite_mode=BULK_ON_DUPLICATE_MODES[on_duplicate],
+            )
+        except DocumentInsertError as e:
+            raise DataOpsException(f"arango.exceptions.DocumentInsertError: {e}")
+        created_positions = []
+        for i, res in enumerate(results):
+            if isinstance(res, Exception):
+                errors.append((i, getattr(res, "error_message", str(res))))
+            elif "new" not in res:
+                ignored += 1
+            else:
+                if "_old_rev" in res or "_oldRev" in res:
+                    updated += 1
+                else:
+                    created += 1
+                    created_positions.append(i)
+                if return_new:
+                    new_docs.append(res["new"])
+        return (
+            BulkResult(created, updated, ignored, errors, new_docs),
+            created_positions,
+        )
 
-    storage = resolve_edge_storage(edge, storage_def)
     try:
-        edge = storage.collection.insert(edge, return_new=True)
-        now = datetime.now(timezone.utc).isoformat()
-        storage.db.update_document(
-            {"_id": edge["new"]["_to"], "is_root": False, "inbound_modified": now}
+        res = collection.import_bulk(
+            docs, halt_on_error=False, details=True, on_duplicate=on_duplicate
         )
-        storage.db.update_document({"_id": edge["new"]["_from"], "is_leaf": False})
-        return edge["new"]
     except DocumentInsertError as e:
         raise DataOpsException(f"arango.exceptions.DocumentInsertError: {e}")
+    for detail in res.get("details", []):
+        if match := _import_error_position.match(detail):
+            errors.append((int(match.group(1)), match.group(2)))
+        else:
+            errors.append((None, detail))
+    result = BulkResult(
+        res.get("created", 0), res.get("updated", 0), res.get("ignored", 0), errors, []
+    )
+    return result, None
+
+
+def _merge_bulk_results(results: list[BulkResult]) -> BulkResult:
+    return BulkResult(
+        sum(r.created for r in results),
+        sum(r.updated for r in results),
+        sum(r.ignored for r in results),
+        sorted(
+            (e for r in results for e in r.errors),
+            key=lambda e: -1 if e[0] is None else e[0],
+        ),
+        [d for r in results for d in r.docs],
+    )
+
+
+def _bulk_insert(
+    docs: Iterable[dict],
+    resolve_storage,
+    storage_def,
+    chunk_size: int,
+    on_duplicate: str,
+    return_new: bool,
+    on_inserted=None,
+) -> BulkResult:
+    """Shared implementation of the bulk inserts. Documents of each chunk are grouped
+    by their resolved storage (classes may have different storage), and
+    `on_inserted(storage, docs)` is called with the docs of every group that were
+    created (not those ignored, updated or replaced as duplicates)."""
+    if on_duplicate not in BULK_ON_DUPLICATE_MODES:
+        raise DataOpsException(
+            f"`on_duplicate` must be one of {list(BULK_ON_DUPLICATE_MODES)}"
+        )
+
+    results = []
+    offset = 0
+    for chunk in _chunks(docs, chunk_size):
+        by_storage = {}
+        for i, doc in enumerate(chunk):
+            storage = resolve_storage(doc, storage_def)
+            by_storage.setdefault(storage, []).append((offset + i, doc))
+
+        for storage, indexed_docs in by_storage.items():
+            positions = [i for i, _ in indexed_docs]
+            group_docs = [d for _, d in indexed_docs]
+            res, created = _bulk_insert_chunk(
+                storage.collection,
+                group_docs,
+                on_duplicate,
+                return_new,
+                track_created=on_inserted is not None and on_duplicate != "error",
+            )
+            if on_duplicate in ("update", "replace"):
+                # Existing documents may have been overwritten, including ones
+                # matched by unique indexes rather than by `_key`
+                invalidate_cached(collections=[storage.collection.name])
+            else:
+                notify_written(collections=[storage.collection.name])
+            if on_inserted and created is not None:
+                on_inserted(storage, [group_docs[i] for i in created])
+            elif on_inserted:
+                # Bulk import without duplicates, so the docs that didn't fail were
+                # created
+                failed = {i for i, _ in res.errors}
+                if None in failed:
+                    # Unattributable errors, so positions of failed docs are unknown
+                    inserted = []
+                else:
+                    inserted = [d for i, d in enumerate(group_docs) if i not in failed]
+                on_inserted(storage, inserted)
+            # Map errors back to positions in the input
+            errors = [
+                (positions[i] if i is not None else None, msg) for i, msg in res.errors
+            ]
+            results.append(res._replace(errors=errors))
+        offset += len(chunk)
+
+    return _merge_bulk_results(results)
+
+
+def _checked_vertices(vertices: Iterable[BaseVertex]):
+    for vertex in vertices:
+        if not isinstance(vertex, BaseVertex):
+            raise DataOpsException("`vertices` must be instances of BaseVertex")
+        yield vertex
+
+
+def create_vertices(
+    vertices: Iterable[BaseVertex],
+    storage_def=None,
+    chunk_size: int = BULK_CHUNK_SIZE,
+    on_duplicate: str = "error",
+    return_new: bool = False,
+) -> BulkResult:
+    """
+    Example: `result = create_vertices(SomeVertexType(name=n) for n in names)`
+
+    Inserts `vertices` in chunks of `chunk_size` documents per request. Documents are
+    written with the bulk import API, unless `return_new` is True, in which case
+    `insert_many` is used so that the stored documents can be returned.
+
+    `on_duplicate` controls what happens when a document violates a unique
+    constraint: "error" (reported in `BulkResult.errors`), "update", "replace" or
+    "ignore". Failed documents never abort the rest of the batch.
+
+    Vertices are stored according to their class' `default_storage`, unless
+    `storage_def` is provided.
+    """
+    return _bulk_insert(
+        _checked_vertices(vertices),
+        resolve_vertex_storage,
+        storage_def,
+        chunk_size,
+        on_duplicate,
+        return_new,
+    )
+
+
+def upsert_vertices(
+    vertices: Iterable[BaseVertex],
+    storage_def=None,
+    chunk_size: int = BULK_CHUNK_SIZE,
+    on_duplicate: str = "update",
+    return_new: bool = False,
+) -> BulkResult:
+    """
+    Same as `create_vertices`, but documents that collide with existing ones (by
+    `_key` or unique index) are updated instead of being reported as errors.
+    Pass `on_duplicate="replace"` to replace existing documents instead.
+    """
+    return create_vertices(
+        vertices,
+        storage_def=storage_def,
+        chunk_size=chunk_size,
+        on_duplicate=on_duplicate,
+        return_new=return_new,
+    )
+
+
+def create_edge(
+    edge: BaseEdge, storage_def=None, single_query=None, stream_transaction=False
+) -> dict:
+    """
+    Creates `edge`, and marks its `_to` vertex as not being a root (also setting its
+    `inbound_modified`) and its `_from` vertex as not being a leaf.
+
+    If `single_query` is True (defaults to `single_query_writes`), all of the above
+    is done by one AQL statement, i.e. in one round trip and atomically. Pass
+    `stream_transaction=True` to also run that statement in a stream transaction.
+    """
+    if not isinstance(edge, BaseEdge):
+        raise DataOpsException("`edge` must be an instance of BaseEdge")
+
+    storage = resolve_edge_storage(edge, storage_def)
+    if single_query_writes if single_query is None else single_query:
+        new = _create_edge_single_query(storage, edge, stream_transaction)
+    else:
+        try:
+            new = storage.collection.insert(edge, return_new=True)["new"]
+        except DocumentInsertError as e:
+            raise DataOpsException(f"arango.exceptions.DocumentInsertError: {e}")
+        patches = _add_edge_vertex_patches(
+            {}, [new], timestamp(), storage.collection.name
+        )
+        _apply_vertex_patches(storage.db, patches)
+    # The vertices' flags changed, which also drops cached edges touching them
+    invalidate_cached([new["_id"], new["_from"], new["_to"]])
+    _cache_document(new, storage.collection.name)
+    return new
+
+
+def _execute_write_query(
+    dbase, query: str, bind_vars: dict, write_collections: list, stream_transaction
+) -> list:
+    """Executes a data-modification AQL query, optionally inside a stream transaction
+    that is committed (or aborted on errors) before returning the results."""
+    retries = _write_conflict_retries()
+    for attempt in range(retries + 1):
+        try:
+            # Within `transaction`, `dbase` already belongs to a stream transaction
+            if not stream_transaction or _transaction.get() is not None:
+                return list(dbase.aql.execute(query, bind_vars=bind_vars))
+            txn_db = dbase.begin_transaction(write=write_collections)
+            try:
+                results = list(txn_db.aql.execute(query, bind_vars=bind_vars))
+            except Exception:
+                txn_db.abort_transaction()
+                raise
+            txn_db.commit_transaction()
+            return results
+        except AQLQueryExecuteError as e:
+            if e.error_code == WRITE_CONFLICT_ERROR and attempt < retries:
+                continue
+            raise DataOpsException(f"arango.exceptions.AQLQueryExecuteError: {e}")
+
+
+def _write_conflict_retries() -> int:
+    # A conflict within a stream transaction is left to the caller of `transaction`
+    return WRITE_CONFLICT_RETRIES if _transaction.get() is None else 0
+
+
+def _vertex_patch_subqueries(
+    patches: dict, bind_vars: dict, skip_if: str = None
+) -> str:
+    """Compiles vertex `patches` (see `_add_edge_vertex_patches`) into AQL subqueries
+    (one UPDATE per vertex collection) to be embedded in a larger statement. Bind
+    vars are added to `bind_vars`. The updates are skipped if the AQL condition
+    `skip_if` is true."""
+    subqueries = []
+    for i, (collection, vertex_patches) in enumerate(patches.items()):
+        bind_vars[f"patches_{i}"] = list(vertex_patches.values())
+        bind_vars[f"@vertex_collection_{i}"] = collection
+        patches_expr = f"@patches_{i}"
+        if skip_if:
+            patches_expr = f"({skip_if} ? [] : @patches_{i})"
+        subqueries.append(f"""
+        LET vertex_updates_{i} = (
+            {_vertex_patch_aql(patches_expr, f"@@vertex_collection_{i}")}
+        )""")
+    return "".join(subqueries)
+
+
+def _vertex_patch_aql(patches: str, collection: str) -> str:
+    """AQL applying the vertex `patches` (an AQL array expression) to `collection`
+    (a collection bind parameter), adding the degree deltas of patches (see
+    `_add_degree_deltas`) to the counters of their vertices. Patches of missing
+    vertices are skipped, other errors (e.g. conflicts) fail the statement."""
+    if not degree_counters:
+        return f"""
+            FOR p IN {patches}
+            FOR doc IN {collection}
+            FILTER doc._key == p._key
+            UPDATE doc WITH p IN {collection}"""
+    return f"""
+            FOR p IN {patches}
+            FOR doc IN {collection}
+            FILTER doc._key == p._key
+            UPDATE doc WITH MERGE(
+                UNSET(p, "_degrees"),
+                p._degrees ? {_degree_counters_aql("doc", "p._degrees")} : {{}}
+            ) IN {collection}"""
+
+
+def _degree_counters_aql(doc: str, deltas: str) -> str:
+    """AQL object of the degree counters of `doc` with `deltas` added"""
+    fields = []
+    for direction in ("in", "out"):
+        counter = f"{direction}_degree"
+        fields.append(f"{counter}: ({doc}.{counter} || 0) + ({deltas}.{counter} || 0)")
+        if degree_counters_per_collection:
+            counters = f"{direction}_degrees"
+            by_collection = f"({deltas}.{counters} || {{}})"
+            fields.append(
+                f"{counters}: ZIP(ATTRIBUTES({by_collection}), ("
+                f"FOR c IN ATTRIBUTES({by_collection}) "
+                f"RETURN ({doc}.{counters}[c] || 0) + {by_collection}[c]))"
+            )
+    return "{ " + ", ".join(fields) + " }"
+
+
+def _create_edge_query(edge_collection: str, edge: BaseEdge) -> tuple[str, dict, list]:
+    """Builds the single-statement `create_edge` query. Returns the query, its bind
+    vars and the collections it writes to."""
+    if "_from" not in edge or "_to" not in edge:
+        raise DataOpsException("`edge` must have `_from` and `_to` set")
+
+    now = timestamp()
+    patches = _add_edge_vertex_patches({}, [edge], now, edge_collection)
+    bind_vars = {"edge": edge, "@edge_collection": edge_collection}
+    query = f"""
+        LET edge = FIRST(INSERT @edge INTO @@edge_collection RETURN NEW)
+        {_vertex_patch_subqueries(patches, bind_vars)}
+        RETURN edge
+    """
+    return query, bind_vars, [edge_collection] + list(patches)
+
+
+def _create_edge_single_query(storage: EdgeStorage, edge: BaseEdge, stream_transaction):
+    query, bind_vars, write_collections = _create_edge_query(
+        storage.collection.name, edge
+    )
+    return _execute_write_query(
+        storage.db, query, bind_vars, write_collections, stream_transaction
+    )[0]
+
+
+def _vertex_patch(patches: dict, vertex_id: str) -> dict:
+    collection_patches = patches.setdefault(get_collection_name_from_id(vertex_id), {})
+    return collection_patches.setdefault(
+        vertex_id, {"_key": get_key_from_id(vertex_id)}
+    )
+
+
+def _add_edge_vertex_patches(
+    patches: dict, edges: Iterable[dict], now: str, edge_collection: str = None
+):
+    """
+    Adds the vertex updates implied by newly created `edges` to `patches`, which is
+    keyed by vertex collection and then vertex id, so that every vertex is updated
+    once no matter how many of the edges touch it:
+    * `_to` vertices are no longer roots, and get `inbound_modified` set to `now`
+      (the latest value wins).
+    * `_from` vertices are no longer leaves.
+    * With `degree_counters`, the counters of both are incremented (edges are taken
+      to be in `edge_collection`, or in the collection of their `_id`).
+    """
+    for edge in edges:
+        to_patch = _vertex_patch(patches, edge["_to"])
+        to_patch["is_root"] = False
+        to_patch["inbound_modified"] = max(to_patch.get("inbound_modified", ""), now)
+        _vertex_patch(patches, edge["_from"])["is_leaf"] = False
+    if degree_counters:
+        _add_degree_deltas(patches, edges, 1, edge_collection)
+    return patches
+
+
+def _add_degree_deltas(
+    patches: dict, edges: Iterable[dict], delta: int, edge_collection: str = None
+):
+    """Adds `delta` to the degree counters of the vertices of `edges` in `patches`
+    (see `_add_edge_vertex_patches`), under the `_degrees` key of vertex patches"""
+    for edge in edges:
+        collection = edge_collection or get_collection_name_from_id(edge["_id"])
+        for vertex_id, direction in ((edge["_to"], "in"), (edge["_from"], "out")):
+            degrees = _vertex_patch(patches, vertex_id).setdefault("_degrees", {})
+            counter = f"{direction}_degree"
+            degrees[counter] = degrees.get(counter, 0) + delta
+            if degree_counters_per_collection:
+                counters = degrees.setdefault(f"{direction}_degrees", {})
+                counters[collection] = counters.get(collection, 0) + delta
+    return patches
+
+
+def _apply_vertex_patches(dbase, patches: dict):
+    """Applies vertex `patches` (as built by `_add_edge_vertex_patches`) with one AQL
+    UPDATE per vertex collection, retrying conflicts (see `WRITE_CONFLICT_RETRIES`).
+    Patches for missing vertices are ignored."""
+    query = _vertex_patch_aql("@patches", "@@collection")
+    for collection, vertex_patches in patches.items():
+        invalidate_cached(vertex_patches)
+        if vertex_patches:
+            bind_vars = {
+                "patches": list(vertex_patches.values()),
+                "@collection": collection,
+            }
+            _execute_write_query(dbase, query, bind_vars, [collection], False)
+
+
+def _checked_edges(edges: Iterable[BaseEdge]):
+    for edge in edges:
+        if not isinstance(edge, BaseEdge):
+            raise DataOpsException("`edges` must be instances of BaseEdge")
+        yield edge
+
+
+def create_edges(
+    edges: Iterable[BaseEdge],
+    storage_def=None,
+    chunk_size: int = BULK_CHUNK_SIZE,
+    on_duplicate: str = "error",
+    return_new: bool = False,
+) -> BulkResult:
+    """
+    Example: `result = create_edges(SomeEdgeType(frm=a, to=b) for a, b in pairs)`
+
+    Bulk version of `create_edge`. Edges are inserted in chunks (see
+    `create_vertices` for the meaning of the params), and the resulting
+    `is_root`/`is_leaf`/`inbound_modified` vertex updates are applied afterwards,
+    deduplicated so that each affected vertex is written once, with one AQL query
+    per vertex collection. Edges that failed to insert, or that were ignored,
+    updated or replaced as duplicates, don't affect vertices (which edges were
+    created is then known from `insert_many` rather than the bulk import API).
+    """
+    # Patches per database, then per vertex collection and vertex id
+    patches = {}
+
+    def _on_inserted(storage, inserted):
+        now = timestamp()
+        _add_edge_vertex_patches(
+            patches.setdefault(storage.db, {}), inserted, now, storage.collection.name
+        )
+
+    result = _bulk_insert(
+        _checked_edges(edges),
+        resolve_edge_storage,
+        storage_def,
+        chunk_size,
+        on_duplicate,
+        return_new,
+        on_inserted=_on_inserted,
+    )
+    for dbase, db_patches in patches.items():
+        _apply_vertex_patches(dbase, db_patches)
+    return result
 
 
 def update_edge(edge: BaseEdge, storage_def=None) -> dict:
@@ -160,13 +1644,16 @@ def update_edge(edge: BaseEdge, storage_def=None) -> dict:
 
     if "created" in edge:
         del edge["created"]
-    edge["modified"] = datetime.now(timezone.utc).isoformat()
+    edge["modified"] = timestamp()
 
     storage = resolve_edge_storage(edge, storage_def)
     try:
-        return storage.collection.update(edge, return_new=True)["new"]
+        new = storage.collection.update(edge, return_new=True)["new"]
     except DocumentUpdateError as e:
         raise DataOpsException(f"arango.exceptions.DocumentUpdateError: {e}")
+    invalidate_cached([new["_id"]])
+    _cache_document(new, storage.collection.name)
+    return new
 
 
 def _handle_get_edge_search_args(
@@ -193,15 +1680,14 @@ def get_edge(
     frm: BaseVertex = None,
     to: BaseVertex = None,
     storage_def=None,
+    fields: list[str] = None,
 ) -> dict | None:
+    """Returns the edge matching `search` / `frm` / `to`, like `get_vertex`"""
     search = _handle_get_edge_search_args(search, frm, to)
     storage = resolve_edge_storage(edge_def, storage_def)
-    res = storage.collection.find(search)
-    if res.count() == 0:
-        return None
-    if res.count() > 1:
-        raise DataOpsException("Expected one result but got more")
-    return res.next()
+    if document_cache is not None:
+        return _project(_cached_find(storage, search), fields)
+    return _find_one(storage, search, fields)
 
 
 def get_or_create_edge(
@@ -211,59 +1697,275 @@ def get_or_create_edge(
     to: BaseVertex = None,
     new_doc: dict = None,
     storage_def=None,
+    exclusive: bool = False,
 ) -> tuple[bool, dict]:
     """
     Example: `already_existed, edge = get_or_create_edge(SomeEdgeType, frm=obj1, to=obj2)`
 
     Tries to find an edge of type `edge_def` that matches `search` / `frm` / `to`,
-    otherwise creates a new edge with said properties.
+    otherwise creates a new edge with said properties (or `new_doc`), and then
+    updates the flags of its vertices like `create_edge`.
+
+    The creation and the flag updates are done by a single AQL statement, after
+    looking the edge up (see `get_or_create_vertex` for concurrent calls and
+    `exclusive`).
 
     `frm` and `to` are convenience params for passing in BaseVertexes. Same as
     specifying '_from' or '_to' keys in the `search` param.
     """
-    if edge := get_edge(
-        edge_def, search=search, frm=frm, to=to, storage_def=storage_def
-    ):
-        return True, edge
     search = _handle_get_edge_search_args(search, frm, to)
     if new_doc:
         new_doc = _handle_get_edge_search_args(new_doc, frm, to)
     else:
-        new_doc = _handle_get_edge_search_args(search, frm, to)
+        new_doc = dict(search)
+    edge = edge_def(**new_doc)
+    if "_from" not in edge or "_to" not in edge:
+        raise DataOpsException("`edge` must have `_from` and `_to` set")
 
-    return False, create_edge(edge_def(**new_doc), storage_def)
+    storage = resolve_edge_storage(edge_def, storage_def)
+    then, bind_vars = _edge_flags_then(edge, storage.collection.name)
+    [(existed, new)] = _upsert(storage, [(search, edge)], exclusive, then, bind_vars)
+    if not existed:
+        invalidate_cached([new["_id"], new["_from"], new["_to"]])
+    _cache_document(new, storage.collection.name)
+    return existed, new
 
 
-def list_vertex_edges_by_id(
-    db,
-    graph_name: str,
-    vertex_id: str,
-    outbound_only: bool = False,
-    inbound_only: bool = False,
-) -> Cursor:
+def get_or_create_edges(
+    edge_def: type[BaseEdge],
+    items: Iterable[tuple[dict, dict | None]],
+    storage_def=None,
+    chunk_size: int = BULK_CHUNK_SIZE,
+    exclusive: bool = False,
+) -> list[tuple[bool, dict]]:
+    """Bulk `get_or_create_edge` of `(search, new_doc)` pairs (which must include
+    `_from` and `_to`), with one lookup and one UPSERT statement per chunk of
+    `chunk_size` pairs, followed by the flag updates of the vertices of the created
+    edges. Returns an `(already_existed, edge)` tuple per pair, in order."""
+    storage = resolve_edge_storage(edge_def, storage_def)
+    items = [(search, edge_def(**(new_doc or search))) for search, new_doc in items]
+    for search, edge in items:
+        if "_from" not in edge or "_to" not in edge:
+            raise DataOpsException("`edge` must have `_from` and `_to` set")
+    results = []
+    for chunk in _chunks(items, chunk_size):
+        chunk_results = _upsert(storage, chunk, exclusive)
+        created = [doc for existed, doc in chunk_results if not existed]
+        if created:
+            _apply_vertex_patches(
+                storage.db, _add_edge_vertex_patches({}, created, timestamp())
+            )
+            invalidate_cached([doc["_id"] for doc in created])
+        results.extend(chunk_results)
+    for existed, doc in results:
+        _cache_document(doc, storage.collection.name)
+    return results
+
+
+def _direction(outbound_only: bool = False, inbound_only: bool = False) -> str:
     direction = "ANY"
     if outbound_only:
         direction = "OUTBOUND"
     if inbound_only:
         direction = "INBOUND"
+    return direction
+
+
+def has_outbound_edges(db, graph_name: str, vertex_id: str) -> bool:
+    """Whether the vertex has at least one outbound edge. Stops at the first edge
+    found instead of traversing the whole neighbourhood."""
+    return has_edges(db, graph_name, vertex_id, outbound_only=True)
+
+
+def has_inbound_edges(db, graph_name: str, vertex_id: str) -> bool:
+    """Whether the vertex has at least one inbound edge (see `has_outbound_edges`)"""
+    return has_edges(db, graph_name, vertex_id, inbound_only=True)
+
+
+def has_edges(
+    db,
+    graph_name: str,
+    vertex_id: str,
+    outbound_only: bool = False,
+    inbound_only: bool = False,
+) -> bool:
+    query = f"""
+        FOR v, e IN 1 {_direction(outbound_only, inbound_only)} @vertex_id
+        GRAPH @graph_name
+        LIMIT 1
+        RETURN 1
+    """
+    bind_vars = {"graph_name": graph_name, "vertex_id": vertex_id}
+    return len(list(db.aql.execute(query, bind_vars=bind_vars))) > 0
+
+
+def vertex_degree(
+    db,
+    graph_name: str,
+    vertex_id: str,
+    outbound_only: bool = False,
+    inbound_only: bool = False,
+) -> int:
+    """Returns the number of immediate edges of the vertex, without sorting or
+    returning the edges themselves"""
+    query = f"""
+        RETURN COUNT(
+            FOR v, e IN 1 {_direction(outbound_only, inbound_only)} @vertex_id
+            GRAPH @graph_name
+            RETURN 1
+        )
+    """
+    bind_vars = {"graph_name": graph_name, "vertex_id": vertex_id}
+    return db.aql.execute(query, bind_vars=bind_vars).next()
+
+
+def _edge_row(bind_vars: dict, vertex_fields=None, edge_fields=None) -> str:
+    """Returns the AQL expression for the rows returned by the edge listings, with
+    optional projections (bind vars are added to `bind_vars`)"""
+    vertex_expr = "v"
+    if vertex_fields is not None:
+        vertex_expr = "KEEP(v, @vertex_fields)"
+        bind_vars["vertex_fields"] = list({"_id", *vertex_fields})
+
+    edge_expr = "e"
+    if edge_fields is not None:
+        edge_expr = "KEEP(e, @edge_fields)"
+        bind_vars["edge_fields"] = list({"_id", "modified", *edge_fields})
+
+    return f"""{{
+            vertex: {vertex_expr},
+            edge: {edge_expr},
+            direction: e._to == v._id ? 'outbound' : 'inbound'
+        }}"""
+
+
+def _list_vertex_edges_query(
+    graph_name: str,
+    vertex_id: str,
+    outbound_only: bool = False,
+    inbound_only: bool = False,
+    limit: int = None,
+    after: tuple[str, str] = None,
+    vertex_fields: list[str] = None,
+    edge_fields: list[str] = None,
+) -> tuple[str, dict]:
+    direction = _direction(outbound_only, inbound_only)
     bind_vars = {
         "graph_name": graph_name,
         "vertex_id": vertex_id,
     }
 
+    after_filter = ""
+    if after is not None:
+        after_filter = """
+        FILTER
+            e.modified < @after_modified
+            OR (e.modified == @after_modified AND e._id < @after_id)"""
+        bind_vars["after_modified"], bind_vars["after_id"] = after
+
+    limit_clause = ""
+    if limit is not None:
+        limit_clause = "LIMIT @limit"
+        bind_vars["limit"] = limit
+
     query = f"""
         FOR v, e IN 1 {direction} @vertex_id
         GRAPH @graph_name
+        {after_filter}
         SORT
-            e.modified DESC
-        RETURN {{
-            vertex: v,
-            edge: e,
-            direction: e._to == v._id ? 'outbound' : 'inbound'
-        }}
+            e.modified DESC, e._id DESC
+        {limit_clause}
+        RETURN {_edge_row(bind_vars, vertex_fields, edge_fields)}
     """
 
-    return db.aql.execute(query, bind_vars=bind_vars, count=True)
+    return query, bind_vars
+
+
+def list_vertex_edges_by_id(
+    db,
+    graph_name: str,
+    vertex_id: str,
+    outbound_only: bool = False,
+    inbound_only: bool = False,
+    limit: int = None,
+    after: tuple[str, str] = None,
+    batch_size: int = None,
+    stream: bool = False,
+    vertex_fields: list[str] = None,
+    edge_fields: list[str] = None,
+) -> Cursor:
+    """
+    Returns a cursor over the immediate (depth == 1) edges of the vertex, most
+    recently modified first.
+
+    * `limit` and `after` page through the edges with a keyset cursor: pass the
+      `edge_cursor()` of the last row of a page as `after` to get the next page.
+    * `batch_size` and `stream` are passed on to the AQL cursor. Streamed cursors
+      produce results lazily, but don't provide a `count()`.
+    * `vertex_fields` / `edge_fields` project the returned vertices / edges to the
+      given fields (`_id` is always included, as well as `modified` for edges).
+    """
+    query, bind_vars = _list_vertex_edges_query(
+        graph_name,
+        vertex_id,
+        outbound_only,
+        inbound_only,
+        limit,
+        after,
+        vertex_fields,
+        edge_fields,
+    )
+    return db.aql.execute(
+        query,
+        bind_vars=bind_vars,
+        count=not stream,
+        batch_size=batch_size,
+        stream=stream,
+    )
+
+
+def edge_cursor(row: dict) -> tuple[str, str]:
+    """Returns the keyset cursor of a row returned by `list_vertex_edges_by_id`, to
+    be passed as the `after` param when fetching the next page."""
+    return (row["edge"]["modified"], row["edge"]["_id"])
+
+
+def iter_vertex_edges_by_id(
+    db,
+    graph_name: str,
+    vertex_id: str,
+    outbound_only: bool = False,
+    inbound_only: bool = False,
+    page_size: int = 100,
+    after: tuple[str, str] = None,
+    vertex_fields: list[str] = None,
+    edge_fields: list[str] = None,
+):
+    """Generator that lazily yields the rows of `list_vertex_edges_by_id`, fetching
+    `page_size` rows at a time with keyset pagination, so that the cost of each page
+    stays constant regardless of the size of the neighbourhood."""
+    while True:
+        cursor = list_vertex_edges_by_id(
+            db,
+            graph_name,
+            vertex_id,
+            outbound_only=outbound_only,
+            inbound_only=inbound_only,
+            limit=page_size,
+            after=after,
+            batch_size=page_size,
+            stream=True,
+            vertex_fields=vertex_fields,
+            edge_fields=edge_fields,
+        )
+        row = None
+        fetched = 0
+        for row in cursor:
+            fetched += 1
+            yield row
+        if fetched < page_size:
+            return
+        after = edge_cursor(row)
 
 
 def list_vertex_edges(
@@ -271,28 +1973,497 @@ def list_vertex_edges(
     vertex_id: str,
     outbound_only: bool = False,
     inbound_only: bool = False,
+    **kwargs,
 ) -> Cursor:
-    """Returns the immediate (depth == 1) edges of the vertex"""
+    """Returns the immediate (depth == 1) edges of the vertex. See
+    `list_vertex_edges_by_id` for the supported `kwargs`."""
     (db, graph, collection) = resolve_vertex_storage(vertex_def)
     return list_vertex_edges_by_id(
-        db, graph.name, vertex_id, outbound_only, inbound_only
+        db, graph.name, vertex_id, outbound_only, inbound_only, **kwargs
+    )
+
+
+def iter_vertex_edges(
+    vertex_def: type[BaseVertex],
+    vertex_id: str,
+    outbound_only: bool = False,
+    inbound_only: bool = False,
+    **kwargs,
+):
+    """Lazily yields the immediate (depth == 1) edges of the vertex. See
+    `iter_vertex_edges_by_id` for the supported `kwargs`."""
+    (db, graph, collection) = resolve_vertex_storage(vertex_def)
+    return iter_vertex_edges_by_id(
+        db, graph.name, vertex_id, outbound_only, inbound_only, **kwargs
+    )
+
+
+def _list_edges_for_vertices_query(
+    graph_name: str,
+    vertex_ids: list[str],
+    outbound_only: bool = False,
+    inbound_only: bool = False,
+    per_vertex_limit: int = None,
+    vertex_fields: list[str] = None,
+    edge_fields: list[str] = None,
+) -> tuple[str, dict]:
+    direction = _direction(outbound_only, inbound_only)
+    bind_vars = {"graph_name": graph_name, "vertex_ids": vertex_ids}
+
+    limit_clause = ""
+    if per_vertex_limit is not None:
+        limit_clause = "LIMIT @per_vertex_limit"
+        bind_vars["per_vertex_limit"] = per_vertex_limit
+
+    query = f"""
+        FOR vertex_id IN @vertex_ids
+            RETURN {{
+                vertex_id: vertex_id,
+                edges: (
+                    FOR v, e IN 1 {direction} vertex_id
+                    GRAPH @graph_name
+                    SORT
+                        e.modified DESC, e._id DESC
+                    {limit_clause}
+                    RETURN {_edge_row(bind_vars, vertex_fields, edge_fields)}
+                )
+            }}
+    """
+    return query, bind_vars
+
+
+def list_edges_for_vertices_by_id(
+    db,
+    graph_name: str,
+    vertex_ids: list[str],
+    outbound_only: bool = False,
+    inbound_only: bool = False,
+    per_vertex_limit: int = None,
+    vertex_fields: list[str] = None,
+    edge_fields: list[str] = None,
+) -> dict[str, list[dict]]:
+    """
+    Returns the immediate (depth == 1) edges of all `vertex_ids` with a single query,
+    as a dict of vertex id -> rows (same rows and order as `list_vertex_edges_by_id`).
+    Every vertex id is present in the result, with an empty list if it has no edges.
+    `per_vertex_limit` caps the number of rows per vertex.
+    """
+    vertex_ids = list(dict.fromkeys(vertex_ids))
+    if not vertex_ids:
+        return {}
+    query, bind_vars = _list_edges_for_vertices_query(
+        graph_name,
+        vertex_ids,
+        outbound_only,
+        inbound_only,
+        per_vertex_limit,
+        vertex_fields,
+        edge_fields,
     )
+    grouped = {vertex_id: [] for vertex_id in vertex_ids}
+    for res in db.aql.execute(query, bind_vars=bind_vars, batch_size=len(vertex_ids)):
+        grouped[res["vertex_id"]] = res["edges"]
+    return grouped
+
+
+def list_edges_for_vertices(
+    vertex_def: type[BaseVertex],
+    vertex_ids: list[str],
+    outbound_only: bool = False,
+    inbound_only: bool = False,
+    **kwargs,
+) -> dict[str, list[dict]]:
+    """Returns the immediate (depth == 1) edges of each of the vertices, grouped per
+    vertex id, with one query. See `list_edges_for_vertices_by_id` for the supported
+    `kwargs`."""
+    (db, graph, collection) = resolve_vertex_storage(vertex_def)
+    return list_edges_for_vertices_by_id(
+        db, graph.name, vertex_ids, outbound_only, inbound_only, **kwargs
+    )
+
+
+TRAVERSAL_DIRECTIONS = ("OUTBOUND", "INBOUND", "ANY")
+TRAVERSAL_UNIQUE_VERTICES = ("none", "path", "global")
+TRAVERSAL_UNIQUE_EDGES = ("none", "path")
+TRAVERSAL_ORDERS = ("dfs", "bfs", "weighted")
+
+
+def _traverse_query(
+    graph_name: str,
+    start_ids: str | list[str],
+    min_depth: int = 1,
+    max_depth: int = 1,
+    direction: str = "OUTBOUND",
+    edge_collections: list[str] = None,
+    prune: str | list[str] = None,
+    bind_vars: dict = None,
+    unique_vertices: str = None,
+    unique_edges: str = None,
+    order: str = None,
+    limit: int = None,
+    include_path: bool = False,
+) -> tuple[str, dict]:
+    direction = direction.upper()
+    if direction not in TRAVERSAL_DIRECTIONS:
+        raise DataOpsException(f"`direction` must be one of {TRAVERSAL_DIRECTIONS}")
+    if unique_vertices is not None and unique_vertices not in TRAVERSAL_UNIQUE_VERTICES:
+        raise DataOpsException(
+            f"`unique_vertices` must be one of {TRAVERSAL_UNIQUE_VERTICES}"
+        )
+    if unique_edges is not None and unique_edges not in TRAVERSAL_UNIQUE_EDGES:
+        raise DataOpsException(
+            f"`unique_edges` must be one of {TRAVERSAL_UNIQUE_EDGES}"
+        )
+    if order is not None and order not in TRAVERSAL_ORDERS:
+        raise DataOpsException(f"`order` must be one of {TRAVERSAL_ORDERS}")
+    min_depth, max_depth = int(min_depth), int(max_depth)
+    if not 0 <= min_depth <= max_depth:
+        raise DataOpsException("Expected 0 <= `min_depth` <= `max_depth`")
+
+    if isinstance(start_ids, str):
+        start_ids = [start_ids]
+    bind_vars = dict(bind_vars or {})
+    bind_vars["traverse_graph_name"] = graph_name
+    bind_vars["traverse_start_ids"] = list(start_ids)
+
+    prune_clause = ""
+    if prune:
+        if isinstance(prune, str):
+            prune = [prune]
+        prune_clause = "PRUNE " + " OR ".join(f"({p})" for p in prune)
+
+    options = {}
+    if edge_collections is not None:
+        options["edgeCollections"] = [str(c) for c in edge_collections]
+    if unique_vertices is not None:
+        options["uniqueVertices"] = unique_vertices
+    if unique_edges is not None:
+        options["uniqueEdges"] = unique_edges
+    if order is not None:
+        options["order"] = order
+    options_clause = f"OPTIONS {json.dumps(options)}" if options else ""
+
+    limit_clause = ""
+    if limit is not None:
+        limit_clause = "LIMIT @traverse_limit"
+        bind_vars["traverse_limit"] = limit
+
+    path = ", path: p" if include_path else ""
+    query = f"""
+        FOR start_id IN @traverse_start_ids
+            FOR v, e, p IN {min_depth}..{max_depth} {direction} start_id
+            GRAPH @traverse_graph_name
+            {prune_clause}
+            {options_clause}
+            {limit_clause}
+            RETURN {{
+                start: start_id,
+                vertex: v,
+                edge: e,
+                depth: LENGTH(p.edges){path}
+            }}
+    """
+    return query, bind_vars
 
 
-def delete_edge(edge_def: type[BaseEdge], id: str, storage_def=None) -> bool:
+def traverse_by_id(
+    db,
+    graph_name: str,
+    start_ids: str | list[str],
+    min_depth: int = 1,
+    max_depth: int = 1,
+    direction: str = "OUTBOUND",
+    edge_collections: list[str] = None,
+    prune: str | list[str] = None,
+    bind_vars: dict = None,
+    unique_vertices: str = None,
+    unique_edges: str = None,
+    order: str = None,
+    limit: int = None,
+    include_path: bool = False,
+    batch_size: int = None,
+    stream: bool = True,
+) -> Cursor:
+    """
+    Runs a single AQL traversal of `graph_name` from one or more start vertices, and
+    returns a (streamed, by default) cursor of
+    `{start, vertex, edge, depth[, path]}` rows.
+
+    * `edge_collections` restricts the traversal to the given edge collections.
+    * `prune` is one or more AQL conditions on the traversal variables `v`, `e` and
+      `p` (e.g. `"v.is_leaf == true"`); the traversal does not go past vertices for
+      which any of them is true. Additional bind vars used by the conditions can be
+      passed in `bind_vars` (names starting with "traverse_" are reserved).
+    * `unique_vertices` ("none", "path", "global"), `unique_edges` ("none", "path")
+      and `order` ("dfs", "bfs", "weighted") are passed on as traversal options.
+    * `limit` caps the total number of rows returned.
+    """
+    query, bind_vars = _traverse_query(
+        graph_name,
+        start_ids,
+        min_depth=min_depth,
+        max_depth=max_depth,
+        direction=direction,
+        edge_collections=edge_collections,
+        prune=prune,
+        bind_vars=bind_vars,
+        unique_vertices=unique_vertices,
+        unique_edges=unique_edges,
+        order=order,
+        limit=limit,
+        include_path=include_path,
+    )
+    return db.aql.execute(
+        query, bind_vars=bind_vars, batch_size=batch_size, stream=stream
+    )
+
+
+def traverse(
+    vertex_def: type[BaseVertex],
+    start: str | dict | list[str | dict],
+    **kwargs,
+) -> Cursor:
+    """
+    Example: `rows = traverse(SomeVertexType, vertex, max_depth=3, direction="ANY")`
+
+    Traverses the graph of `vertex_def` from `start`, which can be a vertex id, a
+    vertex, or a list of either. See `traverse_by_id` for the supported `kwargs`.
+    """
+    (db, graph, collection) = resolve_vertex_storage(vertex_def)
+    if not isinstance(start, list):
+        start = [start]
+    start_ids = [s["_id"] if isinstance(s, dict) else s for s in start]
+    return traverse_by_id(db, graph.name, start_ids, **kwargs)
+
+
+def delete_edge(
+    edge_def: type[BaseEdge],
+    id: str,
+    storage_def=None,
+    single_query=None,
+    stream_transaction=False,
+) -> bool:
+    """
+    Deletes the edge with `id`, marking its `_from` vertex as a leaf if it has no
+    outbound edges left.
+
+    See `create_edge` for the `single_query` and `stream_transaction` params.
+    """
     storage = resolve_edge_storage(edge_def, storage_def)
+    if single_query_writes if single_query is None else single_query:
+        if storage_def is None:
+            storage_def = edge_def.default_storage
+        return _delete_edge_single_query(storage, storage_def, id, stream_transaction)
     res = storage.collection.delete({"_id": id}, return_old=True)
+    invalidate_cached([id])
     # logger.debug(res)
     if res:
-        from_vertex_id = res["old"]["_from"]
-        edges_cursor = list_vertex_edges_by_id(
-            storage.db, storage.graph.name, from_vertex_id, outbound_only=True
-        )
-        if edges_cursor.count() == 0:
-            res = storage.graph.update_vertex({"_id": from_vertex_id, "is_leaf": True})
+        old = res["old"]
+        patches = {}
+        if degree_counters:
+            _add_degree_deltas(patches, [old], -1, storage.collection.name)
+        if not has_outbound_edges(storage.db, storage.graph.name, old["_from"]):
+            _vertex_patch(patches, old["_from"])["is_leaf"] = True
+        _apply_vertex_patches(storage.db, patches)
         return True
     return False
 
 
+def delete_edges(
+    edge_def: type[BaseEdge],
+    ids: Iterable[str],
+    storage_def=None,
+    chunk_size: int = BULK_CHUNK_SIZE,
+) -> int:
+    """
+    Bulk version of `delete_edge`. Edges are deleted in chunks, and the leaf status
+    of the affected `_from` vertices is recomputed once per vertex afterwards.
+    Returns the number of deleted edges (ids that don't exist are skipped).
+    """
+    storage = resolve_edge_storage(edge_def, storage_def)
+    deleted = 0
+    from_vertex_ids = set()
+    patches = {}
+    for chunk in _chunks(ids, chunk_size):
+        results = storage.collection.delete_many(
+            [{"_id": id} for id in chunk], return_old=True
+        )
+        olds = [res["old"] for res in results if isinstance(res, dict) and "old" in res]
+        deleted += len(olds)
+        from_vertex_ids.update(old["_from"] for old in olds)
+        if degree_counters:
+            _add_degree_deltas(patches, olds, -1, storage.collection.name)
+        invalidate_cached(chunk)
+
+    if from_vertex_ids:
+        query = """
+            FOR vertex_id IN @vertex_ids
+            FILTER LENGTH(
+                FOR v, e IN 1 OUTBOUND vertex_id
+                GRAPH @graph_name
+                LIMIT 1
+                RETURN 1
+            ) == 0
+            RETURN vertex_id
+        """
+        bind_vars = {
+            "vertex_ids": list(from_vertex_ids),
+            "graph_name": storage.graph.name,
+        }
+        for vertex_id in storage.db.aql.execute(query, bind_vars=bind_vars):
+            _vertex_patch(patches, vertex_id)["is_leaf"] = True
+    _apply_vertex_patches(storage.db, patches)
+    return deleted
+
+
+def _delete_edge_query(
+    graph_name: str, edge_collection: str, storage_def: dict, id: str
+) -> tuple[str, dict, list]:
+    """Builds the single-statement `delete_edge` query. Returns the query, its bind
+    vars and the collections it writes to."""
+    # The vertices' collections are only known once the edge has been read, so an
+    # UPDATE is compiled for each collection allowed by the edge definition, and
+    # only the ones matching the edge's vertices do any work.
+    edge_def = storage_def["edge_definition"]
+    vertex_collections = list(edge_def["from_vertex_collections"])
+    bind_vars = {
+        "key": get_key_from_id(id),
+        "graph_name": graph_name,
+        "@edge_collection": edge_collection,
+    }
+    if degree_counters:
+        for collection in edge_def["to_vertex_collections"]:
+            if collection not in vertex_collections:
+                vertex_collections.append(collection)
+        bind_vars["edge_collection_name"] = edge_collection
+        # A self-loop is counted once in each direction of the same patch
+        from_degrees = "{ out_degree: -1, in_degree: is_loop ? -1 : 0"
+        to_degrees = "{ in_degree: -1"
+        if degree_counters_per_collection:
+            from_degrees += (
+                ", out_degrees: { [@edge_collection_name]: -1 }"
+                ", in_degrees: is_loop ? { [@edge_collection_name]: -1 } : {}"
+            )
+            to_degrees += ", in_degrees: { [@edge_collection_name]: -1 }"
+        vertex_patches = f"""APPEND(
+                [MERGE(
+                    {{ _id: old._from, _degrees: {from_degrees} }} }},
+                    has_outbound ? {{}} : {{ is_leaf: true }}
+                )],
+                is_loop ? [] : [{{ _id: old._to, _degrees: {to_degrees} }} }}]
+            )"""
+    else:
+        vertex_patches = "has_outbound ? [] : [{ _id: old._from, is_leaf: true }]"
+
+    subqueries = []
+    for i, collection in enumerate(vertex_collections):
+        bind_vars[f"vertex_collection_{i}"] = collection
+        bind_vars[f"@vertex_collection_{i}"] = collection
+        patches = f"""(
+                    FOR p IN vertex_patches
+                    LET vertex = PARSE_IDENTIFIER(p._id)
+                    FILTER vertex.collection == @vertex_collection_{i}
+                    RETURN MERGE(UNSET(p, "_id"), {{ _key: vertex.key }})
+                )"""
+        subqueries.append(f"""
+            LET vertex_updates_{i} = (
+                {_vertex_patch_aql(patches, f"@@vertex_collection_{i}")}
+            )""")
+    query = f"""
+        FOR old IN @@edge_collection
+            FILTER old._key == @key
+            LIMIT 1
+            LET is_loop = old._from == old._to
+            LET has_outbound = LENGTH(
+                FOR v, e IN 1 OUTBOUND old._from
+                GRAPH @graph_name
+                FILTER e._id != old._id
+                LIMIT 1
+                RETURN 1
+            ) > 0
+            REMOVE old IN @@edge_collection
+            LET vertex_patches = {vertex_patches}
+            {"".join(subqueries)}
+            RETURN [old._from, old._to]
+    """
+    return query, bind_vars, [edge_collection] + vertex_collections
+
+
+def _delete_edge_single_query(
+    storage: EdgeStorage, storage_def: dict, id: str, stream_transaction
+) -> bool:
+    query, bind_vars, write_collections = _delete_edge_query(
+        storage.graph.name, storage.collection.name, storage_def, id
+    )
+    rows = _execute_write_query(
+        storage.db, query, bind_vars, write_collections, stream_transaction
+    )
+    invalidate_cached([id, *(vertex_id for row in rows for vertex_id in row)])
+    return bool(rows)
+
+
+def repair_degree_counters(
+    vertex_def: type[BaseVertex], storage_def=None, chunk_size: int = BULK_CHUNK_SIZE
+) -> int:
+    """
+    Recomputes the degree counters (see `degree_counters`) of all the vertices of
+    `vertex_def` from their edges in its graph, `chunk_size` vertices per query.
+    Run it after enabling `degree_counters` on existing vertices, or to repair
+    counters that drifted (e.g. `delete_vertex` removes edges without updating the
+    vertices at their other end). Returns the number of vertices updated.
+    """
+    storage = resolve_vertex_storage(vertex_def, storage_def)
+    counters = "in_degree: LENGTH(inbound), out_degree: LENGTH(outbound)"
+    per_collection = ""
+    if degree_counters_per_collection:
+        per_collection = """
+            LET in_counts = (
+                FOR c IN inbound COLLECT name = c WITH COUNT INTO n RETURN [name, n]
+            )
+            LET out_counts = (
+                FOR c IN outbound COLLECT name = c WITH COUNT INTO n RETURN [name, n]
+            )"""
+        counters += (
+            ", in_degrees: ZIP(in_counts[*][0], in_counts[*][1])"
+            ", out_degrees: ZIP(out_counts[*][0], out_counts[*][1])"
+        )
+    query = f"""
+        FOR v IN @@collection
+            FILTER v._key > @after
+            SORT v._key
+            LIMIT @chunk_size
+            LET inbound = (
+                FOR u, e IN 1 INBOUND v GRAPH @graph_name
+                RETURN PARSE_IDENTIFIER(e).collection
+            )
+            LET outbound = (
+                FOR u, e IN 1 OUTBOUND v GRAPH @graph_name
+                RETURN PARSE_IDENTIFIER(e).collection
+            ){per_collection}
+            UPDATE v WITH {{ {counters} }} IN @@collection
+            OPTIONS {{ mergeObjects: false }}
+            RETURN NEW._key
+    """
+    bind_vars = {
+        "@collection": storage.collection.name,
+        "graph_name": storage.graph.name,
+        "chunk_size": chunk_size,
+        "after": "",
+    }
+    updated = 0
+    while True:
+        keys = list(storage.db.aql.execute(query, bind_vars=bind_vars))
+        updated += len(keys)
+        if len(keys) < chunk_size:
+            break
+        bind_vars["after"] = keys[-1]
+    invalidate_cached(collections=[storage.collection.name])
+    return updated
+
+
 def get_collection_name_from_id(id: str):
     return id.split("/")[0]
+
+
+def get_key_from_id(id: str):
+    return id.split("/", 1)[1]
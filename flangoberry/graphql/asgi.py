@@ -0,0 +1,39 @@
+from strawberry import asgi
+from flangoberry import aio_db, aio_graph_ops
+from .executor import RequestExecutor
+from .loaders import GraphLoaders
+
+
+class GraphQL(asgi.GraphQL):
+    """
+    Strawberry's ASGI app, with flangoberry's request-scoped additions to the
+    GraphQL context (`loaders`, backed by `flangoberry.aio_graph_ops`, and an
+    `executor` for sync resolvers, see `flangoberry.graphql.executor.threaded`).
+
+    Also answers ASGI lifespan events, closing the async database connections on
+    shutdown. Requires Strawberry's ASGI extra
+    (`pip install "strawberry-graphql[asgi]"`) and an ASGI server such as uvicorn.
+    """
+
+    request_concurrency = None
+
+    async def get_context(self, request, response):
+        context = await super().get_context(request, response)
+        context["executor"] = RequestExecutor(self.request_concurrency)
+        context["loaders"] = GraphLoaders(aio_graph_ops)
+        return context
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "lifespan":
+            return await self._lifespan(receive, send)
+        return await super().__call__(scope, receive, send)
+
+    async def _lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message["type"] == "lifespan.startup":
+                await send({"type": "lifespan.startup.complete"})
+            elif message["type"] == "lifespan.shutdown":
+                await aio_db.close_connections()
+                await send({"type": "lifespan.shutdown.complete"})
+                return
@@ -0,0 +1,153 @@
+from graphql import (
+    FieldNode,
+    FragmentDefinitionNode,
+    FragmentSpreadNode,
+    GraphQLError,
+    GraphQLList,
+    OperationType,
+    get_named_type,
+    get_nullable_type,
+    is_composite_type,
+)
+from graphql.execution.values import get_argument_values
+from graphql.utilities import get_operation_ast
+from strawberry.extensions import SchemaExtension
+
+#
+# Arguments taken as the number of items returned by list fields
+#
+LIST_SIZE_ARGUMENTS = ("limit", "first", "last", "per_vertex_limit")
+
+
+class QueryCostLimiter(SchemaExtension):
+    """
+    Rejects operations whose estimated cost or depth is over `max_cost` /
+    `max_depth` before they are executed, and returns the estimate in the `cost`
+    response extension. Added to the schema by `create_app` when the
+    GRAPHQL_MAX_QUERY_COST or GRAPHQL_MAX_QUERY_DEPTH setting is set.
+
+    The cost of an operation approximates the number of graph_ops calls it makes:
+    fields of object types cost `object_cost` (a lookup each) and scalar fields
+    `scalar_cost`, unless set in `field_costs` ({"Type.fieldName": cost}). The
+    selections of list fields are multiplied by their `limit` (or other
+    LIST_SIZE_ARGUMENTS) argument, or by `default_list_size` without one.
+    Introspection fields are free.
+    """
+
+    def __init__(
+        self,
+        max_cost: int = None,
+        max_depth: int = None,
+        field_costs: dict = None,
+        object_cost: int = 1,
+        scalar_cost: int = 0,
+        default_list_size: int = 10,
+    ):
+        self.max_cost = max_cost
+        self.max_depth = max_depth
+        self.field_costs = field_costs or {}
+        self.object_cost = object_cost
+        self.scalar_cost = scalar_cost
+        self.default_list_size = default_list_size
+
+    def estimate(self, schema, document, operation_name=None, variables=None):
+        """Returns the (cost, depth) of the operation of a GraphQL `document`"""
+        operation = get_operation_ast(document, operation_name)
+        if operation is None:
+            return 0, 0
+        root_type = {
+            OperationType.QUERY: schema.query_type,
+            OperationType.MUTATION: schema.mutation_type,
+            OperationType.SUBSCRIPTION: schema.subscription_type,
+        }[operation.operation]
+        fragments = {
+            definition.name.value: definition
+            for definition in document.definitions
+            if isinstance(definition, FragmentDefinitionNode)
+        }
+        return self._selections_cost(
+            schema, operation.selection_set, root_type, fragments, variables or {}
+        )
+
+    def _selections_cost(
+        self, schema, selection_set, parent_type, fragments, variables
+    ):
+        cost = depth = 0
+        for selection in selection_set.selections:
+            if isinstance(selection, FieldNode):
+                field_cost, field_depth = self._field_cost(
+                    schema, selection, parent_type, fragments, variables
+                )
+            else:
+                if isinstance(selection, FragmentSpreadNode):
+                    selection = fragments[selection.name.value]
+                type_condition = selection.type_condition
+                field_cost, field_depth = self._selections_cost(
+                    schema,
+                    selection.selection_set,
+                    (
+                        schema.get_type(type_condition.name.value)
+                        if type_condition
+                        else parent_type
+                    ),
+                    fragments,
+                    variables,
+                )
+            cost += field_cost
+            depth = max(depth, field_depth)
+        return cost, depth
+
+    def _field_cost(self, schema, node, parent_type, fragments, variables):
+        name = node.name.value
+        fields = getattr(parent_type, "fields", {})
+        if name.startswith("__") or name not in fields:
+            return 0, 0
+        field = fields[name]
+        field_type = get_named_type(field.type)
+        cost = self.field_costs.get(
+            f"{parent_type.name}.{name}",
+            self.object_cost if is_composite_type(field_type) else self.scalar_cost,
+        )
+        if not node.selection_set:
+            return cost, 1
+
+        multiplier = 1
+        if isinstance(get_nullable_type(field.type), GraphQLList):
+            multiplier = self.default_list_size
+            args = get_argument_values(field, node, variables)
+            for arg in LIST_SIZE_ARGUMENTS:
+                if isinstance(args.get(arg), int):
+                    # Negative sizes would offset the cost of other fields
+                    multiplier = max(0, args[arg])
+                    break
+        selections_cost, selections_depth = self._selections_cost(
+            schema, node.selection_set, field_type, fragments, variables
+        )
+        return cost + multiplier * selections_cost, selections_depth + 1
+
+    def on_execute(self):
+        execution_context = self.execution_context
+        cost, depth = self.estimate(
+            execution_context.schema._schema,
+            execution_context.graphql_document,
+            execution_context.operation_name,
+            execution_context.variables,
+        )
+        execution_context.query_cost = {"requested": cost, "depth": depth}
+        if self.max_cost is not None:
+            execution_context.query_cost["maximum"] = self.max_cost
+            if cost > self.max_cost:
+                raise GraphQLError(
+                    f"Query cost {cost} exceeds the maximum cost of {self.max_cost}",
+                    extensions={"code": "QUERY_TOO_COSTLY"},
+                )
+        if self.max_depth is not None and depth > self.max_depth:
+            raise GraphQLError(
+                f"Query depth {depth} exceeds the maximum depth of {self.max_depth}",
+                extensions={"code": "QUERY_TOO_DEEP"},
+            )
+        yield
+
+    def get_results(self):
+        cost = getattr(self.execution_context, "query_cost", None)
+        return {"cost": cost} if cost else {}
@@ -0,0 +1,96 @@
+import asyncio
+import contextvars
+import functools
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from strawberry.types import Info
+
+#
+# The thread pool is shared by all requests (and so are the pooled connections of
+# the sync Arango clients it uses), while the concurrency of each request is
+# limited by its `RequestExecutor`.
+#
+executor_workers = 8
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def get_executor() -> ThreadPoolExecutor:
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=executor_workers, thread_name_prefix="flangoberry-graphql"
+            )
+        return _executor
+
+
+def configure_executor(workers: int):
+    """Sets the number of threads of the shared pool, replacing the current pool
+    (running calls are allowed to finish)"""
+    global _executor, executor_workers
+    with _executor_lock:
+        executor_workers = workers
+        if _executor is not None:
+            _executor.shutdown(wait=False)
+            _executor = None
+
+
+class RequestExecutor:
+    """
+    Runs blocking calls (e.g. graph_ops lookups) of one GraphQL request in the
+    shared thread pool, so the independent lookups of sibling resolvers overlap
+    instead of running one after another. At most `max_concurrency` calls of the
+    request run at once (no per-request limit if None).
+
+    An instance is added to the GraphQL context as `info.context["executor"]` by the
+    flangoberry async GraphQL views. See `threaded` for the simplest way of using it.
+    """
+
+    def __init__(self, max_concurrency: int = None):
+        self.max_concurrency = max_concurrency
+        self._semaphore = None
+
+    async def run(self, fn, *args, **kwargs):
+        """Runs `fn(*args, **kwargs)` in the thread pool and returns its result"""
+        if self.max_concurrency and self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        # Run in a copy of the current context, so context variables are visible to
+        # the call
+        call = functools.partial(contextvars.copy_context().run, fn, *args, **kwargs)
+        loop = asyncio.get_running_loop()
+        if self._semaphore is None:
+            return await loop.run_in_executor(get_executor(), call)
+        async with self._semaphore:
+            return await loop.run_in_executor(get_executor(), call)
+
+
+def threaded(resolver):
+    """
+    Decorator that turns a sync resolver into an async one that runs in the
+    request's `RequestExecutor` (or, if the resolver doesn't take `info`, in the
+    shared thread pool with no per-request limit).
+
+    Example:
+    ```
+    @strawberry.field
+    @threaded
+    def node(self, info: Info, id: str) -> SomeType:
+        return SomeType.from_dbdoc(graph_ops.get_vertex(SomeVertex, {"_id": id}))
+    ```
+
+    Requires an async GraphQL view (see the GRAPHQL_ASYNC setting).
+    """
+
+    @functools.wraps(resolver)
+    async def wrapper(*args, **kwargs):
+        executor = None
+        for arg in (*args, *kwargs.values()):
+            if isinstance(arg, Info):
+                executor = arg.context.get("executor")
+                break
+        if executor is None:
+            executor = RequestExecutor()
+        return await executor.run(resolver, *args, **kwargs)
+
+    return wrapper
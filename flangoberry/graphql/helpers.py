@@ -1,5 +1,35 @@
 from datetime import datetime
+import strawberry
+from strawberry.types.base import StrawberryObjectDefinition
 
 
 def to_py_date(iso_date) -> datetime:
     return datetime.fromisoformat(iso_date)
+
+
+def with_schema_extensions(schema, extensions: list):
+    """Returns a copy of the Strawberry `schema` with `extensions` (SchemaExtension
+    instances) added to its own, except for those of a class it already has. The
+    original schema is left as is, so that apps sharing it get their own
+    extensions."""
+    present = [ext if isinstance(ext, type) else type(ext) for ext in schema.extensions]
+    added = [ext for ext in extensions if not issubclass(type(ext), tuple(present))]
+    if not added:
+        return schema
+    types = [
+        concrete.definition.origin
+        for concrete in schema.schema_converter.type_map.values()
+        if isinstance(concrete.definition, StrawberryObjectDefinition)
+    ]
+    return strawberry.Schema(
+        query=schema.query,
+        mutation=schema.mutation,
+        subscription=schema.subscription,
+        directives=schema.directives,
+        types=types,
+        extensions=[*schema.extensions, *added],
+        execution_context_class=schema.execution_context_class,
+        config=schema.config,
+        scalar_overrides=schema.schema_converter.scalar_registry,
+        schema_directives=schema.schema_directives,
+    )
@@ -0,0 +1,92 @@
+import inspect
+from strawberry.dataloader import DataLoader
+from flangoberry import graph_ops
+from flangoberry.graph_defs import BaseVertex
+
+
+class GraphLoaders:
+    """
+    Request-scoped Strawberry DataLoaders over graph_ops. An instance is added to the
+    GraphQL context as `info.context["loaders"]` by the flangoberry GraphQL views, so
+    lookups made by sibling/nested resolvers of one request are coalesced into one
+    batched query per loader, and cached for the rest of the request.
+
+    Example (in an async resolver):
+    `doc = await info.context["loaders"].vertex_by_id(SomeVertexType).load(some_id)`
+
+    DataLoaders are async, so they require the async GraphQL view (see the
+    GRAPHQL_ASYNC setting). `ops` is the module the lookups are made with; the ASGI
+    app passes `flangoberry.aio_graph_ops`, so they don't block the event loop. Sync
+    lookups are run by `executor` (a `RequestExecutor`) if one is given, so that
+    the batches of different loaders run concurrently.
+    """
+
+    def __init__(self, ops=graph_ops, executor=None):
+        self._ops = ops
+        self._executor = executor
+        self._loaders = {}
+
+    async def _call(self, fn, *args, **kwargs):
+        if inspect.iscoroutinefunction(fn):
+            return await fn(*args, **kwargs)
+        if self._executor is not None:
+            return await self._executor.run(fn, *args, **kwargs)
+        return fn(*args, **kwargs)
+
+    def _get_loader(self, key: tuple, load_fn) -> DataLoader:
+        if key not in self._loaders:
+            self._loaders[key] = DataLoader(load_fn=load_fn)
+        return self._loaders[key]
+
+    def vertex_by_id(self, vertex_def: type[BaseVertex]) -> DataLoader:
+        """Loads vertex docs (or None) by `_id`"""
+
+        async def load(ids):
+            found = await self._call(self._ops.get_vertices_by_id, vertex_def, ids)
+            return [found.get(id) for id in ids]
+
+        return self._get_loader(("vertex_by_id", vertex_def), load)
+
+    def vertex_by_key(self, vertex_def: type[BaseVertex]) -> DataLoader:
+        """Loads vertex docs (or None) of `vertex_def`'s collection by `_key`"""
+
+        async def load(keys):
+            found = await self._call(self._ops.get_vertices_by_key, vertex_def, keys)
+            return [found.get(key) for key in keys]
+
+        return self._get_loader(("vertex_by_key", vertex_def), load)
+
+    def vertex_by_field(self, vertex_def: type[BaseVertex], field: str) -> DataLoader:
+        """Loads vertex docs (or None) by the value of a unique `field`"""
+
+        async def load(values):
+            found = await self._call(
+                self._ops.get_vertices_by_field, vertex_def, field, values
+            )
+            return [found.get(value) for value in values]
+
+        return self._get_loader(("vertex_by_field", vertex_def, field), load)
+
+    def edges_by_vertex(
+        self,
+        vertex_def: type[BaseVertex],
+        outbound_only: bool = False,
+        inbound_only: bool = False,
+        per_vertex_limit: int = None,
+    ) -> DataLoader:
+        """Loads the immediate edges (rows as returned by
+        `graph_ops.list_vertex_edges`) of vertices by `_id`"""
+
+        async def load(ids):
+            grouped = await self._call(
+                self._ops.list_edges_for_vertices,
+                vertex_def,
+                ids,
+                outbound_only=outbound_only,
+                inbound_only=inbound_only,
+                per_vertex_limit=per_vertex_limit,
+            )
+            return [grouped.get(id, []) for id in ids]
+
+        key = ("edges_by_vertex", vertex_def, outbound_only, inbound_only)
+        return self._get_loader(key + (per_vertex_limit,), load)
@@ -0,0 +1,105 @@
+import hashlib
+import json
+from strawberry.extensions import ParserCache, ValidationCache
+from flangoberry.cache import LRUCache
+
+
+class PersistedQueryError(Exception):
+    """Error of a persisted query request, returned to the client as a GraphQL
+    error with `code` in its extensions"""
+
+    def __init__(self, message: str, code: str, status: int = 200):
+        super().__init__(message)
+        self.code = code
+        self.status = status
+
+    def body(self) -> str:
+        return json.dumps(
+            {"errors": [{"message": str(self), "extensions": {"code": self.code}}]}
+        )
+
+
+def query_hash(query: str) -> str:
+    return hashlib.sha256(query.encode()).hexdigest()
+
+
+class PersistedQueries:
+    """
+    Store of the persisted queries of the flangoberry Flask GraphQL views, enabled
+    with the GRAPHQL_PERSISTED_QUERIES setting.
+
+    Supports Apollo's automatic persisted queries protocol: requests may send the
+    sha256 hash of a query instead of its text, in the `persistedQuery` extension
+    (`{"version": 1, "sha256Hash": ...}`). Unknown hashes are answered with a
+    PersistedQueryNotFound error, and clients then resend the query with its hash
+    to register it.
+
+    With an `allow_list` ({hash: query}, see `load_allow_list`), only the queries in
+    it are accepted, whether sent by hash or in full, and nothing is registered.
+    """
+
+    def __init__(self, max_size: int = 10000, allow_list: dict = None):
+        self.allow_list = allow_list
+        self._queries = LRUCache(max_size=max_size)
+
+    def resolve(self, data: dict) -> str | None:
+        """Returns the query text of the GraphQL request params `data` (query,
+        extensions...), or raises a PersistedQueryError"""
+        query = data.get("query")
+        persisted = (data.get("extensions") or {}).get("persistedQuery")
+        if not persisted:
+            if self.allow_list is not None and query is not None:
+                self._check_allowed(query_hash(query))
+            return query
+
+        if not isinstance(persisted, dict):
+            persisted = {"version": None}
+        digest = persisted.get("sha256Hash")
+        if persisted.get("version", 1) != 1 or not isinstance(digest, str):
+            raise PersistedQueryError(
+                "Unsupported persisted query", "PERSISTED_QUERY_NOT_SUPPORTED", 400
+            )
+        if query is None:
+            if self.allow_list is not None:
+                return self._check_allowed(digest)
+            if (query := self._queries.get(digest)) is None:
+                raise PersistedQueryError(
+                    "PersistedQueryNotFound", "PERSISTED_QUERY_NOT_FOUND"
+                )
+            return query
+
+        if query_hash(query) != digest:
+            raise PersistedQueryError(
+                "provided sha does not match query", "INVALID_PERSISTED_QUERY", 400
+            )
+        if self.allow_list is not None:
+            return self._check_allowed(digest)
+        self._queries.set(digest, query)
+        return query
+
+    def _check_allowed(self, digest: str) -> str:
+        try:
+            return self.allow_list[digest]
+        except KeyError:
+            raise PersistedQueryError(
+                "Query is not in the allow-list", "PERSISTED_QUERY_NOT_ALLOWED", 400
+            )
+
+
+def load_allow_list(path: str) -> dict:
+    """Loads an allow-list file: a JSON list of queries, or an object of queries
+    keyed by their sha256 hash (hashes that don't match their query are an error)"""
+    with open(path) as f:
+        queries = json.load(f)
+    if isinstance(queries, list):
+        return {query_hash(query): query for query in queries}
+    for digest, query in queries.items():
+        if query_hash(query) != digest:
+            raise ValueError(f"Hash {digest} of the allow-list doesn't match its query")
+    return dict(queries)
+
+
+def document_caches(max_size: int) -> list:
+    """Returns Strawberry's parser and validation cache extensions, of `max_size`
+    documents each"""
+    return [ParserCache(maxsize=max_size), ValidationCache(maxsize=max_size)]
@@ -0,0 +1,186 @@
+import hashlib
+import json
+import math
+import time
+import weakref
+from graphql import GraphQLError, OperationType, parse, print_ast
+from strawberry.extensions import FieldExtension
+from flangoberry import graph_ops
+from flangoberry.cache import LRUCache
+
+#
+# Tag of cached responses that didn't declare the collections they read (see
+# `cache_hint`), which are dropped on any graph_ops write.
+#
+ANY_COLLECTION = "*"
+
+
+def cache_hint(info, max_age: int = None, collections=()):
+    """
+    Declares, from a resolver, how long the response may be cached for (the lowest
+    `max_age` of a response wins) and which collections it was read from, so that
+    it is only invalidated by writes to those collections. Has no effect if the
+    response cache isn't enabled.
+
+    Example: `cache_hint(info, max_age=30, collections=["example_nodes"])`
+    """
+    hints = info.context.get("cache_hints") if isinstance(info.context, dict) else None
+    if hints is not None:
+        hints.append((max_age, tuple(collections)))
+
+
+class CacheHint(FieldExtension):
+    """Field extension version of `cache_hint`, e.g.
+    `@strawberry.field(extensions=[CacheHint(max_age=30, collections=["people"])])`"""
+
+    def __init__(self, max_age: int = None, collections=()):
+        self.max_age = max_age
+        self.collections = collections
+
+    def resolve(self, next_, source, info, **kwargs):
+        cache_hint(info, self.max_age, self.collections)
+        return next_(source, info, **kwargs)
+
+    async def resolve_async(self, next_, source, info, **kwargs):
+        cache_hint(info, self.max_age, self.collections)
+        return await next_(source, info, **kwargs)
+
+
+def _weak_listener(method_ref: weakref.WeakMethod):
+    def listener(collections):
+        if (method := method_ref()) is not None:
+            method(collections)
+
+    return listener
+
+
+def _remove_listener(listener):
+    if listener in graph_ops.write_listeners:
+        graph_ops.write_listeners.remove(listener)
+
+
+class ResponseCache:
+    """
+    Cache of GraphQL responses of query (not mutation or subscription) operations,
+    used by the flangoberry Flask GraphQL views when the GRAPHQL_RESPONSE_CACHE
+    setting is enabled.
+
+    Responses are keyed by the hash of the normalized document, the variables, the
+    operation name and the values of `vary_headers`. They are kept for the lowest
+    `max_age` hinted while resolving them (`default_max_age` if none), and dropped
+    when graph_ops writes to the collections they were read from (any collection
+    unless hinted otherwise). Only successful responses without errors are cached.
+    """
+
+    def __init__(
+        self, max_size: int = 1000, default_max_age: int = 60, vary_headers=()
+    ):
+        self.default_max_age = default_max_age
+        self.vary_headers = tuple(vary_headers)
+        self.stats = {"hits": 0, "misses": 0, "invalidations": 0}
+        self._responses = LRUCache(max_size=max_size)
+        # Raw query -> (normalized document hash, operation types by name), so that
+        # hits don't need to parse the query
+        self._documents = LRUCache(max_size=max_size)
+        # The cache is only weakly referenced by its listener, and stops listening
+        # once collected (e.g. along with its app), even if `close` isn't called
+        self._listener = _weak_listener(weakref.WeakMethod(self.on_written))
+        graph_ops.write_listeners.append(self._listener)
+        weakref.finalize(self, _remove_listener, self._listener)
+
+    def close(self):
+        """Stops listening to graph_ops writes"""
+        _remove_listener(self._listener)
+
+    def _document(self, query: str):
+        if (document := self._documents.get(query)) is None:
+            try:
+                ast = parse(query)
+            except GraphQLError:
+                return None
+            operations = {
+                op.name.value if op.name else None: op.operation
+                for op in ast.definitions
+                if hasattr(op, "operation")
+            }
+            digest = hashlib.sha256(print_ast(ast).encode()).hexdigest()
+            document = (digest, operations)
+            self._documents.set(query, document)
+        return document
+
+    def key(self, params: dict, headers) -> str | None:
+        """Returns the cache key of a request with GraphQL `params` (query,
+        variables, operationName), or None if the request can't be cached"""
+        query = params.get("query")
+        if not isinstance(query, str) or not (document := self._document(query)):
+            return None
+        digest, operations = document
+        operation_name = params.get("operationName")
+        if operation_name is None and len(operations) == 1:
+            operation_type = next(iter(operations.values()))
+        else:
+            operation_type = operations.get(operation_name)
+        if operation_type != OperationType.QUERY:
+            return None
+        key = json.dumps(
+            [
+                digest,
+                params.get("variables") or {},
+                operation_name,
+                [headers.get(header) for header in self.vary_headers],
+            ],
+            sort_keys=True,
+            default=str,
+        )
+        return hashlib.sha256(key.encode()).hexdigest()
+
+    def get(self, key: str) -> dict | None:
+        entry = self._responses.get(key)
+        if entry is not None and entry["expires_at"] <= time.monotonic():
+            self._responses.delete(key)
+            entry = None
+        self.stats["hits" if entry else "misses"] += 1
+        return entry
+
+    def set(self, key: str, body: bytes, hints: list) -> dict:
+        max_ages = [max_age for max_age, _ in hints if max_age is not None]
+        max_age = min(max_ages, default=self.default_max_age)
+        collections = {c for _, hint_collections in hints for c in hint_collections}
+        entry = {
+            "body": body,
+            "etag": '"' + hashlib.sha256(body).hexdigest()[:32] + '"',
+            "max_age": max_age,
+            "expires_at": time.monotonic() + max_age,
+        }
+        if max_age > 0:
+            self._responses.set(key, entry, tags=collections or [ANY_COLLECTION])
+        return entry
+
+    def on_written(self, collections):
+        """graph_ops write listener, dropping the responses read from `collections`"""
+        self.stats["invalidations"] += self._responses.invalidate_tags(
+            [*collections, ANY_COLLECTION]
+        )
+
+    def clear(self):
+        self._responses.clear()
+
+    def cache_control(self, entry: dict) -> str:
+        remaining = max(0, math.ceil(entry["expires_at"] - time.monotonic()))
+        visibility = "private" if self.vary_headers else "public"
+        return f"{visibility}, max-age={remaining}"
+
+
+def request_params(request) -> dict | None:
+    """GraphQL params of a Flask request (None for batched or multipart requests)"""
+    if request.method == "GET":
+        params = dict(request.args)
+        for name in ("variables", "extensions"):
+            if isinstance(params.get(name), str):
+                try:
+                    params[name] = json.loads(params[name])
+                except ValueError:
+                    return None
+        return params
+    params = request.get_json(silent=True)
+    return params if isinstance(params, dict) else None
@@ -1,8 +1,11 @@
 import strawberry
+from collections.abc import Iterable, Iterator
 from datetime import datetime
-from typing import Any, Optional, get_type_hints
+from enum import Enum
+from types import UnionType
+from typing import Any, Optional, Union, get_args, get_origin, get_type_hints
 from .helpers import to_py_date
-from dataclasses import asdict
+from dataclasses import fields, is_dataclass
 from flangoberry import logger
 
 
@@ -16,37 +19,141 @@ class BaseMetadataMixin:
     modified: datetime
 
 
-class BaseVertexMethodsMixin:
+#
+# Names of db document properties that are renamed for GraphQL
+#
+VERTEX_KEY_RENAMES = {"_key": "key", "_id": "id", "_rev": "rev"}
+EDGE_KEY_RENAMES = {**VERTEX_KEY_RENAMES, "_from": "frm", "_to": "to"}
+
+#
+# Compiled converters of each type, by (type, direction)
+#
+_converters = {}
+
+
+def _to_datetime(value):
+    return to_py_date(value) if isinstance(value, str) else value
+
+
+def _datetime_converter(hint):
+    """Returns a function converting the db values of attrs with the type `hint` to
+    datetimes (also within Optional and lists), or None if there are none"""
+    if hint is datetime:
+        return _to_datetime
+    args = get_args(hint)
+    if get_origin(hint) in (Union, UnionType):
+        return next(filter(None, (_datetime_converter(arg) for arg in args)), None)
+    if get_origin(hint) in (list, tuple, set) and args:
+        item_converter = _datetime_converter(args[0])
+        if item_converter:
+            return lambda value: (
+                value if value is None else [item_converter(v) for v in value]
+            )
+    return None
+
+
+def _is_flat(hint) -> bool:
+    """Whether attrs with the type `hint` hold values that needn't be converted by
+    `to_dbdoc` (unlike lists, dicts and nested types)"""
+    if get_origin(hint) in (Union, UnionType):
+        return all(_is_flat(arg) for arg in get_args(hint))
+    return hint in (str, int, float, bool, datetime, type(None)) or (
+        isinstance(hint, type) and issubclass(hint, Enum)
+    )
+
+
+def _to_plain(value):
+    """Like `dataclasses.asdict`, without deep-copying values"""
+    if is_dataclass(value) and not isinstance(value, type):
+        return {f.name: _to_plain(getattr(value, f.name)) for f in fields(value)}
+    if isinstance(value, (list, tuple)):
+        return type(value)(_to_plain(v) for v in value)
+    if isinstance(value, dict):
+        return {k: _to_plain(v) for k, v in value.items()}
+    return value
+
+
+def _compile_from_dbdoc(cls, renames: dict):
+    datetime_converters = {
+        attr: converter
+        for attr, hint in get_type_hints(cls).items()
+        if (converter := _datetime_converter(hint))
+    }
+
+    def from_dbdoc(doc: dict):
+        data = {renames.get(k, k): v for k, v in doc.items()}
+        for attr, converter in datetime_converters.items():
+            if attr in data:
+                data[attr] = converter(data[attr])
+        return cls(**data)
+
+    return from_dbdoc
+
+
+def _compile_to_dbdoc(cls, renames: dict):
+    db_names = {attr: name for name, attr in renames.items()}
+    hints = get_type_hints(cls)
+    attrs = [
+        (f.name, db_names.get(f.name, f.name), _is_flat(hints.get(f.name)))
+        for f in fields(cls)
+    ]
+
+    def to_dbdoc(obj) -> dict[str, Any]:
+        doc = {}
+        for attr, name, flat in attrs:
+            value = getattr(obj, attr)
+            doc[name] = value if flat else _to_plain(value)
+        return doc
+
+    return to_dbdoc
+
+
+def _converter(cls, direction: str):
+    try:
+        return _converters[cls, direction]
+    except KeyError:
+        compile_ = _compile_from_dbdoc if direction == "from" else _compile_to_dbdoc
+        converter = _converters[cls, direction] = compile_(cls, cls.dbdoc_renames)
+        return converter
+
+
+class BaseDbDocMethodsMixin:
+    """
+    Conversions between db documents and Strawberry objects. The converters of each
+    type are compiled on first use, from its type hints and `dbdoc_renames`.
+    """
+
+    dbdoc_renames = VERTEX_KEY_RENAMES
+
     def to_dbdoc(self) -> dict[str, Any]:
         """Returns a dict with core prop names prefixed with underscore as expected by db
         @TODO: Might need to handle datetime too in the future (see `from_dbdoc` sister
         method below)"""
-
-        def _keyf(k):
-            if k in ["key", "id", "rev"]:
-                return f"_{k}"
-            return k
-
-        return {_keyf(k): v for k, v in asdict(self).items()}
+        return _converter(type(self), "to")(self)
 
     @classmethod
-    def from_dbdoc(cls, doc: dict) -> dict:
+    def from_dbdoc(cls, doc: dict):
         """
         Prepares data from the database for population into the Strawberry object:
-        * Converts the _key, _id, and _rev field names from the database to GQL-acceptable ones.
-        * Converts any fields destined for datetime attrs to Python datetimes.
+        * Converts the core field names from the database (see `dbdoc_renames`) to
+          GQL-acceptable ones.
+        * Converts any fields destined for datetime attrs (including Optional ones and
+          lists) to Python datetimes.
         """
-        obj_type_hints = get_type_hints(cls)
-        datetime_attrs = [k for k, v in obj_type_hints.items() if v is datetime]
-        # logger.debug(datetime_attrs)
-        converted_data = {}
-        for k, v in doc.items():
-            if k in ["_key", "_id", "_rev"]:
-                k = k.replace("_", "")
-            if k in datetime_attrs:
-                v = to_py_date(v)
-            converted_data[k] = v
-        return cls(**converted_data)
+        return _converter(cls, "from")(doc)
+
+    @classmethod
+    def from_dbdocs(cls, docs: Iterable[dict]) -> Iterator:
+        """Lazily converts `docs` (e.g. a cursor) with `from_dbdoc`"""
+        return map(_converter(cls, "from"), docs)
+
+
+class BaseVertexMethodsMixin(BaseDbDocMethodsMixin):
+    pass
+
+
+class BaseEdgeMethodsMixin(BaseDbDocMethodsMixin):
+    dbdoc_renames = EDGE_KEY_RENAMES
 
 
 @strawberry.type
@@ -63,7 +170,7 @@ class BaseVertexFieldsMixin(BaseVertexMethodsMixin, BaseMetadataMixin):
 
 
 @strawberry.type
-class BaseEdgeFieldsMixin(BaseMetadataMixin):
+class BaseEdgeFieldsMixin(BaseEdgeMethodsMixin, BaseMetadataMixin):
     id: str
     key: str
     rev: str
@@ -71,24 +178,3 @@ class BaseEdgeFieldsMixin(BaseMetadataMixin):
     to: str
     # created: datetime
     # modified: datetime
-
-    @classmethod
-    def from_dbdoc(cls, doc: dict) -> dict:
-        """
-        Prepares data from the database for population into the Strawberry object:
-        * Converts the _key, _id, and _rev, _to, _from field names from the database to GQL-acceptable ones.
-        * Converts any fields destined for datetime attrs to Python datetimes.
-        """
-        obj_type_hints = get_type_hints(cls)
-        datetime_attrs = [k for k, v in obj_type_hints.items() if v is datetime]
-        # logger.debug(datetime_attrs)
-        converted_data = {}
-        for k, v in doc.items():
-            if k in ["_key", "_id", "_rev", "_to"]:
-                k = k.replace("_", "")
-            if k == "_from":
-                k = "frm"
-            if k in datetime_attrs:
-                v = to_py_date(v)
-            converted_data[k] = v
-        return cls(**converted_data)
@@ -0,0 +1,148 @@
+import json
+from flask import Response, current_app, g, request
+from strawberry.flask import views
+from strawberry.http import GraphQLRequestData
+from .executor import RequestExecutor
+from .loaders import GraphLoaders
+from .persisted_queries import PersistedQueryError
+from .response_cache import request_params
+
+
+class PersistedQueriesMixin:
+    """Resolves the query of requests from the view's `persisted_queries` (a
+    `flangoberry.graphql.persisted_queries.PersistedQueries`), if set"""
+
+    persisted_queries = None
+
+    def _with_persisted_query(self, data: GraphQLRequestData) -> GraphQLRequestData:
+        if self.persisted_queries is None:
+            return data
+        data.query = self.persisted_queries.resolve(
+            {"query": data.query, "extensions": data.extensions}
+        )
+        return data
+
+    def _persisted_query_error(self, error: PersistedQueryError):
+        return Response(error.body(), status=error.status, mimetype="application/json")
+
+
+class ResponseCacheMixin:
+    """Serves query operations from a `flangoberry.graphql.response_cache.ResponseCache`
+    (the view's `response_cache`, if set), with ETag / Cache-Control headers"""
+
+    response_cache = None
+
+    def _add_cache_hints(self, context: dict):
+        if self.response_cache is not None:
+            context["cache_hints"] = g.graphql_cache_hints = []
+
+    def _cache_lookup(self):
+        """Returns the cache key of the request (None if it can't be cached), and
+        the response to serve for it if cached"""
+        if request.method == "GET" and "text/html" in request.headers.get("Accept", ""):
+            return None, None
+        params = request_params(request)
+        if params and self.persisted_queries is not None:
+            try:
+                params["query"] = self.persisted_queries.resolve(params)
+            except PersistedQueryError:
+                return None, None
+        key = params and self.response_cache.key(params, request.headers)
+        if not key or not (entry := self.response_cache.get(key)):
+            return key, None
+        if request.if_none_match.contains_raw(entry["etag"]):
+            response = Response(status=304)
+        else:
+            response = Response(entry["body"], mimetype="application/json")
+        return key, self._cache_headers(response, entry)
+
+    def _cache_store(self, key: str, response):
+        if (
+            not isinstance(response, Response)
+            or response.status_code != 200
+            or response.mimetype != "application/json"
+        ):
+            return response
+        body = response.get_data()
+        if json.loads(body).get("errors"):
+            return response
+        hints = g.pop("graphql_cache_hints", [])
+        return self._cache_headers(response, self.response_cache.set(key, body, hints))
+
+    def _cache_headers(self, response, entry: dict):
+        response.headers["ETag"] = entry["etag"]
+        response.headers["Cache-Control"] = self.response_cache.cache_control(entry)
+        if self.response_cache.vary_headers:
+            response.vary.update(self.response_cache.vary_headers)
+        return response
+
+
+class GraphQLView(PersistedQueriesMixin, ResponseCacheMixin, views.GraphQLView):
+    """Strawberry's Flask view, with flangoberry's request-scoped additions to the
+    GraphQL context (`loaders`, see `flangoberry.graphql.loaders.GraphLoaders`),
+    and optional `persisted_queries` and `response_cache`"""
+
+    def __init__(self, *args, persisted_queries=None, response_cache=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.persisted_queries = persisted_queries
+        self.response_cache = response_cache
+
+    def parse_http_body(self, request):
+        return self._with_persisted_query(super().parse_http_body(request))
+
+    def get_context(self, request, response):
+        context = super().get_context(request, response)
+        context["loaders"] = GraphLoaders()
+        self._add_cache_hints(context)
+        return context
+
+    def dispatch_request(self):
+        try:
+            if self.response_cache is None:
+                return super().dispatch_request()
+            key, cached = self._cache_lookup()
+            if cached is not None:
+                return cached
+            response = super().dispatch_request()
+            return self._cache_store(key, response) if key else response
+        except PersistedQueryError as e:
+            return self._persisted_query_error(e)
+
+
+class AsyncGraphQLView(
+    PersistedQueriesMixin, ResponseCacheMixin, views.AsyncGraphQLView
+):
+    """Async version of `GraphQLView`. Requires Flask's async extra
+    (`pip install "flask[async]"`).
+
+    Also adds a `RequestExecutor` as `executor` to the context, limited to the
+    GRAPHQL_REQUEST_CONCURRENCY setting, which the loaders use for their lookups."""
+
+    def __init__(self, *args, persisted_queries=None, response_cache=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.persisted_queries = persisted_queries
+        self.response_cache = response_cache
+
+    async def parse_http_body(self, request):
+        return self._with_persisted_query(await super().parse_http_body(request))
+
+    async def get_context(self, request, response):
+        context = await super().get_context(request, response)
+        context["executor"] = RequestExecutor(
+            current_app.config.get("GRAPHQL_REQUEST_CONCURRENCY")
+        )
+        context["loaders"] = GraphLoaders(executor=context["executor"])
+        self._add_cache_hints(context)
+        return context
+
+    async def dispatch_request(self):
+        try:
+            if self.response_cache is None:
+                return await super().dispatch_request()
+            key, cached = self._cache_lookup()
+            if cached is not None:
+                return cached
+            response = await super().dispatch_request()
+            return self._cache_store(key, response) if key else response
+        except PersistedQueryError as e:
+            return self._persisted_query_error(e)
@@ -1,7 +1,7 @@
 import json
 import pytest
 import logging
-from flangoberry import settings, logger, db
+from flangoberry import settings, logger, db, graph_ops
 from ..appfactory import create_app
 
 # from ..appfactory import create_app
@@ -80,6 +80,8 @@ def testappcli():
 def cleanup(tests_conn):
     """Clear graphs & collections in each database  after a test"""
     yield
+    graph_ops.invalidate_storage()
+    graph_ops.assume_schema_present = False
     for alias, dbase in tests_conn["dbs"].items():
         for graphdef in dbase.graphs():
             dbase.delete_graph(graphdef["name"], drop_collections=True)
@@ -0,0 +1,123 @@
+import asyncio
+import pytest
+from flangoberry import aio_db, aio_graph_ops, graph_ops
+from .graph_defs import ExampleNode, ExamplePerson, ExampleEdge
+
+
+def run(coro):
+    """Runs `coro` in a new event loop, closing the async connections afterwards"""
+
+    async def _run():
+        try:
+            return await coro
+        finally:
+            await aio_db.close_connections()
+
+    return asyncio.run(_run())
+
+
+@pytest.fixture
+def schema(tests_conn, cleanup):
+    graph_ops.bootstrap_schema([ExampleNode, ExamplePerson, ExampleEdge])
+
+
+def test_aio_vertex_ops(schema):
+    async def ops():
+        with pytest.raises(graph_ops.DataOpsException) as einfo:
+            await aio_graph_ops.create_vertex({"some": "invalid", "dict": "fails"})
+        assert "must be an instance of BaseVertex" in str(einfo)
+
+        v1, v2 = await asyncio.gather(
+            aio_graph_ops.create_vertex(ExampleNode(attr1="v1a1", attr2="v1a2")),
+            aio_graph_ops.create_vertex(ExampleNode(attr1="v2a1", attr2="v2a2")),
+        )
+        assert v1["_id"] and v1["attr1"] == "v1a1"
+
+        with pytest.raises(graph_ops.DataOpsException) as einfo:
+            await aio_graph_ops.create_vertex(ExampleNode(attr2="v1a2"))
+        assert "unique constraint violated" in str(einfo)
+
+        updated = await aio_graph_ops.update_vertex(
+            ExampleNode(set_defaults=False, _id=v1["_id"], attr1="changed")
+        )
+        assert updated["attr1"] == "changed"
+        assert updated["created"] == v1["created"]
+
+        found = await aio_graph_ops.get_vertex(ExampleNode, {"attr2": "v1a2"})
+        assert found["_id"] == v1["_id"]
+        assert await aio_graph_ops.get_vertex(ExampleNode, {"attr2": "nope"}) is None
+        with pytest.raises(graph_ops.DataOpsException):
+            await aio_graph_ops.get_vertex(ExampleNode, {"is_root": True})
+
+        existed, vertex = await aio_graph_ops.get_or_create_vertex(
+            ExampleNode, {"attr2": "v3a2"}
+        )
+        assert existed is False
+        existed, again = await aio_graph_ops.get_or_create_vertex(
+            ExampleNode, {"attr2": "v3a2"}
+        )
+        assert existed is True and again["_id"] == vertex["_id"]
+
+        by_id = await aio_graph_ops.get_vertices_by_id(
+            ExampleNode, [v1["_id"], v2["_id"]]
+        )
+        assert set(by_id) == {v1["_id"], v2["_id"]}
+
+        assert await aio_graph_ops.delete_vertex(ExampleNode, v2["_id"])
+        assert await aio_graph_ops.get_vertex(ExampleNode, {"_id": v2["_id"]}) is None
+
+    run(ops())
+
+
+def test_aio_edge_ops(schema):
+    async def ops():
+        v1 = await aio_graph_ops.create_vertex(ExampleNode(attr1="v1a1", attr2="v1a2"))
+        v2 = await aio_graph_ops.create_vertex(ExampleNode(attr1="v2a1", attr2="v2a2"))
+        person = await aio_graph_ops.create_vertex(ExamplePerson(attr1="p1"))
+
+        v1_v2 = await aio_graph_ops.create_edge(ExampleEdge(frm=v1, to=v2))
+        v1_person = await aio_graph_ops.create_edge(ExampleEdge(frm=v1, to=person))
+        v2 = await aio_graph_ops.get_vertex(ExampleNode, {"_id": v2["_id"]})
+        assert v2["is_root"] is False
+        v1 = await aio_graph_ops.get_vertex(ExampleNode, {"_id": v1["_id"]})
+        assert v1["is_leaf"] is False
+
+        existed, edge = await aio_graph_ops.get_or_create_edge(
+            ExampleEdge, frm=v1, to=v2
+        )
+        assert existed is True and edge["_id"] == v1_v2["_id"]
+
+        rows = await aio_graph_ops.list_vertex_edges(ExampleNode, v1["_id"])
+        assert {row["edge"]["_id"] for row in rows} == {
+            v1_v2["_id"],
+            v1_person["_id"],
+        }
+        paged = [
+            row
+            async for row in aio_graph_ops.iter_vertex_edges(
+                ExampleNode, v1["_id"], page_size=1
+            )
+        ]
+        assert paged == rows
+
+        grouped = await aio_graph_ops.list_edges_for_vertices(
+            ExampleNode, [v1["_id"], v2["_id"]], outbound_only=True
+        )
+        assert len(grouped[v1["_id"]]) == 2
+        assert grouped[v2["_id"]] == []
+
+        traversed = await aio_graph_ops.traverse(ExampleNode, v1, max_depth=2)
+        assert {row["vertex"]["_id"] for row in traversed} == {
+            v2["_id"],
+            person["_id"],
+        }
+
+        assert await aio_graph_ops.delete_edge(ExampleEdge, v1_v2["_id"])
+        assert await aio_graph_ops.delete_edge(
+            ExampleEdge, v1_person["_id"], stream_transaction=True
+        )
+        v1 = await aio_graph_ops.get_vertex(ExampleNode, {"_id": v1["_id"]})
+        assert v1["is_leaf"] is True
+        assert await aio_graph_ops.delete_edge(ExampleEdge, v1_v2["_id"]) is False
+
+    run(ops())
@@ -1,4 +1,9 @@
+import asyncio
+import pytest
 from arango import ArangoClient
+from flangoberry import graph_ops
+from ..appfactory import create_app, create_asgi_app
+from .graph_defs import ExampleNode, ExampleEdge
 
 
 def test_testapp_fixture(testapp):
@@ -12,3 +17,33 @@ def test_testapp_fixture(testapp):
 def test_testapp_index_route(testappcli):
     res = testappcli.get("/flangoberry")
     assert res.data == b"Drink flangoberry for flowery fluctuations"
+
+
+def test_bootstrap_schema_on_create_app(tests_conn, cleanup):
+    app = create_app(
+        test_config={"USE_TEST_DBCONF": True, "BOOTSTRAP_SCHEMA": True},
+        graph_defs=[ExampleNode, ExampleEdge],
+    )
+    summary = app.config["SCHEMA_BOOTSTRAP_SUMMARY"]
+    assert "example_nodes" in summary["vertex_collections"]
+    assert summary["edge_definitions"] == ["example_edges"]
+    assert graph_ops.assume_schema_present is True
+
+
+def test_create_asgi_app():
+    pytest.importorskip("starlette")
+    app = create_asgi_app(test_config={"USE_TEST_DBCONF": True})
+    assert app.config["DBCONN"]["alias"] == "default"
+    assert "SCHEMA_BOOTSTRAP_SUMMARY" not in app.config
+
+    sent = []
+    messages = [{"type": "lifespan.startup"}, {"type": "lifespan.shutdown"}]
+
+    async def receive():
+        return messages.pop(0)
+
+    async def send(message):
+        sent.append(message["type"])
+
+    asyncio.run(app({"type": "lifespan"}, receive, send))
+    assert sent == ["lifespan.startup.complete", "lifespan.shutdown.complete"]
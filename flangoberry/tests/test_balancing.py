@@ -0,0 +1,164 @@
+import json
+import threading
+import pytest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from flangoberry import db
+from flangoberry.balancing import HealthAwareHostResolver
+
+
+class StandInCoordinator:
+    """Local HTTP server standing in for an ArangoDB coordinator"""
+
+    def __init__(self):
+        self.available = True
+        self.requests = 0
+        stand_in = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_GET(self):
+                if not self.path.startswith("/_admin/server/availability"):
+                    stand_in.requests += 1
+                status = 200 if stand_in.available else 503
+                body = json.dumps(
+                    {"version": "3.11.0", "server": "arango"}
+                    if stand_in.available
+                    else {"error": True, "errorNum": 503, "code": 503}
+                ).encode()
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.host = f"http://127.0.0.1:{self.server.server_port}"
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def shutdown(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+@pytest.fixture
+def coordinators():
+    stand_ins = [StandInCoordinator() for i in range(3)]
+    yield stand_ins
+    for stand_in in stand_ins:
+        stand_in.shutdown()
+
+
+def test_resolver_strategies():
+    hosts = ["http://a:8529", "http://b:8529", "http://c:8529/"]
+    with pytest.raises(ValueError):
+        HealthAwareHostResolver(hosts, strategy="random", probe_interval=None)
+
+    resolver = HealthAwareHostResolver(hosts, probe_interval=None)
+    assert [resolver.get_host_index() for i in range(6)] == [0, 1, 2, 0, 1, 2]
+    assert resolver.get_host_index({0, 1}) == 2
+
+    resolver = HealthAwareHostResolver(
+        hosts, strategy="least_latency", probe_interval=None
+    )
+    resolver.record("http://a:8529", 0.3, True)
+    resolver.record("http://b:8529", 0.1, True)
+    # Hosts without measurements are tried first
+    assert resolver.get_host_index() == 2
+    resolver.record("http://c:8529", 0.2, True)
+    assert resolver.get_host_index() == 1
+    resolver.record("http://b:8529", 0.9, True)
+    assert resolver.get_host_index() == 2
+
+
+def test_resolver_ejection(coordinators):
+    hosts = [stand_in.host for stand_in in coordinators]
+    resolver = HealthAwareHostResolver(
+        hosts, unhealthy_threshold=2, probe_interval=None
+    )
+    resolver.record(hosts[0], 0.1, False)
+    assert resolver.stats()[hosts[0]]["healthy"] is True
+    resolver.record(hosts[0], 0.1, False)
+    stats = resolver.stats()[hosts[0]]
+    assert stats["healthy"] is False
+    assert stats["requests"] == 2 and stats["failures"] == 2
+    assert stats["ejections"] == 1
+    assert {resolver.get_host_index() for i in range(6)} == {1, 2}
+
+    # No healthy hosts left: all of them are used
+    for host in hosts[1:]:
+        resolver.record(host, 0.1, False)
+        resolver.record(host, 0.1, False)
+    assert {resolver.get_host_index() for i in range(6)} == {0, 1, 2}
+
+    # Probes re-admit the hosts that respond
+    coordinators[1].available = False
+    resolver.probe()
+    stats = resolver.stats()
+    assert [stats[host]["healthy"] for host in hosts] == [True, False, True]
+    assert stats[hosts[0]]["latency"] > 0
+
+
+def test_load_balanced_connection(coordinators):
+    hosts = [stand_in.host for stand_in in coordinators]
+    db.connections = {}
+    try:
+        conn = db.get_connection(
+            dbsettings={
+                "default": {
+                    "client_conf": {
+                        "hosts": hosts,
+                        "retry_attempts": 0,
+                        "load_balancing": {
+                            "strategy": "roundrobin",
+                            "unhealthy_threshold": 1,
+                            "probe_interval": 0.05,
+                        },
+                    },
+                    "db_connect_conf": {},
+                }
+            }
+        )
+        dbase = conn["client"].db("flangoberry_test", verify=False)
+        for i in range(6):
+            assert dbase.version() == "3.11.0"
+        assert [stand_in.requests for stand_in in coordinators] == [2, 2, 2]
+
+        # An unavailable coordinator is failed over and ejected...
+        coordinators[0].available = False
+        for i in range(6):
+            assert dbase.version() == "3.11.0"
+        stats = db.pool_stats()["default"]["hosts"]
+        assert stats[hosts[0]]["healthy"] is False
+        assert stats[hosts[0]]["failures"] >= 1
+        assert stats[hosts[1]]["requests"] >= 3
+        requests_before = coordinators[0].requests
+        for i in range(6):
+            dbase.version()
+        assert coordinators[0].requests == requests_before
+
+        # ...and re-admitted by the background probes once it recovers
+        coordinators[0].available = True
+        resolver = conn["client"]._http.resolver
+        for i in range(100):
+            if resolver.stats()[hosts[0]]["healthy"]:
+                break
+            threading.Event().wait(0.02)
+        assert resolver.stats()[hosts[0]]["healthy"] is True
+
+        # Clients rebuilt in a forked process, and closed connections, stop probing
+        conn["pid"] = -1
+        db.get_connection()
+        resolver._prober.join(1)
+        assert not resolver._prober.is_alive()
+        resolver = conn["client"]._http.resolver
+        assert resolver._prober.is_alive()
+        db.close_connections()
+        resolver._prober.join(1)
+        assert not resolver._prober.is_alive()
+        assert db.connections == {}
+    finally:
+        db.close_connections()
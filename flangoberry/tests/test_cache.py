@@ -0,0 +1,47 @@
+import time
+from flangoberry.cache import LRUCache
+
+
+def test_lru_cache():
+    cache = LRUCache(max_size=3)
+    assert cache.get("missing") is None
+    assert cache.get("missing", "default") == "default"
+
+    cache.set("a", 1, tags=["t1"])
+    cache.set("b", 2, tags=["t1", "t2"])
+    cache.set("c", 3)
+    assert cache.get("a") == 1
+    # "b" is now the least recently used entry
+    cache.set("d", 4, tags=["t2"])
+    assert cache.get("b") is None
+    assert len(cache) == 3
+
+    assert cache.invalidate_tags(["t2", "unknown"]) == 1
+    assert cache.get("d") is None
+    assert cache.get("a") == 1
+    assert cache.invalidate_tags(["t1"]) == 1
+    assert len(cache) == 1
+
+    # Re-setting a key replaces its tags
+    cache.set("c", 5, tags=["t3"])
+    cache.invalidate_tags(["t3"])
+    assert cache.get("c") is None
+
+    cache.set("e", 6)
+    cache.delete("e")
+    cache.delete("e")
+    assert cache.get("e") is None
+
+    cache.set("f", 7)
+    cache.clear()
+    assert len(cache) == 0
+
+
+def test_lru_cache_ttl():
+    cache = LRUCache(ttl=0.05)
+    cache.set("a", 1, tags=["t"])
+    assert cache.get("a") == 1
+    time.sleep(0.06)
+    assert cache.get("a") is None
+    assert len(cache) == 0
+    assert cache.invalidate_tags(["t"]) == 0
@@ -1,8 +1,12 @@
+import asyncio
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
 import pytest
 from flangoberry.default_settings import TEST_DBCONF
-from flangoberry import db
+from flangoberry import db, aio_db
 from arango import ArangoClient
 from arango.database import StandardDatabase
+from arangoasync import ArangoClient as AsyncArangoClient
 
 
 def test_get_connection():
@@ -41,3 +45,102 @@ def test_get_db():
     alias = "default"
     db_conf = TEST_DBCONF[alias]["db_connect_conf"]["flangoberry"]
     assert dbase.name == db_conf["name"]
+
+
+def test_get_connection_threads_and_fork():
+    db.connections = {}
+    conns = []
+    threads = [
+        threading.Thread(
+            target=lambda: conns.append(db.get_connection(dbsettings=TEST_DBCONF))
+        )
+        for i in range(8)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert all(conn is conns[0] for conn in conns)
+
+    # Clients are rebuilt when used from another (i.e. a forked) process
+    conn = conns[0]
+    client = conn["client"]
+    conn["dbs"]["flangoberry"] = "stale db"
+    conn["pid"] = -1
+    assert db.get_connection() is conn
+    assert conn["client"] is not client
+    assert conn["dbs"] == {}
+
+
+def test_pool_stats():
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def do_GET(self):
+            self.send_response(200)
+            self.send_header("Content-Length", "2")
+            self.end_headers()
+            self.wfile.write(b"{}")
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    host = f"http://127.0.0.1:{server.server_port}"
+    try:
+        db.connections = {}
+        db.get_connection(
+            dbsettings={
+                "default": {
+                    "client_conf": {
+                        "hosts": (host,),
+                        "pool_maxsize": 4,
+                        "request_timeout": 5,
+                        "request_compression": True,
+                    },
+                    "db_connect_conf": {},
+                }
+            }
+        )
+        stats = db.pool_stats()["default"]
+        assert stats["pool_maxsize"] == 4
+        assert stats["requests"] == 0
+
+        http_client = db.connections["default"]["client"]._http
+        for i in range(3):
+            http_client.send_request(http_client.sessions[host], "get", host)
+        stats = db.pool_stats("default")["default"]
+        assert stats["requests"] == 3
+        assert stats["in_flight"] == 0
+        assert stats["max_in_flight"] == 1
+        # Keep-alive reuses the connection
+        assert stats["hosts"][host] == {"connections_opened": 1, "idle_connections": 1}
+    finally:
+        server.shutdown()
+        db.connections = {}
+
+
+def test_aio_get_connection():
+    async def connect():
+        with pytest.raises(db.DBException) as excinfo:
+            aio_db.get_connection("undefined")
+        assert "Database settings must be provided" in str(excinfo.value)
+
+        # Falls back to the settings of the sync connection
+        conn = aio_db.get_connection()
+        assert conn["alias"] == "default"
+        assert conn["client_conf"] == {
+            "hosts": TEST_DBCONF["default"]["client_conf"]["hosts"]
+        }
+        assert conn["db_connect_conf"] == TEST_DBCONF["default"]["db_connect_conf"]
+        assert isinstance(conn["client"], AsyncArangoClient)
+        assert aio_db.get_connection() is conn
+        await aio_db.close_connections()
+        return conn
+
+    db.connections = {}
+    db.get_connection(dbsettings=TEST_DBCONF)
+    first = asyncio.run(connect())
+    # Connections are not shared across event loops
+    assert asyncio.run(connect()) is not first
@@ -1,12 +1,17 @@
+import sys
 import pytest
+from types import SimpleNamespace
 from flangoberry import logger
 from flangoberry.db import connections
 from datetime import datetime
 from .graph_defs import ExampleNode, ExamplePerson, ExampleEdge
+from flangoberry.graph_defs import NamedVertex, batch_timestamp, record_class
 from .. import graph_ops
+from ..cache import LRUCache
 from arango.database import StandardDatabase
 from arango.collection import VertexCollection, EdgeCollection
 from arango.graph import Graph
+from arango.exceptions import AQLQueryExecuteError
 
 
 def test_resolve_vertex_storage(tests_conn, cleanup):
@@ -156,6 +161,38 @@ def test_get_vertex(tests_conn, cleanup):
         result = graph_ops.get_vertex(ExampleNode, {"attr1": "dupe example"})
 
 
+def test_get_vertex_lookups(tests_conn, cleanup):
+    v1 = graph_ops.create_vertex(ExampleNode(attr1="v1a1", attr2="v1a2"))
+    v2 = graph_ops.create_vertex(
+        ExampleNode(attr1="dupe", attr2="v2a2", nested={"a": 1})
+    )
+    graph_ops.create_vertex(ExampleNode(attr1="dupe", attr2="v3a2"))
+
+    # Direct reads by _key / _id
+    assert graph_ops.get_vertex(ExampleNode, {"_key": v1["_key"]}) == v1
+    assert graph_ops.get_vertex(ExampleNode, {"_id": v1["_id"]}) == v1
+    assert graph_ops.get_vertex(ExampleNode, {"_id": v1["_id"], "attr1": "x"}) is None
+    assert graph_ops.get_vertex(ExampleNode, {"_id": "example_people/x"}) is None
+
+    # Projections and nested fields
+    assert graph_ops.get_vertex(ExampleNode, {"nested.a": 1}, fields=["attr2"]) == {
+        "_id": v2["_id"],
+        "_key": v2["_key"],
+        "_rev": v2["_rev"],
+        "attr2": "v2a2",
+    }
+
+    assert graph_ops.get_vertices(ExampleNode, []) == []
+    found = graph_ops.get_vertices(
+        ExampleNode,
+        [{"attr2": "v2a2"}, {"_key": v1["_key"]}, {"attr2": "missing"}],
+        fields=["attr1"],
+    )
+    assert [doc and doc["attr1"] for doc in found] == ["dupe", "v1a1", None]
+    with pytest.raises(graph_ops.DataOpsException, match="Expected one result"):
+        graph_ops.get_vertices(ExampleNode, [{"attr1": "v1a1"}, {"attr1": "dupe"}])
+
+
 def test_get_or_create_vertex(tests_conn, cleanup):
     existed, result = graph_ops.get_or_create_vertex(
         ExampleNode, {"attr1": "soon_to_exist"}
@@ -184,6 +221,67 @@ def test_get_or_create_vertex(tests_conn, cleanup):
     assert db_result.count() == 1
 
 
+def test_create_vertices(tests_conn, cleanup):
+    with pytest.raises(graph_ops.DataOpsException, match="must be instances of"):
+        graph_ops.create_vertices([{"some": "invalid", "dict": "fails"}])
+    with pytest.raises(graph_ops.DataOpsException, match="`on_duplicate` must be"):
+        graph_ops.create_vertices([ExampleNode(attr1="val1")], on_duplicate="nope")
+
+    result = graph_ops.create_vertices(
+        (ExampleNode(attr1=f"val{i}", attr2=f"unique{i}") for i in range(25)),
+        chunk_size=10,
+    )
+    assert result.created == 25
+    assert result.errors == []
+    assert result.docs == []
+    storage = graph_ops.resolve_vertex_storage(ExampleNode)
+    assert storage.collection.count() == 25
+
+    # Unique index violations are reported per document without aborting the batch
+    result = graph_ops.create_vertices(
+        [
+            ExampleNode(attr1="new1", attr2="new1"),
+            ExampleNode(attr1="dupe", attr2="unique3"),
+            ExampleNode(attr1="new2", attr2="new2"),
+        ],
+        return_new=True,
+    )
+    assert result.created == 2
+    assert len(result.errors) == 1
+    assert result.errors[0][0] == 1
+    assert "unique constraint violated" in result.errors[0][1]
+    assert [d["attr1"] for d in result.docs] == ["new1", "new2"]
+    assert all(d["_key"] for d in result.docs)
+
+    # Mixed vertex types are stored in their respective collections
+    result = graph_ops.create_vertices(
+        [ExampleNode(attr1="n", attr2="mixed"), ExamplePerson(attr1="p")]
+    )
+    assert result.created == 2
+    assert graph_ops.get_vertex(ExamplePerson, {"attr1": "p"})
+
+
+def test_upsert_vertices(tests_conn, cleanup):
+    result = graph_ops.upsert_vertices(
+        [ExampleNode(_key=f"k{i}", attr1="rev1") for i in range(5)]
+    )
+    assert result.created == 5
+
+    result = graph_ops.upsert_vertices(
+        [ExampleNode(_key=f"k{i}", attr1="rev2") for i in range(3, 7)]
+    )
+    assert result.created == 2
+    assert result.updated == 2
+    assert graph_ops.get_vertex(ExampleNode, {"_key": "k3"})["attr1"] == "rev2"
+    assert graph_ops.get_vertex(ExampleNode, {"_key": "k0"})["attr1"] == "rev1"
+
+    result = graph_ops.upsert_vertices(
+        [ExampleNode(_key="k0", attr1="rev3")], on_duplicate="ignore", return_new=True
+    )
+    assert result.ignored == 1
+    assert graph_ops.get_vertex(ExampleNode, {"_key": "k0"})["attr1"] == "rev1"
+
+
 def test_resolve_edge_storage(tests_conn, cleanup):
     eg_edge = ExampleEdge(attr1="val1", attr2="val2")
     storage = graph_ops.resolve_edge_storage(eg_edge)
@@ -226,6 +324,81 @@ def test_resolve_edge_storage(tests_conn, cleanup):
     assert storage.collection.name == "example_edgos"
 
 
+def test_storage_registry(tests_conn, cleanup, monkeypatch):
+    graph_ops.invalidate_storage()
+    graph_ops.reset_storage_registry_stats()
+
+    storage = graph_ops.resolve_vertex_storage(ExampleNode)
+    assert graph_ops.storage_registry_info() == {"hits": 0, "misses": 1, "size": 1}
+
+    # Second resolution is served from the registry without any metadata calls
+    storage2 = graph_ops.resolve_vertex_storage(ExampleNode(attr1="val1"))
+    assert storage2 is storage
+    assert graph_ops.storage_registry_info() == {"hits": 1, "misses": 1, "size": 1}
+
+    edge_storage = graph_ops.resolve_edge_storage(ExampleEdge)
+    assert graph_ops.resolve_edge_storage(ExampleEdge) is edge_storage
+    assert graph_ops.storage_registry_info() == {"hits": 2, "misses": 2, "size": 2}
+
+    # Explicit invalidation of a single entry
+    graph_ops.invalidate_storage(ExampleNode.default_storage)
+    assert graph_ops.storage_registry_info()["size"] == 1
+    assert graph_ops.resolve_vertex_storage(ExampleNode) is not storage
+    assert graph_ops.storage_registry_info()["misses"] == 3
+
+    # Entries expire after the ttl
+    monkeypatch.setattr(graph_ops, "storage_registry_ttl", 0)
+    assert graph_ops.resolve_edge_storage(ExampleEdge) is not edge_storage
+    assert graph_ops.storage_registry_info()["misses"] == 4
+
+    graph_ops.invalidate_storage()
+    assert graph_ops.storage_registry_info()["size"] == 0
+
+
+def test_discover_graph_defs():
+    graph_defs = graph_ops.discover_graph_defs()
+    assert ExampleNode in graph_defs
+    assert ExamplePerson in graph_defs
+    assert ExampleEdge in graph_defs
+    # Classes without a collection in their default_storage are skipped
+    assert graph_ops.BaseVertex not in graph_defs
+    assert graph_ops.BaseEdge not in graph_defs
+    assert NamedVertex not in graph_defs
+
+
+def test_bootstrap_schema(tests_conn, cleanup):
+    summary = graph_ops.bootstrap_schema([ExampleNode, ExamplePerson, ExampleEdge])
+    assert summary["graphs"] == ["default"]
+    assert summary["vertex_collections"] == ["example_nodes", "example_people"]
+    assert summary["edge_definitions"] == ["example_edges"]
+    assert summary["persistent_indexes"] == [("example_nodes", ["attr2"])]
+    assert graph_ops.assume_schema_present is True
+    assert graph_ops.storage_registry_info()["size"] == 3
+
+    # Storage is served from the registry after bootstrapping
+    storage = graph_ops.resolve_vertex_storage(ExampleNode)
+    assert storage.collection.name == "example_nodes"
+    assert len(storage.collection.indexes()) == 2
+
+    # Bootstrapping again creates nothing
+    graph_ops.invalidate_storage()
+    summary = graph_ops.bootstrap_schema([ExampleNode, ExamplePerson, ExampleEdge])
+    assert summary == {
+        "graphs": [],
+        "vertex_collections": [],
+        "edge_definitions": [],
+        "persistent_indexes": [],
+    }
+
+    # In "schema assumed present" mode, storage is resolved without metadata calls
+    graph_ops.invalidate_storage()
+    storage = graph_ops.resolve_edge_storage(ExampleEdge)
+    assert isinstance(storage.collection, EdgeCollection)
+    eg_node = graph_ops.create_vertex(ExampleNode(attr1="val1", attr2="val2"))
+    eg_person = graph_ops.create_vertex(ExamplePerson(attr1="p1", attr2="p2"))
+    assert graph_ops.create_edge(ExampleEdge(frm=eg_node, to=eg_person))
+
+
 def test_create_edge(tests_conn, cleanup):
     with pytest.raises(graph_ops.DataOpsException) as einfo:
         result = graph_ops.create_edge({"some": "invalid", "dict": "fails"})
@@ -287,6 +460,54 @@ def test_set_root_and_leaf_attrs(tests_conn, cleanup):
     assert eg_person["is_leaf"] == True
 
 
+def test_create_edges(tests_conn, cleanup):
+    with pytest.raises(graph_ops.DataOpsException, match="must be instances of"):
+        graph_ops.create_edges([{"some": "invalid", "dict": "fails"}])
+
+    eg_node = graph_ops.create_vertex(ExampleNode(attr1="val1", attr2="val2"))
+    eg_node2 = graph_ops.create_vertex(ExampleNode(attr1="n2-val1", attr2="n2-val2"))
+    eg_node3 = graph_ops.create_vertex(ExampleNode(attr1="n3-val1", attr2="n3-val2"))
+    eg_person = graph_ops.create_vertex(ExamplePerson(attr1="p1", attr2="p2"))
+
+    result = graph_ops.create_edges(
+        [
+            ExampleEdge(frm=eg_node, to=eg_person, attr1="rel1"),
+            ExampleEdge(frm=eg_node, to=eg_node2, attr1="n-n2"),
+            # Fails, as the edge has no _to
+            ExampleEdge(_from="example_nodes/missing", attr1="broken"),
+            ExampleEdge(frm=eg_node2, to=eg_person, attr1="n2-person"),
+            ExampleEdge(frm=eg_node3, to=eg_person, attr1="n3-person"),
+        ],
+        chunk_size=2,
+    )
+    assert result.created == 4
+    assert [e[0] for e in result.errors] == [2]
+    storage = graph_ops.resolve_edge_storage(ExampleEdge)
+    assert storage.collection.count() == 4
+
+    # Same root & leaf semantics as `create_edge`
+    eg_node = graph_ops.get_vertex(ExampleNode, {"_id": eg_node["_id"]})
+    assert eg_node["is_root"] == True
+    assert eg_node["is_leaf"] == False
+    eg_node2 = graph_ops.get_vertex(ExampleNode, {"_id": eg_node2["_id"]})
+    assert eg_node2["is_root"] == False
+    assert eg_node2["is_leaf"] == False
+    assert eg_node2["inbound_modified"]
+    eg_node3 = graph_ops.get_vertex(ExampleNode, {"_id": eg_node3["_id"]})
+    assert eg_node3["is_root"] == True
+    eg_person = graph_ops.get_vertex(ExamplePerson, {"_id": eg_person["_id"]})
+    assert eg_person["is_root"] == False
+    assert eg_person["is_leaf"] == True
+    assert eg_person["inbound_modified"] >= eg_node2["inbound_modified"]
+
+    result = graph_ops.create_edges(
+        [ExampleEdge(frm=eg_node3, to=eg_node, attr1="n3-n")], return_new=True
+    )
+    assert result.docs[0]["_from"] == eg_node3["_id"]
+    eg_node = graph_ops.get_vertex(ExampleNode, {"_id": eg_node["_id"]})
+    assert eg_node["is_root"] == False
+
+
 def test_update_edge(tests_conn, cleanup):
     with pytest.raises(graph_ops.DataOpsException) as einfo:
         graph_ops.update_edge({"some": "invalid", "dict": "fails"})
@@ -406,6 +627,99 @@ def test_get_or_create_edge(tests_conn, cleanup):
     assert eg_edge4["some_new_prop"] == "hi"
 
 
+def _aql_error(code: int, message: str) -> AQLQueryExecuteError:
+    resp = SimpleNamespace(
+        error_message=message,
+        error_code=code,
+        status_code=409,
+        url="",
+        method="post",
+        headers={},
+    )
+    return AQLQueryExecuteError(resp, None)
+
+
+def test_get_or_create_lookup(monkeypatch):
+    existing = {"_id": "example_nodes/1", "attr1": "a"}
+    concurrent = {"_id": "example_nodes/2", "attr1": "b"}
+    queries = []
+
+    class FakeAQL:
+        def execute(self, query, bind_vars):
+            if "UPSERT" in query:
+                queries.append("upsert")
+                # A concurrent call created the missing vertex first
+                raise _aql_error(1210, "unique constraint violated")
+            queries.append("lookup")
+            docs = {"a": existing, "b": concurrent if "upsert" in queries else None}
+            return [docs[value] for [value] in bind_vars["searches"]]
+
+    storage = graph_ops.VertexStorage(
+        SimpleNamespace(aql=FakeAQL()), None, SimpleNamespace(name="example_nodes")
+    )
+    monkeypatch.setattr(graph_ops, "resolve_vertex_storage", lambda v, s=None: storage)
+
+    # Existing vertices are only looked up, never written
+    assert graph_ops.get_or_create_vertex(ExampleNode, {"attr1": "a"}) == (
+        True,
+        existing,
+    )
+    assert queries == ["lookup"]
+
+    # Conflicting creations are retried from the lookup, finding the winner
+    queries.clear()
+    results = graph_ops.get_or_create_vertices(
+        ExampleNode, [({"attr1": "a"}, None), ({"attr1": "b"}, None)]
+    )
+    assert results == [(True, existing), (True, concurrent)]
+    assert queries == ["lookup", "upsert", "lookup"]
+
+
+def test_get_or_create_upsert(tests_conn, cleanup):
+    with pytest.raises(graph_ops.DataOpsException, match="must not be empty"):
+        graph_ops.get_or_create_vertex(ExampleNode, {})
+
+    results = graph_ops.get_or_create_vertices(
+        ExampleNode,
+        [
+            ({"attr1": "a"}, None),
+            ({"attr1": "b"}, {"attr1": "b", "attr2": "new"}),
+            ({"attr1": "a"}, None),
+        ],
+    )
+    assert [existed for existed, _ in results] == [False, False, True]
+    assert results[0][1]["_id"] == results[2][1]["_id"]
+    assert results[1][1]["attr2"] == "new"
+    existed, again = graph_ops.get_or_create_vertex(
+        ExampleNode, {"attr1": "b"}, exclusive=True
+    )
+    assert existed is True
+    assert again["_id"] == results[1][1]["_id"]
+
+    eg_node = graph_ops.create_vertex(ExampleNode(attr1="val1", attr2="val2"))
+    eg_person = graph_ops.create_vertex(ExamplePerson(attr1="p1", attr2="p2"))
+    eg_node2 = graph_ops.create_vertex(ExampleNode(attr1="n2", attr2="n2"))
+    edges = graph_ops.get_or_create_edges(
+        ExampleEdge,
+        [
+            ({"_from": eg_node["_id"], "_to": eg_person["_id"]}, None),
+            ({"_from": eg_node2["_id"], "_to": eg_node["_id"]}, None),
+            ({"_from": eg_node["_id"], "_to": eg_person["_id"]}, None),
+        ],
+    )
+    assert [existed for existed, _ in edges] == [False, False, True]
+    assert edges[0][1]["_id"] == edges[2][1]["_id"]
+
+    # Vertex flags are only updated by the edges that were created
+    eg_node = graph_ops.get_vertex(ExampleNode, {"_id": eg_node["_id"]})
+    assert eg_node["is_root"] == False
+    assert eg_node["is_leaf"] == False
+    eg_person = graph_ops.get_vertex(ExamplePerson, {"_id": eg_person["_id"]})
+    assert eg_person["is_leaf"] == True
+    existed, _ = graph_ops.get_or_create_edge(ExampleEdge, frm=eg_node2, to=eg_node)
+    assert existed is True
+
+
 def test_delete_vertex(tests_conn, cleanup):
     v1 = graph_ops.create_vertex(ExampleNode(attr1="v1a1", attr2="v1a2"))
     v2 = graph_ops.create_vertex(ExampleNode(attr1="v2a1", attr2="v2a2"))
@@ -464,6 +778,144 @@ def test_list_vertex_edges(tests_conn, cleanup):
     assert cursor.count() == 3
 
 
+def test_list_vertex_edges_pagination(tests_conn, cleanup):
+    hub = graph_ops.create_vertex(ExampleNode(attr1="hub", attr2="hub"))
+    spokes = [
+        graph_ops.create_vertex(ExamplePerson(attr1=f"p{i}", attr2="spoke"))
+        for i in range(7)
+    ]
+    for spoke in spokes:
+        graph_ops.create_edge(ExampleEdge(frm=hub, to=spoke, attr1="spoke"))
+
+    all_rows = list(graph_ops.list_vertex_edges(ExampleNode, hub["_id"]))
+    assert len(all_rows) == 7
+
+    # Keyset pagination returns the same rows, in the same order
+    page1 = list(graph_ops.list_vertex_edges(ExampleNode, hub["_id"], limit=3))
+    page2 = list(
+        graph_ops.list_vertex_edges(
+            ExampleNode,
+            hub["_id"],
+            limit=3,
+            after=graph_ops.edge_cursor(page1[-1]),
+            stream=True,
+        )
+    )
+    assert [r["edge"]["_id"] for r in page1 + page2] == [
+        r["edge"]["_id"] for r in all_rows[:6]
+    ]
+
+    rows = graph_ops.iter_vertex_edges(ExampleNode, hub["_id"], page_size=2)
+    assert not isinstance(rows, list)
+    assert [r["edge"]["_id"] for r in rows] == [r["edge"]["_id"] for r in all_rows]
+
+    # Projections
+    cursor = graph_ops.list_vertex_edges(
+        ExampleNode,
+        hub["_id"],
+        limit=1,
+        vertex_fields=["attr1"],
+        edge_fields=[],
+    )
+    row = cursor.next()
+    assert set(row["vertex"]) == {"_id", "attr1"}
+    assert set(row["edge"]) == {"_id", "modified"}
+    assert row["direction"] == "outbound"
+
+
+def test_list_edges_for_vertices(tests_conn, cleanup):
+    v1 = graph_ops.create_vertex(ExampleNode(attr1="v1a1", attr2="v1a2"))
+    v2 = graph_ops.create_vertex(ExampleNode(attr1="v2a1", attr2="v2a2"))
+    v3 = graph_ops.create_vertex(ExampleNode(attr1="v3a1", attr2="v3a2"))
+    v4 = graph_ops.create_vertex(ExampleNode(attr1="v4a1", attr2="v4a2"))
+    graph_ops.create_edge(ExampleEdge(frm=v1, to=v2, attr1="v1v2"))
+    graph_ops.create_edge(ExampleEdge(frm=v1, to=v3, attr1="v1v3"))
+    graph_ops.create_edge(ExampleEdge(frm=v2, to=v3, attr1="v2v3"))
+
+    assert graph_ops.list_edges_for_vertices(ExampleNode, []) == {}
+
+    grouped = graph_ops.list_edges_for_vertices(
+        ExampleNode, [v1["_id"], v3["_id"], v4["_id"]]
+    )
+    assert list(grouped) == [v1["_id"], v3["_id"], v4["_id"]]
+    for vertex_id in grouped:
+        expected = list(graph_ops.list_vertex_edges(ExampleNode, vertex_id))
+        assert grouped[vertex_id] == expected
+    assert len(grouped[v1["_id"]]) == 2
+    assert grouped[v4["_id"]] == []
+
+    grouped = graph_ops.list_edges_for_vertices(
+        ExampleNode, [v1["_id"], v3["_id"]], outbound_only=True, per_vertex_limit=1
+    )
+    assert len(grouped[v1["_id"]]) == 1
+    assert grouped[v1["_id"]][0]["direction"] == "outbound"
+    assert grouped[v3["_id"]] == []
+
+
+def test_traverse(tests_conn, cleanup):
+    v1 = graph_ops.create_vertex(ExampleNode(attr1="v1a1", attr2="v1a2"))
+    v2 = graph_ops.create_vertex(ExampleNode(attr1="v2a1", attr2="v2a2"))
+    v3 = graph_ops.create_vertex(ExampleNode(attr1="v3a1", attr2="v3a2"))
+    v4 = graph_ops.create_vertex(ExampleNode(attr1="v4a1", attr2="v4a2"))
+    person = graph_ops.create_vertex(ExamplePerson(attr1="p1", attr2="p2"))
+    graph_ops.create_edge(ExampleEdge(frm=v1, to=v2, attr1="v1v2"))
+    graph_ops.create_edge(ExampleEdge(frm=v2, to=v3, attr1="v2v3"))
+    graph_ops.create_edge(ExampleEdge(frm=v3, to=v4, attr1="v3v4"))
+    graph_ops.create_edge(ExampleEdge(frm=v3, to=person, attr1="v3p"))
+
+    with pytest.raises(graph_ops.DataOpsException, match="`direction` must be"):
+        graph_ops.traverse(ExampleNode, v1, direction="sideways")
+    with pytest.raises(graph_ops.DataOpsException, match="min_depth"):
+        graph_ops.traverse(ExampleNode, v1, min_depth=3, max_depth=2)
+
+    rows = list(graph_ops.traverse(ExampleNode, v1, max_depth=4))
+    assert {r["vertex"]["_id"]: r["depth"] for r in rows} == {
+        v2["_id"]: 1,
+        v3["_id"]: 2,
+        v4["_id"]: 3,
+        person["_id"]: 3,
+    }
+    assert all(r["start"] == v1["_id"] for r in rows)
+
+    rows = list(graph_ops.traverse(ExampleNode, v1, min_depth=2, max_depth=2))
+    assert [r["vertex"]["_id"] for r in rows] == [v3["_id"]]
+
+    rows = list(
+        graph_ops.traverse(
+            ExampleNode, v4["_id"], max_depth=4, direction="inbound", include_path=True
+        )
+    )
+    assert [r["vertex"]["_id"] for r in rows] == [v3["_id"], v2["_id"], v1["_id"]]
+    assert len(rows[-1]["path"]["edges"]) == 3
+
+    # Pruning stops the traversal at (but still returns) matching vertices
+    rows = list(
+        graph_ops.traverse(
+            ExampleNode,
+            v1,
+            max_depth=4,
+            prune="v.attr1 == @stop_at",
+            bind_vars={"stop_at": "v2a1"},
+        )
+    )
+    assert [r["vertex"]["_id"] for r in rows] == [v2["_id"]]
+
+    # Multiple start vertices, edge collection filter, uniqueness and limit
+    rows = list(
+        graph_ops.traverse(
+            ExampleNode,
+            [v1, v2],
+            max_depth=4,
+            edge_collections=["example_edges"],
+            unique_vertices="global",
+            order="bfs",
+        )
+    )
+    assert {r["start"] for r in rows} == {v1["_id"], v2["_id"]}
+    rows = list(graph_ops.traverse(ExampleNode, [v1, v2], max_depth=4, limit=2))
+    assert len(rows) == 2
+
+
 def test_delete_edge(tests_conn, cleanup):
     v1 = graph_ops.create_vertex(ExampleNode(attr1="v1a1", attr2="v1a2"))
     v2 = graph_ops.create_vertex(ExampleNode(attr1="v2a1", attr2="v2a2"))
@@ -482,3 +934,436 @@ def test_delete_edge(tests_conn, cleanup):
     assert graph_ops.get_edge(ExampleEdge, {"_id": v2_v3["_id"]}) is None
     v2 = graph_ops.get_vertex(ExampleNode, {"_id": v2["_id"]})
     assert v2["is_leaf"]
+
+
+def test_vertex_degree(tests_conn, cleanup):
+    v1 = graph_ops.create_vertex(ExampleNode(attr1="v1a1", attr2="v1a2"))
+    v2 = graph_ops.create_vertex(ExampleNode(attr1="v2a1", attr2="v2a2"))
+    v3 = graph_ops.create_vertex(ExampleNode(attr1="v3a1", attr2="v3a2"))
+    graph_ops.create_edge(ExampleEdge(frm=v1, to=v2, attr1="v1v2"))
+    graph_ops.create_edge(ExampleEdge(frm=v1, to=v3, attr1="v1v3"))
+    graph_ops.create_edge(ExampleEdge(frm=v2, to=v3, attr1="v2v3"))
+
+    db, graph, collection = graph_ops.resolve_vertex_storage(ExampleNode)
+    assert graph_ops.has_outbound_edges(db, graph.name, v1["_id"])
+    assert not graph_ops.has_inbound_edges(db, graph.name, v1["_id"])
+    assert not graph_ops.has_outbound_edges(db, graph.name, v3["_id"])
+    assert graph_ops.has_inbound_edges(db, graph.name, v3["_id"])
+    assert graph_ops.has_edges(db, graph.name, v2["_id"])
+
+    assert graph_ops.vertex_degree(db, graph.name, v1["_id"]) == 2
+    assert graph_ops.vertex_degree(db, graph.name, v1["_id"], inbound_only=True) == 0
+    assert graph_ops.vertex_degree(db, graph.name, v3["_id"], inbound_only=True) == 2
+    assert graph_ops.vertex_degree(db, graph.name, v2["_id"], outbound_only=True) == 1
+    assert graph_ops.vertex_degree(db, graph.name, v2["_id"]) == 2
+
+
+def test_degree_counter_patches(monkeypatch):
+    monkeypatch.setattr(graph_ops, "degree_counters", True)
+    monkeypatch.setattr(graph_ops, "degree_counters_per_collection", True)
+    edges = [
+        {"_from": "example_nodes/1", "_to": "example_nodes/1"},
+        {"_from": "example_nodes/1", "_to": "example_people/2"},
+    ]
+    patches = graph_ops._add_edge_vertex_patches({}, edges, "now", "example_edges")
+    assert patches["example_nodes"]["example_nodes/1"]["_degrees"] == {
+        "in_degree": 1,
+        "out_degree": 2,
+        "in_degrees": {"example_edges": 1},
+        "out_degrees": {"example_edges": 2},
+    }
+    assert patches["example_people"]["example_people/2"]["_degrees"] == {
+        "in_degree": 1,
+        "in_degrees": {"example_edges": 1},
+    }
+
+
+def test_create_edges_duplicates(monkeypatch):
+    class FakeEdgeCollection:
+        name = "example_edges"
+
+        def insert_many(self, docs, return_new, overwrite_mode):
+            # Created, updated and ignored edges
+            return [
+                {"new": docs[0]},
+                {"new": docs[1], "_oldRev": "rev"},
+                {"_id": "example_edges/3"},
+            ]
+
+    storage = graph_ops.EdgeStorage("db", None, FakeEdgeCollection())
+    monkeypatch.setattr(graph_ops, "resolve_edge_storage", lambda e, s=None: storage)
+    monkeypatch.setattr(graph_ops, "degree_counters", True)
+    applied = []
+    monkeypatch.setattr(
+        graph_ops, "_apply_vertex_patches", lambda db, patches: applied.append(patches)
+    )
+    vertices = [{"_id": f"example_nodes/{i}"} for i in range(4)]
+    result = graph_ops.create_edges(
+        [ExampleEdge(frm=vertices[0], to=vertices[i]) for i in range(1, 4)],
+        on_duplicate="update",
+    )
+    assert (result.created, result.updated, result.ignored) == (1, 1, 1)
+
+    # Only the created edge affects its vertices
+    [patches] = applied
+    assert set(patches["example_nodes"]) == {"example_nodes/0", "example_nodes/1"}
+    assert patches["example_nodes"]["example_nodes/0"]["_degrees"] == {"out_degree": 1}
+
+
+@pytest.mark.parametrize("counters", [False, True])
+def test_vertex_patch_conflicts(monkeypatch, counters):
+    monkeypatch.setattr(graph_ops, "degree_counters", counters)
+    assert "ignoreErrors" not in graph_ops._vertex_patch_aql("@patches", "@@c")
+    executed = []
+
+    class FakeAQL:
+        conflicts = 0
+
+        def execute(self, query, bind_vars):
+            executed.append(bind_vars["patches"])
+            if len(executed) <= self.conflicts:
+                raise _aql_error(1200, "write-write conflict")
+            return []
+
+    dbase = SimpleNamespace(aql=FakeAQL())
+    patches = {}
+    graph_ops._add_edge_vertex_patches(
+        patches,
+        [{"_from": "example_nodes/1", "_to": "example_nodes/2"}],
+        "now",
+        "example_edges",
+    )
+
+    # Conflicting updates are retried as a whole...
+    dbase.aql.conflicts = graph_ops.WRITE_CONFLICT_RETRIES
+    graph_ops._apply_vertex_patches(dbase, patches)
+    assert len(executed) == graph_ops.WRITE_CONFLICT_RETRIES + 1
+
+    # ...and raised once the retries are exhausted, rather than dropped
+    executed.clear()
+    dbase.aql.conflicts = graph_ops.WRITE_CONFLICT_RETRIES + 1
+    with pytest.raises(graph_ops.DataOpsException, match="conflict"):
+        graph_ops._apply_vertex_patches(dbase, patches)
+
+
+@pytest.mark.parametrize("single_query", [False, True])
+def test_degree_counters(tests_conn, cleanup, monkeypatch, single_query):
+    monkeypatch.setattr(graph_ops, "degree_counters", True)
+    monkeypatch.setattr(graph_ops, "degree_counters_per_collection", True)
+    eg_node = graph_ops.create_vertex(ExampleNode(attr1="n1", attr2="n1"))
+    eg_node2 = graph_ops.create_vertex(ExampleNode(attr1="n2", attr2="n2"))
+    eg_person = graph_ops.create_vertex(ExamplePerson(attr1="p1", attr2="p2"))
+
+    edge = graph_ops.create_edge(
+        ExampleEdge(frm=eg_node, to=eg_person), single_query=single_query
+    )
+    graph_ops.create_edge(
+        ExampleEdge(frm=eg_node, to=eg_node2), single_query=single_query
+    )
+    graph_ops.create_edges(
+        [ExampleEdge(frm=eg_node2, to=eg_person), ExampleEdge(frm=eg_node, to=eg_node)]
+    )
+    graph_ops.get_or_create_edge(ExampleEdge, frm=eg_node2, to=eg_node)
+    graph_ops.get_or_create_edge(ExampleEdge, frm=eg_node2, to=eg_node)
+
+    def degrees(vertex_def, vertex):
+        doc = graph_ops.get_vertex(vertex_def, {"_id": vertex["_id"]})
+        return doc["in_degree"], doc["out_degree"], doc["in_degrees"]
+
+    assert degrees(ExampleNode, eg_node) == (2, 3, {"example_edges": 2})
+    assert degrees(ExampleNode, eg_node2) == (1, 2, {"example_edges": 1})
+    assert degrees(ExamplePerson, eg_person) == (2, 0, {"example_edges": 2})
+
+    # Edges ignored or updated as duplicates aren't counted again
+    for on_duplicate in ("ignore", "update"):
+        graph_ops.create_edges(
+            [ExampleEdge(_key=edge["_key"], frm=eg_node, to=eg_person)],
+            on_duplicate=on_duplicate,
+        )
+    assert degrees(ExampleNode, eg_node) == (2, 3, {"example_edges": 2})
+    assert degrees(ExamplePerson, eg_person) == (2, 0, {"example_edges": 2})
+
+    graph_ops.delete_edge(ExampleEdge, edge["_id"], single_query=single_query)
+    assert degrees(ExampleNode, eg_node) == (2, 2, {"example_edges": 2})
+    assert degrees(ExamplePerson, eg_person) == (1, 0, {"example_edges": 1})
+
+    # Counters that drifted are recomputed from the edges
+    graph_ops.update_vertex(ExampleNode(_id=eg_node["_id"], in_degree=42))
+    assert graph_ops.repair_degree_counters(ExampleNode, chunk_size=1) == 2
+    assert degrees(ExampleNode, eg_node) == (2, 2, {"example_edges": 2})
+    assert degrees(ExampleNode, eg_node2) == (1, 2, {"example_edges": 1})
+
+
+def test_delete_edges(tests_conn, cleanup):
+    v1 = graph_ops.create_vertex(ExampleNode(attr1="v1a1", attr2="v1a2"))
+    v2 = graph_ops.create_vertex(ExampleNode(attr1="v2a1", attr2="v2a2"))
+    v3 = graph_ops.create_vertex(ExampleNode(attr1="v3a1", attr2="v3a2"))
+
+    v1_v2 = graph_ops.create_edge(ExampleEdge(frm=v1, to=v2, attr1="v1v2"))
+    v1_v3 = graph_ops.create_edge(ExampleEdge(frm=v1, to=v3, attr1="v1v3"))
+    v2_v3 = graph_ops.create_edge(ExampleEdge(frm=v2, to=v3, attr1="v2v3"))
+
+    deleted = graph_ops.delete_edges(
+        ExampleEdge,
+        [v1_v2["_id"], v2_v3["_id"], "example_edges/non_existent_id"],
+        chunk_size=2,
+    )
+    assert deleted == 2
+    assert graph_ops.get_edge(ExampleEdge, {"_id": v1_v2["_id"]}) is None
+    assert graph_ops.get_edge(ExampleEdge, {"_id": v2_v3["_id"]}) is None
+    assert graph_ops.get_edge(ExampleEdge, {"_id": v1_v3["_id"]})
+
+    # v1 still has an outbound edge, v2 has none left
+    v1 = graph_ops.get_vertex(ExampleNode, {"_id": v1["_id"]})
+    assert not v1["is_leaf"]
+    v2 = graph_ops.get_vertex(ExampleNode, {"_id": v2["_id"]})
+    assert v2["is_leaf"]
+
+    assert graph_ops.delete_edges(ExampleEdge, [v1_v3["_id"]]) == 1
+    v1 = graph_ops.get_vertex(ExampleNode, {"_id": v1["_id"]})
+    assert v1["is_leaf"]
+
+
+@pytest.mark.parametrize("stream_transaction", [False, True])
+def test_single_query_edge_writes(tests_conn, cleanup, monkeypatch, stream_transaction):
+    v1 = graph_ops.create_vertex(ExampleNode(attr1="v1a1", attr2="v1a2"))
+    v2 = graph_ops.create_vertex(ExampleNode(attr1="v2a1", attr2="v2a2"))
+    person = graph_ops.create_vertex(ExamplePerson(attr1="p1", attr2="p2"))
+    assert v1["is_leaf"] is True
+    assert v2["is_root"] is True
+    assert "inbound_modified" not in v2
+    assert person["is_root"] is True
+
+    v1_v2 = graph_ops.create_edge(
+        ExampleEdge(frm=v1, to=v2, attr1="v1v2"),
+        single_query=True,
+        stream_transaction=stream_transaction,
+    )
+    assert v1_v2["_key"]
+    assert v1_v2["_from"] == v1["_id"]
+    v1_person = graph_ops.create_edge(
+        ExampleEdge(frm=v1, to=person, attr1="v1p"),
+        single_query=True,
+        stream_transaction=stream_transaction,
+    )
+
+    v1 = graph_ops.get_vertex(ExampleNode, {"_id": v1["_id"]})
+    assert v1["is_root"] is True
+    assert v1["is_leaf"] is False
+    v2 = graph_ops.get_vertex(ExampleNode, {"_id": v2["_id"]})
+    assert v2["is_root"] is False
+    assert v2["is_leaf"] is True
+    assert v2["inbound_modified"]
+    person = graph_ops.get_vertex(ExamplePerson, {"_id": person["_id"]})
+    assert person["is_root"] is False
+
+    # The whole statement fails (and nothing is written) on insert errors
+    with pytest.raises(graph_ops.DataOpsException) as einfo:
+        graph_ops.create_edge(
+            ExampleEdge(_key=v1_v2["_key"], frm=v2, to=person), single_query=True
+        )
+    assert "unique constraint violated" in str(einfo)
+    v2 = graph_ops.get_vertex(ExampleNode, {"_id": v2["_id"]})
+    assert v2["is_leaf"] is True
+
+    monkeypatch.setattr(graph_ops, "single_query_writes", True)
+    assert graph_ops.delete_edge(
+        ExampleEdge, v1_v2["_id"], stream_transaction=stream_transaction
+    )
+    v1 = graph_ops.get_vertex(ExampleNode, {"_id": v1["_id"]})
+    assert v1["is_leaf"] is False
+    assert graph_ops.delete_edge(
+        ExampleEdge, v1_person["_id"], stream_transaction=stream_transaction
+    )
+    v1 = graph_ops.get_vertex(ExampleNode, {"_id": v1["_id"]})
+    assert v1["is_leaf"] is True
+    assert graph_ops.get_edge(ExampleEdge, {"_id": v1_person["_id"]}) is None
+    assert graph_ops.delete_edge(ExampleEdge, v1_person["_id"]) is False
+
+
+def test_transaction(tests_conn, cleanup):
+    eg_person = graph_ops.create_vertex(ExamplePerson(attr1="p1", attr2="p2"))
+    with graph_ops.transaction([ExampleNode, ExampleEdge]) as txn:
+        eg_node = graph_ops.create_vertex(ExampleNode(attr1="in_txn"))
+        storage = graph_ops.resolve_vertex_storage(ExampleNode)
+        assert storage.db is txn.db
+        # Nested blocks join the outer transaction
+        with graph_ops.transaction([ExampleEdge]) as nested:
+            assert nested is txn
+            eg_edge = graph_ops.create_edge(ExampleEdge(frm=eg_node, to=eg_person))
+    assert graph_ops.get_vertex(ExampleNode, {"attr1": "in_txn"})["is_leaf"] is False
+    assert graph_ops.get_edge(ExampleEdge, {"_id": eg_edge["_id"]})
+    assert graph_ops.resolve_vertex_storage(ExampleNode).db is not txn.db
+
+    with pytest.raises(RuntimeError):
+        with graph_ops.transaction([ExampleNode]):
+            graph_ops.create_vertex(ExampleNode(attr1="aborted"))
+            assert graph_ops.get_vertex(ExampleNode, {"attr1": "aborted"})
+            raise RuntimeError()
+    assert graph_ops.get_vertex(ExampleNode, {"attr1": "aborted"}) is None
+
+
+def test_transaction_begin_and_abort(monkeypatch):
+    begun = []
+
+    class FakeDB:
+        def begin_transaction(self, **kwargs):
+            begun.append(kwargs)
+            return self
+
+        def abort_transaction(self):
+            raise ConnectionError("Connection lost")
+
+    monkeypatch.setattr(graph_ops.db, "get_db", lambda *args: FakeDB())
+    # A failed abort doesn't mask the error of the block
+    with pytest.raises(RuntimeError):
+        with graph_ops.transaction([ExampleNode]):
+            raise RuntimeError()
+    assert graph_ops._transaction.get() is None
+    # Vertex classes include the edge collections of their edges (for delete_vertex)
+    assert begun[0]["write"] == ["example_edges", "example_nodes"]
+
+
+def test_document_cache(tests_conn, cleanup, monkeypatch):
+    monkeypatch.setattr(graph_ops, "document_cache", LRUCache(max_size=100))
+    graph_ops.reset_document_cache_stats()
+
+    v1 = graph_ops.create_vertex(ExampleNode(attr1="v1a1", attr2="v1a2"))
+    v2 = graph_ops.create_vertex(ExampleNode(attr1="v2a1", attr2="v2a2"))
+
+    # Created docs are cached by id
+    assert graph_ops.get_vertex(ExampleNode, {"_id": v1["_id"]}) == v1
+    assert graph_ops.document_cache_info()["hits"] == 1
+
+    # Searches are cached after the first lookup
+    assert graph_ops.get_vertex(ExampleNode, {"attr2": "v2a2"}) == v2
+    found = graph_ops.get_vertex(ExampleNode, {"attr2": "v2a2"})
+    assert found == v2
+    info = graph_ops.document_cache_info()
+    assert (info["hits"], info["misses"]) == (2, 1)
+    assert info["hit_rate"] == 2 / 3
+
+    # Returned docs are copies
+    found["attr1"] = "mutated"
+    assert graph_ops.get_vertex(ExampleNode, {"attr2": "v2a2"})["attr1"] == "v2a1"
+
+    # Inserts drop the cached searches of their collection, which may match more
+    assert graph_ops.get_vertex(ExampleNode, {"attr1": "v1a1"}) == v1
+    graph_ops.create_vertex(ExampleNode(attr1="v1a1", attr2="other"))
+    with pytest.raises(graph_ops.DataOpsException, match="more"):
+        graph_ops.get_vertex(ExampleNode, {"attr1": "v1a1"})
+
+    # Updates replace cached docs, and cached searches no longer match
+    graph_ops.update_vertex(
+        ExampleNode(set_defaults=False, _id=v2["_id"], attr2="changed")
+    )
+    assert graph_ops.get_vertex(ExampleNode, {"attr2": "v2a2"}) is None
+    assert graph_ops.get_vertex(ExampleNode, {"attr2": "changed"})["_id"] == v2["_id"]
+
+    # Edge writes invalidate the flags of their vertices, and vertex deletion the
+    # edges touching them
+    edge = graph_ops.create_edge(ExampleEdge(frm=v1, to=v2))
+    assert graph_ops.get_vertex(ExampleNode, {"_id": v2["_id"]})["is_root"] is False
+    assert graph_ops.get_edge(ExampleEdge, frm=v1)["_id"] == edge["_id"]
+    graph_ops.delete_vertex(ExampleNode, v2["_id"])
+    assert graph_ops.get_vertex(ExampleNode, {"_id": v2["_id"]}) is None
+    assert graph_ops.get_edge(ExampleEdge, frm=v1) is None
+    assert graph_ops.document_cache_info()["invalidations"] > 0
+
+    # Writes made without graph_ops are caught by revision validation
+    storage = graph_ops.resolve_vertex_storage(ExampleNode)
+    storage.collection.update({"_id": v1["_id"], "attr1": "external"})
+    assert graph_ops.get_vertex(ExampleNode, {"_id": v1["_id"]})["attr1"] == "v1a1"
+    monkeypatch.setattr(graph_ops, "document_cache_validate_revisions", True)
+    assert graph_ops.get_vertex(ExampleNode, {"_id": v1["_id"]})["attr1"] == "external"
+    assert graph_ops.document_cache_info()["stale"] == 1
+
+
+def test_document_cache_searches(monkeypatch):
+    monkeypatch.setattr(graph_ops, "document_cache", LRUCache(max_size=100))
+    found = []
+
+    def _find_one(storage, search, fields=None):
+        found.append(search)
+        return {"_id": "example_nodes/1", **search}
+
+    monkeypatch.setattr(graph_ops, "_find_one", _find_one)
+    storage = graph_ops.VertexStorage(None, None, SimpleNamespace(name="example_nodes"))
+    graph_ops._cached_find(storage, {"attr1": "a"})
+    graph_ops._cached_find(storage, {"attr1": "a"})
+    assert len(found) == 1
+
+    # Any write to the collection (e.g. an insert) may change the results
+    graph_ops.notify_written(["example_people/1"])
+    graph_ops._cached_find(storage, {"attr1": "a"})
+    assert len(found) == 1
+    graph_ops.notify_written(["example_nodes/2"])
+    graph_ops._cached_find(storage, {"attr1": "a"})
+    assert len(found) == 2
+
+
+class RecordedPerson(graph_ops.BaseVertex):
+    record_fields = ("name", "age")
+    record_lazy_fields = ("biography",)
+
+
+def test_compact_records(monkeypatch):
+    with batch_timestamp():
+        people = [RecordedPerson(name=f"p{i}", age=i) for i in range(3)]
+    stamps = {id(p["created"]) for p in people} | {id(p["modified"]) for p in people}
+    assert len(stamps) == 1
+    assert RecordedPerson()["created"] != people[0]["created"]
+
+    doc = dict(people[0], _id="people/p0", _key="p0", _rev="r", nickname="zero")
+    Record = record_class(RecordedPerson)
+    assert record_class(RecordedPerson) is Record
+    record = Record(doc)
+    assert sys.getsizeof(record) < sys.getsizeof(doc)
+    assert record.name == record["name"] == "p0"
+    assert record["nickname"] == "zero"
+    assert record.get("missing") is None and "missing" not in record
+    assert record.is_root is True
+
+    loads = []
+
+    def fake_get_document_fields(graph_def, id, fields, storage_def=None):
+        loads.append((graph_def, id, fields))
+        return {"biography": "Born in 1990"}
+
+    monkeypatch.setattr(graph_ops, "get_document_fields", fake_get_document_fields)
+    assert record.biography == "Born in 1990"
+    assert record["biography"] == "Born in 1990"
+    assert loads == [(RecordedPerson, "people/p0", ("biography",))]
+    assert record.to_dict() == doc | {"biography": "Born in 1990"}
+
+    with pytest.raises(ValueError):
+
+        class BadRecord(graph_ops.BaseVertex):
+            record_fields = ("items",)
+
+        record_class(BadRecord)
+
+
+def test_compact_reads(tests_conn, cleanup):
+    v1 = graph_ops.create_vertex(ExampleNode(attr1="v1a1", attr2="v1a2"))
+    v2 = graph_ops.create_vertex(ExampleNode(attr1="v2a1", attr2="v2a2"))
+    graph_ops.create_edge(ExampleEdge(frm=v1, to=v2, attr1="v1v2"))
+
+    records = graph_ops.get_vertices_by_id(
+        ExampleNode, [v1["_id"], v2["_id"]], compact=True
+    )
+    assert isinstance(records[v1["_id"]], record_class(ExampleNode))
+    assert records[v1["_id"]]["attr1"] == "v1a1"
+    assert dict(records[v2["_id"]]) == graph_ops.get_vertex(
+        ExampleNode, {"_id": v2["_id"]}
+    )
+
+    rows = list(
+        graph_ops.compact_rows(graph_ops.list_vertex_edges(ExampleNode, v1["_id"]))
+    )
+    assert isinstance(rows[0]["edge"], record_class(ExampleEdge))
+    assert rows[0]["edge"]["_to"] == v2["_id"]
+    assert rows[0]["vertex"]["attr1"] == "v2a1"
+    assert graph_ops.get_document_fields(ExampleNode, v1["_id"], ["attr2"]) == {
+        "attr2": "v1a2"
+    }
@@ -1,7 +1,21 @@
+import asyncio
+import gc
+import json
+import threading
+import time
 import strawberry
 from datetime import datetime
-from flangoberry import logger
+from typing import Optional
+from strawberry.types import Info
+from flangoberry import logger, graph_ops
 from flangoberry.graphql import helpers, types
+from flangoberry.graphql.loaders import GraphLoaders
+from flangoberry.graphql.executor import threaded
+from flangoberry.graphql.response_cache import CacheHint
+from flangoberry.graphql.persisted_queries import query_hash
+from . import conftest
+from ..appfactory import create_app
+from .graph_defs import ExampleNode
 
 
 def test_eg_field_query(testappcli):
@@ -109,3 +123,410 @@ def test_edge_from_dbdoc():
     assert isinstance(obj.created, datetime)
     assert isinstance(obj.modified, datetime)
     assert isinstance(obj.some_custom_datetime, datetime)
+
+
+def test_graph_loaders(monkeypatch):
+    calls = []
+
+    def fake_get_vertices_by_id(vertex_def, ids, storage_def=None):
+        calls.append(list(ids))
+        return {id: {"_id": id} for id in ids if id != "example_nodes/missing"}
+
+    monkeypatch.setattr(graph_ops, "get_vertices_by_id", fake_get_vertices_by_id)
+
+    async def load_all():
+        loaders = GraphLoaders()
+        loader = loaders.vertex_by_id(ExampleNode)
+        assert loaders.vertex_by_id(ExampleNode) is loader
+        docs = await asyncio.gather(
+            loader.load("example_nodes/1"),
+            loader.load("example_nodes/2"),
+            loader.load("example_nodes/missing"),
+        )
+        # Cached within the loader
+        again = await loader.load("example_nodes/1")
+        return docs, again
+
+    docs, again = asyncio.run(load_all())
+    assert docs == [{"_id": "example_nodes/1"}, {"_id": "example_nodes/2"}, None]
+    assert again == {"_id": "example_nodes/1"}
+    assert calls == [["example_nodes/1", "example_nodes/2", "example_nodes/missing"]]
+
+
+@strawberry.type
+class LoaderQuery:
+    @strawberry.field
+    async def node_attr(self, info: Info, id: str) -> str:
+        loader = info.context["loaders"].vertex_by_id(ExampleNode)
+        doc = await loader.load(id)
+        return doc["attr1"]
+
+
+def test_loaders_in_async_view(monkeypatch):
+    calls = []
+
+    def fake_get_vertices_by_id(vertex_def, ids, storage_def=None):
+        calls.append(list(ids))
+        return {id: {"_id": id, "attr1": f"attr of {id}"} for id in ids}
+
+    monkeypatch.setattr(graph_ops, "get_vertices_by_id", fake_get_vertices_by_id)
+
+    def _create_app(test_config):
+        return create_app(
+            schema=strawberry.Schema(query=LoaderQuery),
+            test_config=test_config | {"GRAPHQL_ASYNC": True},
+        )
+
+    testappcli = conftest.testappcli_fixture(_create_app)()
+    res = testappcli.gql(
+        query="""
+            query {
+              a: nodeAttr(id: "example_nodes/a")
+              b: nodeAttr(id: "example_nodes/b")
+            }
+        """
+    )
+    assert res.json["data"] == {
+        "a": "attr of example_nodes/a",
+        "b": "attr of example_nodes/b",
+    }
+    assert calls == [["example_nodes/a", "example_nodes/b"]]
+
+
+@strawberry.type
+class ThreadedQuery:
+    @strawberry.field
+    @threaded
+    def slow_lookup(self, info: Info, id: str) -> str:
+        time.sleep(0.2)
+        return f"{id} in {threading.current_thread().name}"
+
+
+def test_threaded_resolvers():
+    def _create_app(test_config):
+        return create_app(
+            schema=strawberry.Schema(query=ThreadedQuery),
+            test_config=test_config
+            | {"GRAPHQL_ASYNC": True, "GRAPHQL_REQUEST_CONCURRENCY": concurrency},
+        )
+
+    query = """
+        query {
+          a: slowLookup(id: "a")
+          b: slowLookup(id: "b")
+          c: slowLookup(id: "c")
+        }
+    """
+    # Sibling lookups overlap...
+    concurrency = 3
+    testappcli = conftest.testappcli_fixture(_create_app)()
+    start = time.perf_counter()
+    res = testappcli.gql(query=query)
+    assert time.perf_counter() - start < 0.5
+    assert res.json["data"]["a"].startswith("a in flangoberry-graphql")
+
+    # ...up to the per-request concurrency limit
+    concurrency = 1
+    testappcli = conftest.testappcli_fixture(_create_app)()
+    start = time.perf_counter()
+    res = testappcli.gql(query=query)
+    assert time.perf_counter() - start >= 0.6
+    assert set(res.json["data"]) == {"a", "b", "c"}
+
+
+@strawberry.type
+class CountingQuery:
+    calls: strawberry.Private[list]
+
+    @strawberry.field
+    def node_count(self, info: Info, label: str) -> str:
+        CountingQuery.calls.append(label)
+        return f"{label}: {len(CountingQuery.calls)}"
+
+    @strawberry.field(extensions=[CacheHint(max_age=5, collections=["people"])])
+    def person_count(self) -> int:
+        CountingQuery.calls.append("person")
+        return len(CountingQuery.calls)
+
+
+@strawberry.type
+class CountingMutation:
+    @strawberry.mutation
+    def touch(self) -> int:
+        CountingQuery.calls.append("touch")
+        return len(CountingQuery.calls)
+
+
+def test_response_cache():
+    CountingQuery.calls = []
+
+    def _create_app(test_config):
+        return create_app(
+            schema=strawberry.Schema(query=CountingQuery, mutation=CountingMutation),
+            test_config=test_config | {"GRAPHQL_RESPONSE_CACHE": True},
+        )
+
+    testappcli = conftest.testappcli_fixture(_create_app)()
+    query = "query Count($label: String!) { nodeCount(label: $label) }"
+    res = testappcli.gql(query=query, variables={"label": "a"})
+    assert res.json["data"] == {"nodeCount": "a: 1"}
+    assert res.headers["Cache-Control"] == "public, max-age=60"
+    etag = res.headers["ETag"]
+
+    # Hits for the same (normalized) document and variables...
+    res = testappcli.gql(
+        query="query Count($label: String!) {\n  nodeCount(label: $label)\n}",
+        variables={"label": "a"},
+    )
+    assert res.json["data"] == {"nodeCount": "a: 1"}
+    assert res.headers["ETag"] == etag
+    res = testappcli.gql(
+        query=query, variables={"label": "a"}, headers={"If-None-Match": etag}
+    )
+    assert res.status_code == 304
+    # ...but not for other variables, or mutations
+    res = testappcli.gql(query=query, variables={"label": "b"})
+    assert res.json["data"] == {"nodeCount": "b: 2"}
+    res = testappcli.gql(query="mutation { touch }")
+    assert res.json["data"] == {"touch": 3}
+    res = testappcli.gql(query="mutation { touch }")
+    assert res.json["data"] == {"touch": 4}
+    assert "ETag" not in res.headers
+
+    # Hinted max-age and collections
+    res = testappcli.gql(query="{ personCount }")
+    assert res.json["data"] == {"personCount": 5}
+    assert res.headers["Cache-Control"] == "public, max-age=5"
+    graph_ops.notify_written(collections=["example_nodes"])
+    assert testappcli.gql(query="{ personCount }").json["data"] == {"personCount": 5}
+    res = testappcli.gql(query=query, variables={"label": "a"})
+    assert res.json["data"] == {"nodeCount": "a: 6"}
+    graph_ops.notify_written(collections=["people"])
+    assert testappcli.gql(query="{ personCount }").json["data"] == {"personCount": 7}
+
+    response_cache = testappcli.application.extensions["graphql_response_cache"]
+    assert response_cache.stats["hits"] == 3
+    response_cache.close()
+    assert not graph_ops.write_listeners
+
+    # The caches of discarded apps stop listening without being closed
+    _create_app({})
+    _create_app({})
+    gc.collect()
+    assert not graph_ops.write_listeners
+
+
+def test_persisted_queries(tmp_path):
+    CountingQuery.calls = []
+    schema = strawberry.Schema(query=CountingQuery)
+
+    def _create_app(test_config):
+        return create_app(
+            schema=schema,
+            test_config=test_config | {"GRAPHQL_PERSISTED_QUERIES": True} | settings,
+        )
+
+    def apq(testappcli, digest, query=None):
+        return testappcli.post(
+            "/graphql",
+            json={
+                "query": query,
+                "extensions": {"persistedQuery": {"version": 1, "sha256Hash": digest}},
+            },
+        )
+
+    query = "{ personCount }"
+    digest = query_hash(query)
+    settings = {}
+    testappcli = conftest.testappcli_fixture(_create_app)()
+    res = apq(testappcli, digest)
+    assert res.json["errors"][0]["extensions"]["code"] == "PERSISTED_QUERY_NOT_FOUND"
+    res = apq(testappcli, "0" * 64, query)
+    assert res.status_code == 400
+    assert res.json["errors"][0]["extensions"]["code"] == "INVALID_PERSISTED_QUERY"
+    assert apq(testappcli, digest, query).json["data"] == {"personCount": 1}
+    assert apq(testappcli, digest).json["data"] == {"personCount": 2}
+    res = testappcli.get(
+        "/graphql",
+        query_string={
+            "extensions": json.dumps(
+                {"persistedQuery": {"version": 1, "sha256Hash": digest}}
+            )
+        },
+    )
+    assert res.json["data"] == {"personCount": 3}
+
+    # The document caches are added to a copy of the schema, per app
+    app = _create_app({})
+    assert not schema.extensions
+    assert len(app.extensions["graphql_schema"].extensions) == 2
+
+    # Allow-list mode
+    allow_list = tmp_path / "allow_list.json"
+    allow_list.write_text(json.dumps([query]))
+    settings = {"GRAPHQL_PERSISTED_QUERIES_ALLOW_LIST": str(allow_list)}
+    testappcli = conftest.testappcli_fixture(_create_app)()
+    assert apq(testappcli, digest).json["data"] == {"personCount": 4}
+    assert testappcli.gql(query=query).json["data"] == {"personCount": 5}
+    res = testappcli.gql(query='{ nodeCount(label: "a") }')
+    assert res.json["errors"][0]["extensions"]["code"] == "PERSISTED_QUERY_NOT_ALLOWED"
+    assert CountingQuery.calls == ["person"] * 5
+
+
+@strawberry.type
+class CostlyNode:
+    name: str
+
+    @strawberry.field
+    def neighbours(self, limit: int = None) -> list["CostlyNode"]:
+        return [CostlyNode(name=f"{self.name}.{i}") for i in range(limit or 2)]
+
+
+@strawberry.type
+class CostlyQuery:
+    @strawberry.field
+    def node(self, name: str) -> CostlyNode:
+        return CostlyNode(name=name)
+
+
+def test_query_cost_limiter(suppress_gql_error_log):
+    schema = strawberry.Schema(query=CostlyQuery)
+
+    def _create_app(test_config):
+        return create_app(
+            schema=schema,
+            test_config=test_config
+            | {
+                "GRAPHQL_MAX_QUERY_COST": 20,
+                "GRAPHQL_MAX_QUERY_DEPTH": 4,
+                "GRAPHQL_FIELD_COSTS": {"Query.node": 2},
+            },
+        )
+
+    testappcli = conftest.testappcli_fixture(_create_app)()
+    query = """
+        query Nodes($limit: Int) {
+          node(name: "a") {
+            name
+            neighbours(limit: $limit) { ...Neighbours }
+          }
+        }
+        fragment Neighbours on CostlyNode { name neighbours(limit: 3) { name } }
+    """
+    # node, and a neighbours lookup for each of the `limit` neighbours
+    res = testappcli.gql(query=query, variables={"limit": 5})
+    assert len(res.json["data"]["node"]["neighbours"]) == 5
+    assert res.json["extensions"]["cost"] == {
+        "requested": 2 + 5,
+        "depth": 4,
+        "maximum": 20,
+    }
+
+    res = testappcli.gql(query=query, variables={"limit": 40})
+    assert res.json["data"] is None
+    assert res.json["errors"][0]["extensions"]["code"] == "QUERY_TOO_COSTLY"
+    assert res.json["extensions"]["cost"]["requested"] == 2 + 40
+
+    # Negative list sizes count as empty lists, instead of offsetting other fields
+    res = testappcli.gql(query=query, variables={"limit": -1000})
+    assert res.json["extensions"]["cost"]["requested"] == 2
+    res = testappcli.gql(
+        query="""
+            query {
+              a: node(name: "a") { neighbours(limit: -1000) { ...Neighbours } }
+              b: node(name: "b") { neighbours(limit: 40) { ...Neighbours } }
+            }
+            fragment Neighbours on CostlyNode { name neighbours(limit: 3) { name } }
+        """
+    )
+    assert res.json["errors"][0]["extensions"]["code"] == "QUERY_TOO_COSTLY"
+    assert res.json["extensions"]["cost"]["requested"] == 2 + 2 + 40
+
+    res = testappcli.gql(
+        query="""
+            query {
+              node(name: "a") {
+                neighbours(limit: 1) {
+                  neighbours(limit: 1) { neighbours(limit: 1) { name } }
+                }
+              }
+            }
+        """
+    )
+    assert res.json["errors"][0]["extensions"]["code"] == "QUERY_TOO_DEEP"
+
+    # The limiter is only installed on the schema of the apps that enable it
+    assert not schema.extensions
+    testappcli = conftest.testappcli_fixture(
+        lambda test_config: create_app(schema=schema, test_config=test_config)
+    )()
+    res = testappcli.gql(query=query, variables={"limit": 40})
+    assert len(res.json["data"]["node"]["neighbours"]) == 40
+    assert "cost" not in res.json.get("extensions", {})
+
+
+@strawberry.type
+class Measurement:
+    taken: datetime
+    value: float
+
+
+@strawberry.type
+class MyMeasuredVertexType(types.BaseVertexFieldsMixin):
+    reviewed: Optional[datetime] = None
+    sampled: Optional[list[datetime]] = None
+    measurements: Optional[list[Measurement]] = None
+
+
+def test_compiled_dbdoc_converters():
+    now = datetime.now()
+    doc = {
+        "_key": "somekey",
+        "_rev": "somerev",
+        "_id": "someid",
+        "is_root": False,
+        "is_leaf": True,
+        "created": now.isoformat(),
+        "modified": now,
+        "inbound_modified": None,
+        "reviewed": now.isoformat(),
+        "sampled": [now.isoformat(), now.isoformat()],
+        "tags": ["a"],
+    }
+    obj = MyMeasuredVertexType.from_dbdoc(doc)
+    assert obj.created == now and obj.modified == now
+    assert obj.inbound_modified is None
+    assert obj.reviewed == now
+    assert obj.sampled == [now, now]
+
+    objs = MyMeasuredVertexType.from_dbdocs(
+        doc | {"_key": f"key{i}", "reviewed": None} for i in range(3)
+    )
+    assert [(obj.key, obj.reviewed) for obj in objs] == [
+        ("key0", None),
+        ("key1", None),
+        ("key2", None),
+    ]
+
+    obj.measurements = [Measurement(taken=now, value=1.5)]
+    out_dict = obj.to_dbdoc()
+    assert out_dict["_key"] == "somekey" and "key" not in out_dict
+    assert out_dict["measurements"] == [{"taken": now, "value": 1.5}]
+    assert out_dict["tags"] == ["a"] and out_dict["tags"] is not obj.tags
+
+    edge = MyEdgeType.from_dbdoc(
+        {
+            "_key": "somekey",
+            "_rev": "somerev",
+            "_id": "someid",
+            "_from": "somefrom",
+            "_to": "someto",
+            "animal": "eel",
+            "created": now.isoformat(),
+            "modified": now.isoformat(),
+            "some_custom_datetime": now.isoformat(),
+        }
+    )
+    out_dict = edge.to_dbdoc()
+    assert out_dict["_from"] == "somefrom" and out_dict["_to"] == "someto"
+    assert "frm" not in out_dict
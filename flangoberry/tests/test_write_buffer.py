@@ -0,0 +1,90 @@
+import threading
+import pytest
+from .graph_defs import ExampleNode, ExamplePerson, ExampleEdge
+from .. import graph_ops
+from ..write_buffer import WriteBuffer, VERTEX_INSERTS, VERTEX_UPDATES
+
+
+class FakeCollection:
+    name = "example_nodes"
+
+
+def test_write_buffer_queueing(monkeypatch):
+    storage = graph_ops.VertexStorage(None, None, FakeCollection())
+    monkeypatch.setattr(graph_ops, "resolve_vertex_storage", lambda v, s=None: storage)
+    writes = []
+    release = threading.Event()
+
+    def _write(self, kind, storage, docs):
+        release.wait(5)
+        writes.append((kind, [dict(doc) for doc in docs]))
+        return [{**doc, "_id": doc.get("_id", "example_nodes/new")} for doc in docs]
+
+    monkeypatch.setattr(WriteBuffer, "_write", _write)
+    buffer = WriteBuffer(flush_interval=None, max_pending=3, put_timeout=0.1)
+
+    update1 = buffer.update_vertex(ExampleNode(_id="example_nodes/1", attr1="a"))
+    update2 = buffer.update_vertex(ExampleNode(_key="1", attr2="b"))
+    created = buffer.create_vertex(ExampleNode(attr1="new"))
+    buffer.update_vertex(ExampleNode(_key="2", attr1="c"))
+    assert len(buffer) == 3
+    assert buffer.stats["coalesced"] == 1
+
+    # The buffer is full until a flush makes room
+    with pytest.raises(graph_ops.DataOpsException, match="full"):
+        buffer.create_vertex(ExampleNode(attr1="too many"))
+    assert buffer.stats["blocked"] == 1
+    release.set()
+    buffer.flush()
+    assert len(buffer) == 0
+
+    # Inserts are written before updates, and updates of a document are coalesced
+    assert [kind for kind, _ in writes] == [VERTEX_INSERTS, VERTEX_UPDATES]
+    coalesced = writes[1][1][0]
+    assert coalesced["attr1"] == "a" and coalesced["attr2"] == "b"
+    assert created.result()["attr1"] == "new"
+    assert update1.result() == update2.result()
+
+    buffer.close()
+    with pytest.raises(graph_ops.DataOpsException, match="closed"):
+        buffer.create_vertex(ExampleNode(attr1="late"))
+
+
+def test_write_buffer_in_transaction(monkeypatch):
+    class FakeDB:
+        def begin_transaction(self, **kwargs):
+            return self
+
+        def commit_transaction(self):
+            pass
+
+    monkeypatch.setattr(graph_ops.db, "get_db", lambda *args: FakeDB())
+    with WriteBuffer(flush_interval=None) as buffer:
+        with graph_ops.transaction([ExampleNode]):
+            with pytest.raises(graph_ops.DataOpsException, match="transaction"):
+                buffer.create_vertex(ExampleNode(attr1="in_txn"))
+        assert len(buffer) == 0
+
+
+def test_write_buffer(tests_conn, cleanup):
+    with WriteBuffer(batch_size=2, flush_interval=0.05) as buffer:
+        node_future = buffer.create_vertex(ExampleNode(attr1="n1", attr2="n2"))
+        person_future = buffer.create_vertex(ExamplePerson(attr1="p1"))
+        node = node_future.result(timeout=5)
+        person = person_future.result(timeout=5)
+        dupe = buffer.create_vertex(ExampleNode(attr1="dupe", attr2="n2"))
+        edge = buffer.create_edge(ExampleEdge(frm=node, to=person))
+        buffer.update_vertex(ExamplePerson(_id=person["_id"], attr2="x"))
+        updated = buffer.update_vertex(ExamplePerson(_id=person["_id"], attr3="y"))
+
+    with pytest.raises(graph_ops.DataOpsException):
+        dupe.result()
+    assert edge.result()["_from"] == node["_id"]
+    assert updated.result()["attr2"] == "x"
+    assert updated.result()["attr3"] == "y"
+    assert buffer.stats["failed"] == 1
+
+    node = graph_ops.get_vertex(ExampleNode, {"_id": node["_id"]})
+    assert node["is_leaf"] is False
+    person = graph_ops.get_vertex(ExamplePerson, {"_id": person["_id"]})
+    assert person["is_root"] is False
@@ -0,0 +1,252 @@
+import itertools
+import threading
+from concurrent.futures import Future
+from arango.exceptions import DocumentInsertError, DocumentUpdateError
+from strawberry import UNSET as STRAWBERRY_UNSET
+from flangoberry import graph_ops, logger
+from .graph_defs import BaseVertex, BaseEdge, timestamp
+from .graph_ops import DataOpsException
+
+#
+# Kinds of queued writes, in the order they are flushed: vertices are inserted
+# before the edges that may point to them, and documents before the updates that
+# may target them.
+#
+VERTEX_INSERTS, EDGE_INSERTS, VERTEX_UPDATES, EDGE_UPDATES = range(4)
+
+
+class WriteBuffer:
+    """
+    Write-behind buffer of graph_ops mutations, for callers that write documents one
+    at a time from many threads (e.g. ingestion workers).
+
+    `create_vertex` / `create_edge` / `update_vertex` / `update_edge` queue the write
+    and return a `concurrent.futures.Future` of the stored document (wrap it with
+    `asyncio.wrap_future` to await it from a coroutine). Writes are queued per
+    collection, and written by a background thread as bulk inserts / updates once a
+    queue holds `batch_size` documents, or every `flush_interval` seconds. Updates
+    of a document that is already queued for an update are coalesced into it.
+    Created edges update the flags of their vertices like `graph_ops.create_edges`.
+
+    Writes can't be queued within a `graph_ops.transaction` block, as they would be
+    flushed once the transaction has ended.
+
+    At most `max_pending` documents are queued: writers block until a flush makes
+    room, and raise a DataOpsException if that takes over `put_timeout` seconds.
+
+    `flush()` writes everything queued so far, and `close()` (also called on exit
+    when used as a context manager) flushes and stops the background thread.
+    """
+
+    def __init__(
+        self,
+        batch_size: int = graph_ops.BULK_CHUNK_SIZE,
+        flush_interval: float = 1.0,
+        max_pending: int = 10000,
+        put_timeout: float = None,
+    ):
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_pending = max_pending
+        self.put_timeout = put_timeout
+        self.stats = {
+            "queued": 0,
+            "coalesced": 0,
+            "blocked": 0,
+            "flushes": 0,
+            "written": 0,
+            "failed": 0,
+        }
+        # (kind, storage) -> {key: [doc, futures]}, keyed by `_id` for updates
+        self._queues = {}
+        self._pending = 0
+        self._closed = False
+        self._flush_requested = False
+        self._counter = itertools.count()
+        self._cond = threading.Condition()
+        self._flush_lock = threading.Lock()
+        self._flusher = threading.Thread(
+            target=self._flush_loop, name="flangoberry-write-buffer", daemon=True
+        )
+        self._flusher.start()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def __len__(self):
+        return self._pending
+
+    def create_vertex(self, vertex: BaseVertex, storage_def=None) -> Future:
+        if not isinstance(vertex, BaseVertex):
+            raise DataOpsException("`vertex` must be an instance of BaseVertex")
+        storage = self._storage(graph_ops.resolve_vertex_storage, vertex, storage_def)
+        return self._enqueue(VERTEX_INSERTS, storage, next(self._counter), vertex)
+
+    def create_edge(self, edge: BaseEdge, storage_def=None) -> Future:
+        if not isinstance(edge, BaseEdge):
+            raise DataOpsException("`edge` must be an instance of BaseEdge")
+        storage = self._storage(graph_ops.resolve_edge_storage, edge, storage_def)
+        return self._enqueue(EDGE_INSERTS, storage, next(self._counter), edge)
+
+    def update_vertex(self, vertex: BaseVertex, storage_def=None) -> Future:
+        if not isinstance(vertex, BaseVertex):
+            raise DataOpsException("`vertex` must be an instance of BaseVertex")
+        storage = self._storage(graph_ops.resolve_vertex_storage, vertex, storage_def)
+        return self._enqueue_update(VERTEX_UPDATES, storage, vertex)
+
+    def update_edge(self, edge: BaseEdge, storage_def=None) -> Future:
+        if not isinstance(edge, BaseEdge):
+            raise DataOpsException("`edge` must be an instance of BaseEdge")
+        storage = self._storage(graph_ops.resolve_edge_storage, edge, storage_def)
+        return self._enqueue_update(EDGE_UPDATES, storage, edge)
+
+    def _storage(self, resolve_storage, graph_def, storage_def):
+        if graph_ops._transaction.get() is not None:
+            raise DataOpsException(
+                "Writes can't be buffered within a graph_ops.transaction block"
+            )
+        return resolve_storage(graph_def, storage_def)
+
+    def _enqueue_update(self, kind: int, storage, doc: dict) -> Future:
+        # Same preparation as `graph_ops.update_vertex`
+        doc.pop("created", None)
+        doc["modified"] = timestamp()
+        for field in [f for f, v in doc.items() if v == STRAWBERRY_UNSET]:
+            doc.pop(field)
+        if "_id" in doc:
+            key = doc["_id"]
+        elif "_key" in doc:
+            key = f"{storage.collection.name}/{doc['_key']}"
+        else:
+            raise DataOpsException("Updated documents must have an `_id` or `_key`")
+        return self._enqueue(kind, storage, key, doc, coalesce=True)
+
+    def _enqueue(self, kind: int, storage, key, doc: dict, coalesce=False) -> Future:
+        future = Future()
+        with self._cond:
+            while True:
+                if self._closed:
+                    raise DataOpsException("The write buffer is closed")
+                queue = self._queues.setdefault((kind, storage), {})
+                if coalesce and key in queue:
+                    queue[key][0].update(doc)
+                    queue[key][1].append(future)
+                    self.stats["coalesced"] += 1
+                    return future
+                if self._pending < self.max_pending:
+                    break
+                self.stats["blocked"] += 1
+                self._request_flush()
+                if not self._cond.wait_for(
+                    lambda: self._pending < self.max_pending or self._closed,
+                    self.put_timeout,
+                ):
+                    raise DataOpsException("The write buffer is full")
+
+            queue[key] = [doc, [future]]
+            self._pending += 1
+            self.stats["queued"] += 1
+            if len(queue) >= self.batch_size:
+                self._request_flush()
+        return future
+
+    def _request_flush(self):
+        self._flush_requested = True
+        self._cond.notify_all()
+
+    def _flush_loop(self):
+        while True:
+            with self._cond:
+                self._cond.wait_for(
+                    lambda: self._flush_requested or self._closed, self.flush_interval
+                )
+                if self._closed:
+                    return
+                self._flush_requested = False
+            self.flush()
+
+    def flush(self):
+        """Writes all the queued documents, returning once they are written"""
+        with self._flush_lock:
+            with self._cond:
+                queues, self._queues = self._queues, {}
+            try:
+                for (kind, storage), queue in sorted(
+                    queues.items(), key=lambda item: item[0][0]
+                ):
+                    for chunk in graph_ops._chunks(queue.values(), self.batch_size):
+                        self._write_chunk(kind, storage, chunk)
+            finally:
+                with self._cond:
+                    self._pending -= sum(len(queue) for queue in queues.values())
+                    self._cond.notify_all()
+
+    def close(self):
+        """Flushes the queued documents and stops the background thread. Writes to a
+        closed buffer raise a DataOpsException."""
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+        self._flusher.join()
+        self.flush()
+
+    def _write_chunk(self, kind: int, storage, chunk: list):
+        try:
+            results = self._write(kind, storage, [doc for doc, _ in chunk])
+        except Exception as e:
+            logger.warning(
+                f"Write-behind flush to {storage.collection.name} failed: {e}"
+            )
+            results = [e] * len(chunk)
+        with self._cond:
+            self.stats["flushes"] += 1
+            for result in results:
+                self.stats[
+                    "failed" if isinstance(result, Exception) else "written"
+                ] += 1
+        for (_, futures), result in zip(chunk, results):
+            for future in futures:
+                if isinstance(result, Exception):
+                    future.set_exception(result)
+                else:
+                    future.set_result(result)
+
+    def _write(self, kind: int, storage, docs: list[dict]) -> list:
+        """Writes `docs` with one bulk request. Returns the stored document, or a
+        DataOpsException, per document."""
+        collection = storage.collection
+        if kind in (VERTEX_INSERTS, EDGE_INSERTS):
+            try:
+                results = collection.insert_many(docs, return_new=True)
+            except DocumentInsertError as e:
+                raise DataOpsException(f"arango.exceptions.DocumentInsertError: {e}")
+        else:
+            try:
+                results = collection.update_many(docs, return_new=True)
+            except DocumentUpdateError as e:
+                raise DataOpsException(f"arango.exceptions.DocumentUpdateError: {e}")
+        results = [
+            (
+                DataOpsException(getattr(res, "error_message", str(res)))
+                if isinstance(res, Exception)
+                else res["new"]
+            )
+            for res in results
+        ]
+
+        written = [res for res in results if not isinstance(res, Exception)]
+        ids = [doc["_id"] for doc in written]
+        if kind == VERTEX_INSERTS:
+            graph_ops.notify_written(ids)
+        elif kind == EDGE_INSERTS and written:
+            patches = graph_ops._add_edge_vertex_patches({}, written, timestamp())
+            graph_ops._apply_vertex_patches(storage.db, patches)
+            graph_ops.invalidate_cached(ids)
+        else:
+            graph_ops.invalidate_cached(ids)
+        for doc in written:
+            graph_ops._cache_document(doc, collection.name)
+        return results